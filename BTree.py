@@ -0,0 +1,230 @@
+################################################################################
+#	File : BTree.py
+#	Purpose : Ordered map used by B-tree indexes
+################################################################################
+
+from bisect import bisect_left, bisect_right
+
+################################################################################
+#	Class : BTreeLeaf
+#	Purpose : A leaf of a B+ tree. Holds sorted keys, the list of values
+#	          stored under each key, and a link to the next leaf.
+################################################################################
+class BTreeLeaf(object):
+    '''A leaf of a B+ tree'''
+    def __init__(self, keys=None, values=None):
+        self.keys = keys if keys is not None else []
+        self.values = values if values is not None else []
+        self.next = None
+
+################################################################################
+#	Class : BTreeNode
+#	Purpose : An inner node of a B+ tree. Child i holds the keys smaller than
+#	          keys[i] and at least keys[i - 1].
+################################################################################
+class BTreeNode(object):
+    '''An inner node of a B+ tree'''
+    def __init__(self, keys, children):
+        self.keys = keys
+        self.children = children
+
+################################################################################
+#	Class : BTree
+#	Purpose : A B+ tree mapping each key to a list of values (row positions
+#	          for an index), with point and range lookups in O(log n)
+################################################################################
+class BTree(object):
+    '''A B+ tree mapping each key to a list of values'''
+    # Maximum number of keys in a node
+    ORDER = 64
+
+    def __init__(self, order=ORDER):
+        '''
+    	Purpose : Make an empty tree
+    	Parameters :
+    		order: The maximum number of keys in a node
+    	Returns: None
+        '''
+        self.order = order
+        self.root = BTreeLeaf()
+        self.size = 0
+
+    @classmethod
+    def fromItems(cls, items, order=ORDER):
+        '''
+    	Purpose : Bulk-load a tree bottom-up from sorted items
+    	Parameters :
+    		items: A list of (key, list of values) pairs sorted by unique key
+            order: The maximum number of keys in a node
+    	Returns: A BTree holding the items
+        '''
+        tree = cls(order)
+        if not items:
+            return tree
+
+        # Fill the leaves, then build each inner level over the one below
+        # until a single node is left
+        leaves = []
+        for start in range(0, len(items), order):
+            chunk = items[start:start + order]
+            leaf = BTreeLeaf([key for key, values in chunk], [list(values) for key, values in chunk])
+            if leaves:
+                leaves[-1].next = leaf
+            leaves.append(leaf)
+
+        level = leaves
+        firstKeys = [leaf.keys[0] for leaf in leaves]
+        while len(level) > 1:
+            parents, parentKeys = [], []
+            for start in range(0, len(level), order + 1):
+                children = level[start:start + order + 1]
+                keys = firstKeys[start + 1:start + len(children)]
+                parents.append(BTreeNode(keys, children))
+                parentKeys.append(firstKeys[start])
+            level, firstKeys = parents, parentKeys
+
+        tree.root = level[0]
+        tree.size = len(items)
+        return tree
+
+    def __len__(self):
+        return self.size
+
+    def get(self, key):
+        '''
+    	Purpose : Find the values stored under a key
+    	Parameters :
+    		key: The key to find
+    	Returns: The list of values. An empty list if the key is not stored.
+        '''
+        leaf = self.__findLeaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i < len(leaf.keys) and leaf.keys[i] == key:
+            return leaf.values[i]
+        return []
+
+    def insert(self, key, value):
+        '''
+    	Purpose : Add a value under a key
+    	Parameters :
+    		key: The key
+            value: The value to add to the key's list
+    	Returns: None
+        '''
+        split = self.__insert(self.root, key, value)
+        if split is not None:
+            # The root was split: grow the tree by one level
+            splitKey, sibling = split
+            self.root = BTreeNode([splitKey], [self.root, sibling])
+
+    def remove(self, key, value):
+        '''
+    	Purpose : Remove a value from a key. A key left without values is
+                  removed from its leaf; nodes are not merged, since a
+                  sparse leaf is still searched correctly.
+    	Parameters :
+    		key: The key
+            value: The value to remove from the key's list
+    	Returns: True if the value was found
+        '''
+        leaf = self.__findLeaf(key)
+        i = bisect_left(leaf.keys, key)
+        if i == len(leaf.keys) or leaf.keys[i] != key or value not in leaf.values[i]:
+            return False
+        leaf.values[i].remove(value)
+        if not leaf.values[i]:
+            del leaf.keys[i]
+            del leaf.values[i]
+            self.size -= 1
+        return True
+
+    def range(self, low=None, high=None, lowInclusive=True, highInclusive=True):
+        '''
+    	Purpose : Walk the keys between two bounds in order
+    	Parameters :
+    		low: The lower bound. Unbounded if None.
+            high: The upper bound. Unbounded if None.
+            lowInclusive: Whether a key equal to low is included
+            highInclusive: Whether a key equal to high is included
+    	Returns: A generator of (key, list of values) pairs
+        '''
+        if low is None:
+            leaf = self.root
+            while isinstance(leaf, BTreeNode):
+                leaf = leaf.children[0]
+            i = 0
+        else:
+            leaf = self.__findLeaf(low)
+            i = bisect_left(leaf.keys, low) if lowInclusive else bisect_right(leaf.keys, low)
+
+        while leaf is not None:
+            for j in range(i, len(leaf.keys)):
+                key = leaf.keys[j]
+                if high is not None and (key > high or (key == high and not highInclusive)):
+                    return
+                yield key, leaf.values[j]
+            leaf, i = leaf.next, 0
+
+    def items(self):
+        '''
+    	Purpose : Walk every key in order
+    	Parameters : None
+    	Returns: A generator of (key, list of values) pairs
+        '''
+        return self.range()
+
+    def __findLeaf(self, key):
+        '''
+    	Purpose : Find the leaf a key belongs in
+    	Parameters :
+    		key: The key to find
+    	Returns: The BTreeLeaf object
+        '''
+        node = self.root
+        while isinstance(node, BTreeNode):
+            node = node.children[bisect_right(node.keys, key)]
+        return node
+
+    def __insert(self, node, key, value):
+        '''
+    	Purpose : Add a value under a key in a subtree
+    	Parameters :
+    		node: The root of the subtree
+            key: The key
+            value: The value to add
+    	Returns: None, or a (separator key, new right sibling) pair if the
+                 node had to be split
+        '''
+        if isinstance(node, BTreeLeaf):
+            i = bisect_left(node.keys, key)
+            if i < len(node.keys) and node.keys[i] == key:
+                node.values[i].append(value)
+                return None
+            node.keys.insert(i, key)
+            node.values.insert(i, [value])
+            self.size += 1
+            if len(node.keys) <= self.order:
+                return None
+            middle = len(node.keys) // 2
+            sibling = BTreeLeaf(node.keys[middle:], node.values[middle:])
+            del node.keys[middle:]
+            del node.values[middle:]
+            sibling.next, node.next = node.next, sibling
+            return sibling.keys[0], sibling
+
+        i = bisect_right(node.keys, key)
+        split = self.__insert(node.children[i], key, value)
+        if split is None:
+            return None
+        splitKey, child = split
+        node.keys.insert(i, splitKey)
+        node.children.insert(i + 1, child)
+        if len(node.keys) <= self.order:
+            return None
+        # The middle key moves up to the parent
+        middle = len(node.keys) // 2
+        upKey = node.keys[middle]
+        sibling = BTreeNode(node.keys[middle + 1:], node.children[middle + 1:])
+        del node.keys[middle:]
+        del node.children[middle + 1:]
+        return upKey, sibling
@@ -0,0 +1,292 @@
+################################################################################
+#	File : BufferPool.py
+#	Purpose : Caches pages of table files in memory within a memory budget
+################################################################################
+
+import os
+import tempfile
+from collections import OrderedDict
+
+import Settings
+
+################################################################################
+#	Class : BufferPool
+#	Purpose : Keeps the most recently used pages of every page file in
+#	          memory. Changed pages are written back to their file when it
+#	          is flushed, so changing a row only writes its page. Changed
+#	          pages that do not fit in the budget wait in a spill file.
+################################################################################
+class BufferPool(object):
+    '''Caches file pages in memory with least recently used eviction'''
+    # Pool shared by every page file, made on first use
+    instance = None
+
+    def __init__(self, budget):
+        '''
+    	Purpose : Make an empty pool
+    	Parameters :
+    		budget: The number of bytes of pages the pool may hold
+    	Returns: None
+        '''
+        self.budget = budget
+        # (path, page number) -> page bytes, least recently used first
+        self.pages = OrderedDict()
+        # (path, page number) -> PageFile writing the changed page back
+        self.writers = {}
+        # (path, page number) of the changed pages already logged in the
+        # write-ahead log since they last changed
+        self.logged = set()
+        # path -> (size, modification time) of the file when its cached
+        # pages were last known to match it
+        self.stamps = {}
+        self.size = 0
+        # Temporary file holding changed pages evicted before their file is
+        # flushed, made on first use. (path, page number) -> (offset,
+        # length) of each page in it, and offsets of the slots freed.
+        self.spill = None
+        self.spilled = {}
+        self.holes = []
+
+    @classmethod
+    def shared(cls):
+        '''
+    	Purpose : Get the pool shared by every page file
+    	Parameters : None
+    	Returns: The BufferPool object
+        '''
+        if cls.instance is None:
+            cls.instance = cls(Settings.bufferPoolSize)
+        return cls.instance
+
+    def get(self, pageFile, pageNo):
+        '''
+    	Purpose : Get a page, reading it from its file if it is not cached
+    	Parameters :
+    		pageFile: The PageFile object the page belongs to
+            pageNo: The number of the page in the file
+    	Returns: The page bytes. They must not be changed in place; use put.
+        '''
+        key = (pageFile.path, pageNo)
+        page = self.pages.get(key)
+        if page is not None:
+            self.pages.move_to_end(key)
+            return page
+        if key in self.spilled:
+            # The spill slot stays taken until the page changes or is written
+            page = self.__unspill(key)
+            self.__add(key, page)
+            return page
+        page = pageFile.readPage(pageNo)
+        if not pageFile.mapped:
+            # Mapped pages are cached by the operating system instead
+            self.__add(key, page)
+        return page
+
+    def put(self, pageFile, pageNo, page):
+        '''
+    	Purpose : Replace a page. It is written to its file when the file is
+                  flushed.
+    	Parameters :
+    		pageFile: The PageFile object the page belongs to
+            pageNo: The number of the page in the file
+            page: The new page bytes
+    	Returns: None
+        '''
+        key = (pageFile.path, pageNo)
+        self.writers[key] = pageFile
+        self.logged.discard(key)
+        self.__free(key)
+        self.__add(key, page)
+
+    def changes(self, path):
+        '''
+    	Purpose : Get the changed pages of a file not written to it or
+                  logged yet. They count as logged until they change again.
+    	Parameters :
+    		path: The path of the file
+    	Returns: A generator of (page number, page bytes) tuples in page
+                 order, reading spilled pages as it goes
+        '''
+        keys = sorted(key for key in self.writers if key[0] == path and key not in self.logged)
+        self.logged.update(keys)
+        for key in keys:
+            yield key[1], self.__page(key)
+
+    def flush(self, path):
+        '''
+    	Purpose : Write the changed pages of a file
+    	Parameters :
+    		path: The path of the file
+    	Returns: True if a page was written
+        '''
+        keys = sorted(key for key in self.writers if key[0] == path)
+        for key in keys:
+            self.writers.pop(key).writePage(key[1], self.__page(key))
+            self.logged.discard(key)
+            self.__free(key)
+        if keys:
+            self.__stamp(path)
+            # The written pages can be evicted now
+            self.__evict()
+        return len(keys) > 0
+
+    def discard(self, path):
+        '''
+    	Purpose : Forget every page of a file, changed or not, e.g. before
+                  the file is replaced
+    	Parameters :
+    		path: The path of the file
+    	Returns: None
+        '''
+        for key in [key for key in self.pages if key[0] == path]:
+            self.size -= len(self.pages.pop(key))
+        for key in [key for key in self.writers if key[0] == path]:
+            self.writers.pop(key)
+            self.logged.discard(key)
+            self.__free(key)
+        self.stamps.pop(path, None)
+
+    def invalidate(self, path):
+        '''
+    	Purpose : Forget the cached pages of a file written behind the pool,
+                  e.g. by a checkpoint. Changed pages not written yet are
+                  kept.
+    	Parameters :
+    		path: The path of the file
+    	Returns: None
+        '''
+        for key in [key for key in self.pages if key[0] == path and key not in self.writers]:
+            self.size -= len(self.pages.pop(key))
+        self.stamps.pop(path, None)
+
+    def validate(self, path):
+        '''
+    	Purpose : Forget the cached pages of a file changed by another process
+                  since they were read
+    	Parameters :
+    		path: The path of the file
+    	Returns: None
+        '''
+        stamp = self.stamps.get(path)
+        if stamp is not None and stamp != self.__fileStamp(path):
+            if not any(key[0] == path for key in self.writers):
+                self.discard(path)
+        if path not in self.stamps:
+            self.__stamp(path)
+
+    def resize(self, budget):
+        '''
+    	Purpose : Change the memory budget, evicting pages if needed
+    	Parameters :
+    		budget: The number of bytes of pages the pool may hold
+    	Returns: None
+        '''
+        self.budget = budget
+        self.__evict()
+
+    def __add(self, key, page):
+        '''
+    	Purpose : Cache a page as the most recently used one
+    	Parameters :
+    		key: The (path, page number) of the page
+            page: The page bytes
+    	Returns: None
+        '''
+        old = self.pages.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.pages[key] = page
+        self.size += len(page)
+        self.__evict()
+
+    def __evict(self):
+        '''
+    	Purpose : Drop the least recently used pages until the pool fits its
+                  budget. Changed pages go to the spill file rather than
+                  their own file, so nothing reaches a table file before its
+                  table is saved. The page in use is always kept.
+    	Parameters : None
+    	Returns: None
+        '''
+        if self.size <= self.budget:
+            return
+        newest = next(reversed(self.pages))
+        for key in list(self.pages):
+            if self.size <= self.budget:
+                break
+            if key == newest:
+                continue
+            page = self.pages.pop(key)
+            self.size -= len(page)
+            if key in self.writers and key not in self.spilled:
+                self.__spill(key, page)
+
+    def __page(self, key):
+        '''
+    	Purpose : Get a changed page from memory or the spill file, without
+                  caching it
+    	Parameters :
+    		key: The (path, page number) of the page
+    	Returns: The page bytes
+        '''
+        page = self.pages.get(key)
+        return page if page is not None else self.__unspill(key)
+
+    def __spill(self, key, page):
+        '''
+    	Purpose : Write a changed page to the spill file
+    	Parameters :
+    		key: The (path, page number) of the page
+            page: The page bytes
+    	Returns: None
+        '''
+        if self.spill is None:
+            self.spill = tempfile.TemporaryFile()
+        page = bytes(page)
+        # Every page has the same size, so a freed slot fits any of them
+        offset = self.holes.pop() if self.holes else os.fstat(self.spill.fileno()).st_size
+        os.pwrite(self.spill.fileno(), page, offset)
+        self.spilled[key] = (offset, len(page))
+
+    def __unspill(self, key):
+        '''
+    	Purpose : Read a changed page from the spill file
+    	Parameters :
+    		key: The (path, page number) of the page
+    	Returns: The page bytes
+        '''
+        offset, length = self.spilled[key]
+        return os.pread(self.spill.fileno(), length, offset)
+
+    def __free(self, key):
+        '''
+    	Purpose : Free the spill slot of a page, if it has one
+    	Parameters :
+    		key: The (path, page number) of the page
+    	Returns: None
+        '''
+        slot = self.spilled.pop(key, None)
+        if slot is not None:
+            self.holes.append(slot[0])
+
+    def __stamp(self, path):
+        '''
+    	Purpose : Remember the state of a file the cached pages match
+    	Parameters :
+    		path: The path of the file
+    	Returns: None
+        '''
+        self.stamps[path] = self.__fileStamp(path)
+
+    def __fileStamp(self, path):
+        '''
+    	Purpose : Get the size and modification time of a file
+    	Parameters :
+    		path: The path of the file
+    	Returns: A (size, modification time) tuple. None if there is no file.
+        '''
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
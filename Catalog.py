@@ -0,0 +1,115 @@
+################################################################################
+#	File : Catalog.py
+#	Purpose : Per-database catalog file recording the schema, row count,
+#	          file layout and column statistics of every table
+################################################################################
+
+import json
+
+import DurableFile
+
+################################################################################
+#	Class : Catalog
+#	Purpose : Describes the tables of a database so it can be opened, and
+#	          simple questions about its tables answered, without reading
+#	          the table files. An entry is only trusted while the table file
+#	          is in the state it was recorded in.
+################################################################################
+class Catalog(object):
+    '''The catalog of the tables of a database'''
+    # Name of the catalog file in the database directory
+    FILE_NAME = "db.catalog"
+    VERSION = 2
+
+    def __init__(self, dbName):
+        '''
+    	Purpose : Make an empty catalog
+    	Parameters :
+    		dbName: The name of the database
+    	Returns: None
+        '''
+        self.path = './' + dbName + '/' + self.FILE_NAME
+        # Lowercase table name -> entry dictionary
+        self.entries = {}
+
+    @classmethod
+    def load(cls, dbName):
+        '''
+    	Purpose : Read the catalog file of a database
+    	Parameters :
+    		dbName: The name of the database
+    	Returns: The Catalog object, or None if there is no readable catalog
+        '''
+        catalog = cls(dbName)
+        try:
+            with open(catalog.path, "rb") as fid:
+                state = json.loads(fid.read().decode("utf-8"))
+            if state.get("version") != cls.VERSION:
+                return None
+            catalog.entries = state["tables"]
+            for entry in catalog.entries.values():
+                # Stamps are compared with the tuples of Table.getFileStamp
+                if entry["stamp"] is not None:
+                    entry["stamp"] = tuple(entry["stamp"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return catalog
+
+    def save(self, sync=True):
+        '''
+    	Purpose : Write the catalog file. It is written to a new file first,
+                  so a reader sees either the old catalog or the new one.
+    	Parameters :
+    		sync: False to leave syncing the file to a later checkpoint
+    	Returns: None
+        '''
+        state = {"version": self.VERSION, "tables": self.entries}
+        DurableFile.write(self.path, lambda fid: fid.write(json.dumps(state).encode("utf-8")), sync)
+
+    def header(self, tableName):
+        '''
+    	Purpose : Get what the header of a table file holds
+    	Parameters :
+    		tableName: The name of the table
+    	Returns: A (schema line, row count, layout version) tuple, or None if
+                 the table is not in the catalog
+        '''
+        entry = self.entries.get(tableName.lower())
+        if entry is None or entry["name"] != tableName:
+            return None
+        return entry["schema"], entry["rowCount"], entry["layout"]
+
+    def update(self, tables):
+        '''
+    	Purpose : Record the current state of the tables of the database
+    	Parameters :
+    		tables: The Table objects of the database
+    	Returns: True if the catalog changed and should be saved
+        '''
+        entries = {}
+        for table in tables:
+            entry = self.entries.get(table.safeName)
+            # Reading a table leaves its file, and so its entry, as it was
+            if entry is None or entry["stamp"] != table.stamp:
+                entry = self.describe(table)
+            entries[table.safeName] = entry
+        changed = entries != self.entries
+        self.entries = entries
+        return changed
+
+    @classmethod
+    def describe(cls, table):
+        '''
+    	Purpose : Build the catalog entry of a table
+    	Parameters :
+    		table: The Table object
+    	Returns: The entry dictionary
+        '''
+        return {
+            "name": table.tableName,
+            "schema": table.getSchemaString().strip(),
+            "rowCount": table.getRowCount() if table.isLoaded() else table.knownRowCount,
+            "layout": table.layoutVersion,
+            "stamp": table.stamp,
+            "stats": table.getStatistics()
+        }
@@ -0,0 +1,492 @@
+################################################################################
+#	File : ColumnStore.py
+#	Purpose : Column-major storage for the rows of a table
+################################################################################
+
+from Predicate import Conjunction
+
+# NumPy is optional. Without it tables always use row storage.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+################################################################################
+#	Class : NumericColumn
+#	Purpose : An int or float column stored in a NumPy array with a NULL mask
+################################################################################
+class NumericColumn(object):
+    '''An int or float column stored in a NumPy array with a NULL mask'''
+    def __init__(self, castType, values):
+        '''
+    	Purpose : Build the column from a list of values
+    	Parameters :
+    		castType: int or float
+            values: The values of the column. None is NULL.
+    	Returns: None
+        '''
+        self.castType = castType
+        dtype = numpy.int64 if castType is int else numpy.float64
+        self.length = len(values)
+        self.data = numpy.array([0 if v is None else v for v in values], dtype=dtype)
+        self.nulls = numpy.array([v is None for v in values], dtype=bool)
+
+    @staticmethod
+    def fits(castType, value):
+        '''
+    	Purpose : Check if a value can be stored in a numeric column
+    	Parameters :
+    		castType: int or float
+            value: The value to check
+    	Returns: True if the value is NULL or has the column type (and fits
+                 in 64 bits for ints)
+        '''
+        if value is None:
+            return True
+        if type(value) is not castType:
+            return False
+        return castType is float or -2**63 <= value < 2**63
+
+    def accepts(self, value):
+        '''
+    	Purpose : Check if a value can be stored in this column
+    	Parameters :
+    		value: The value to check
+    	Returns: True if the value is NULL or has the column type
+        '''
+        return self.fits(self.castType, value)
+
+    def append(self, value):
+        '''
+    	Purpose : Add a value to the end of the column
+    	Parameters :
+    		value: The value to add
+    	Returns: None
+        '''
+        # Grow the arrays geometrically so appends are amortized O(1)
+        if self.length == len(self.data):
+            capacity = max(16, 2 * len(self.data))
+            self.data = numpy.resize(self.data, capacity)
+            self.nulls = numpy.resize(self.nulls, capacity)
+        self.set(self.length, value)
+        self.length += 1
+
+    def set(self, index, value):
+        '''
+    	Purpose : Overwrite the value at a position
+    	Parameters :
+    		index: The position to overwrite
+            value: The new value
+    	Returns: None
+        '''
+        self.nulls[index] = value is None
+        self.data[index] = 0 if value is None else value
+
+    def get(self, index):
+        '''
+    	Purpose : Read the value at a position
+    	Parameters :
+    		index: The position to read
+    	Returns: The value as a python int / float. None for NULL.
+        '''
+        if self.nulls[index]:
+            return None
+        return self.data[index].item()
+
+    def toList(self, indices=None):
+        '''
+    	Purpose : Read the column, or a selection of it, as python values
+    	Parameters :
+    		indices: Positions to read. All positions if None.
+    	Returns: A list of python values. None for NULL.
+        '''
+        if indices is None:
+            data, nulls = self.data[:self.length], self.nulls[:self.length]
+        else:
+            data, nulls = self.data[indices], self.nulls[indices]
+        values = data.tolist()
+        if nulls.any():
+            values = [None if isNull else v for v, isNull in zip(values, nulls.tolist())]
+        return values
+
+    def compare(self, predicate, value):
+        '''
+    	Purpose : Compare the whole column against a literal in one NumPy
+                  operation
+    	Parameters :
+    		predicate: The Predicate whose operator is used
+            value: The typed literal
+    	Returns: A boolean mask of the matching positions. None if the
+                 literal cannot be compared with NumPy.
+        '''
+        try:
+            result = predicate.compare(self.data[:self.length], value)
+        except (TypeError, OverflowError):
+            return None
+        return numpy.asarray(result, dtype=bool) & ~self.nulls[:self.length]
+
+    def compareColumn(self, predicate, other):
+        '''
+    	Purpose : Compare the whole column against another column
+    	Parameters :
+    		predicate: The Predicate whose operator is used
+            other: The column on the right of the operator
+    	Returns: A boolean mask of the matching positions. None if the other
+                 column is not numeric.
+        '''
+        if not isinstance(other, NumericColumn):
+            return None
+        result = predicate.compare(self.data[:self.length], other.data[:other.length])
+        return numpy.asarray(result, dtype=bool) & ~self.nulls[:self.length] & ~other.nulls[:other.length]
+
+    def fill(self, mask, value):
+        '''
+    	Purpose : Set every selected position to the same value
+    	Parameters :
+    		mask: Boolean mask of the positions to set
+            value: The new value
+    	Returns: None
+        '''
+        self.data[:self.length][mask] = 0 if value is None else value
+        self.nulls[:self.length][mask] = value is None
+
+    def compress(self, keep):
+        '''
+    	Purpose : Drop every position that is not kept
+    	Parameters :
+    		keep: Boolean mask of the positions to keep
+    	Returns: None
+        '''
+        self.data = self.data[:self.length][keep]
+        self.nulls = self.nulls[:self.length][keep]
+        self.length = len(self.data)
+
+################################################################################
+#	Class : DictionaryColumn
+#	Purpose : A column stored as integer codes into a dictionary of distinct
+#	          values. Used for varchar / char columns.
+################################################################################
+class DictionaryColumn(object):
+    '''A column stored as integer codes into a dictionary of distinct values'''
+    NULL_CODE = -1
+
+    def __init__(self, castType, values):
+        '''
+    	Purpose : Build the column from a list of values
+    	Parameters :
+    		castType: The python type of the column
+            values: The values of the column. None is NULL.
+    	Returns: None
+        '''
+        self.castType = castType
+        self.dictionary = []
+        self.lookup = {}
+        self.length = len(values)
+        self.codes = numpy.array([self.__encode(v) for v in values], dtype=numpy.int32)
+
+    def accepts(self, value):
+        '''
+    	Purpose : Check if a value can be stored in this column
+    	Parameters :
+    		value: The value to check
+    	Returns: True, any hashable value can be encoded
+        '''
+        return True
+
+    def append(self, value):
+        '''
+    	Purpose : Add a value to the end of the column
+    	Parameters :
+    		value: The value to add
+    	Returns: None
+        '''
+        if self.length == len(self.codes):
+            self.codes = numpy.resize(self.codes, max(16, 2 * len(self.codes)))
+        self.set(self.length, value)
+        self.length += 1
+
+    def set(self, index, value):
+        '''
+    	Purpose : Overwrite the value at a position
+    	Parameters :
+    		index: The position to overwrite
+            value: The new value
+    	Returns: None
+        '''
+        self.codes[index] = self.__encode(value)
+
+    def get(self, index):
+        '''
+    	Purpose : Read the value at a position
+    	Parameters :
+    		index: The position to read
+    	Returns: The decoded value. None for NULL.
+        '''
+        code = self.codes[index]
+        return None if code == self.NULL_CODE else self.dictionary[code]
+
+    def toList(self, indices=None):
+        '''
+    	Purpose : Read the column, or a selection of it, as python values
+    	Parameters :
+    		indices: Positions to read. All positions if None.
+    	Returns: A list of decoded values. None for NULL.
+        '''
+        codes = self.codes[:self.length] if indices is None else self.codes[indices]
+        dictionary = self.dictionary + [None]
+        return [dictionary[code] for code in codes.tolist()]
+
+    def compare(self, predicate, value):
+        '''
+    	Purpose : Compare the whole column against a literal by checking each
+                  distinct value once and mapping the result through the codes
+    	Parameters :
+    		predicate: The Predicate whose operator is used
+            value: The typed literal
+    	Returns: A boolean mask of the matching positions
+        '''
+        # The extra False entry is what the NULL code (-1) looks up
+        entries = [predicate.test(v, value) for v in self.dictionary] + [False]
+        return numpy.array(entries, dtype=bool)[self.codes[:self.length]]
+
+    def compareColumn(self, predicate, other):
+        '''
+    	Purpose : Compare the whole column against another column
+    	Parameters :
+    		predicate: The Predicate whose operator is used
+            other: The column on the right of the operator
+    	Returns: None, dictionary columns are compared value by value
+        '''
+        return None
+
+    def fill(self, mask, value):
+        '''
+    	Purpose : Set every selected position to the same value
+    	Parameters :
+    		mask: Boolean mask of the positions to set
+            value: The new value
+    	Returns: None
+        '''
+        self.codes[:self.length][mask] = self.__encode(value)
+
+    def compress(self, keep):
+        '''
+    	Purpose : Drop every position that is not kept
+    	Parameters :
+    		keep: Boolean mask of the positions to keep
+    	Returns: None
+        '''
+        self.codes = self.codes[:self.length][keep]
+        self.length = len(self.codes)
+
+    def __encode(self, value):
+        '''
+    	Purpose : Get the code of a value, adding it to the dictionary if new
+    	Parameters :
+    		value: The value to encode
+    	Returns: The integer code of the value
+        '''
+        if value is None:
+            return self.NULL_CODE
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary.append(value)
+            self.lookup[value] = code
+        return code
+
+################################################################################
+#	Class : ColumnStore
+#	Purpose : Stores the rows of a table column by column. Behaves like the
+#	          list of row tuples used by row storage, so Table code can use
+#	          either, and adds column-at-a-time scans and projections.
+################################################################################
+class ColumnStore(object):
+    '''Stores the rows of a table column by column'''
+    def __init__(self, castTypes, rows):
+        '''
+    	Purpose : Build the store from row tuples
+    	Parameters :
+    		castTypes: The python type of every column, in schema order
+            rows: An iterable of row tuples
+    	Returns: None
+        '''
+        rows = list(rows)
+        columns = list(zip(*rows)) if rows else [()] * len(castTypes)
+        self.length = len(rows)
+        self.columns = [self.__newColumn(castType, list(values))
+                        for castType, values in zip(castTypes, columns)]
+
+    @staticmethod
+    def isAvailable():
+        '''
+    	Purpose : Check if column storage can be used
+    	Parameters : None
+    	Returns: True if NumPy is installed
+        '''
+        return numpy is not None
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        '''
+    	Purpose : Iterate over the rows, decoding one column at a time
+    	Parameters : None
+    	Returns: An iterator of row tuples
+        '''
+        return iter(self.project(range(len(self.columns))))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("row index out of range")
+        return tuple(column.get(index) for column in self.columns)
+
+    def __setitem__(self, index, row):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("row index out of range")
+        for position, value in enumerate(row):
+            self.__columnFor(position, value).set(index, value)
+
+    def append(self, row):
+        '''
+    	Purpose : Add a row to the end of the store
+    	Parameters :
+    		row: The row tuple to add
+    	Returns: None
+        '''
+        for position, value in enumerate(row):
+            self.__columnFor(position, value).append(value)
+        self.length += 1
+
+    def column(self, position):
+        '''
+    	Purpose : Read one whole column
+    	Parameters :
+    		position: The position of the column in the schema
+    	Returns: A list of the column's values
+        '''
+        return self.columns[position].toList()
+
+    def mask(self, predicate):
+        '''
+    	Purpose : Evaluate a predicate over whole columns at once
+    	Parameters :
+    		predicate: The compiled Predicate or Conjunction to check
+    	Returns: A NumPy boolean mask with one entry per row
+        '''
+        if isinstance(predicate, Conjunction):
+            # Every condition must hold
+            mask = numpy.ones(self.length, dtype=bool)
+            for condition in predicate.predicates:
+                mask &= self.mask(condition)
+            return mask
+        if not predicate.valid:
+            return numpy.zeros(self.length, dtype=bool)
+        column = self.columns[predicate.position]
+        if predicate.valuePosition is None:
+            result = column.compare(predicate, predicate.value)
+            if result is not None:
+                return result
+            rValues = [predicate.value] * self.length
+        else:
+            result = column.compareColumn(predicate, self.columns[predicate.valuePosition])
+            if result is not None:
+                return result
+            rValues = self.column(predicate.valuePosition)
+
+        # Fall back to checking the values one by one
+        lValues = self.column(predicate.position)
+        return numpy.array([predicate.test(l, r) for l, r in zip(lValues, rValues)], dtype=bool)
+
+    def select(self, predicate):
+        '''
+    	Purpose : Find the rows matching a predicate by scanning only the
+                  columns it references
+    	Parameters :
+    		predicate: The compiled Predicate to check
+    	Returns: A NumPy array of the matching row positions
+        '''
+        return numpy.flatnonzero(self.mask(predicate))
+
+    def positionMask(self, positions):
+        '''
+    	Purpose : Turn a list of row positions into a mask
+    	Parameters :
+    		positions: The row positions to select
+    	Returns: A NumPy boolean mask with one entry per row
+        '''
+        mask = numpy.zeros(self.length, dtype=bool)
+        mask[numpy.asarray(positions, dtype=numpy.int64)] = True
+        return mask
+
+    def assign(self, mask, updates):
+        '''
+    	Purpose : Apply the same updates to every selected row in bulk
+    	Parameters :
+    		mask: Boolean mask of the rows to update. Every row if None.
+            updates: A dictionary mapping column positions to new values
+    	Returns: None
+        '''
+        if mask is None:
+            mask = slice(None)
+        for position, value in list(updates.items()):
+            self.__columnFor(position, value).fill(mask, value)
+
+    def compress(self, keep):
+        '''
+    	Purpose : Delete every row that is not kept in bulk
+    	Parameters :
+    		keep: Boolean mask of the rows to keep
+    	Returns: None
+        '''
+        for column in self.columns:
+            column.compress(keep)
+        self.length = int(numpy.count_nonzero(keep))
+
+    def project(self, positions, selection=None):
+        '''
+    	Purpose : Read some columns of some rows, one column at a time
+    	Parameters :
+    		positions: The positions of the columns to read
+            selection: The row positions to read. All rows if None.
+    	Returns: A list of tuples of the requested values
+        '''
+        if selection is not None:
+            selection = numpy.asarray(selection, dtype=numpy.int64)
+        values = [self.columns[p].toList(selection) for p in positions]
+        if not values:
+            return [()] * (self.length if selection is None else len(selection))
+        return list(zip(*values))
+
+    def __newColumn(self, castType, values):
+        '''
+    	Purpose : Pick the representation of a column
+    	Parameters :
+    		castType: The python type of the column
+            values: The values of the column
+    	Returns: A NumericColumn for int / float columns whose values all fit,
+                 a DictionaryColumn otherwise
+        '''
+        if castType in (int, float) and all(NumericColumn.fits(castType, v) for v in values):
+            return NumericColumn(castType, values)
+        return DictionaryColumn(castType, values)
+
+    def __columnFor(self, position, value):
+        '''
+    	Purpose : Get the column to write a value into, re-encoding it first if
+                  the value does not fit its representation
+    	Parameters :
+    		position: The position of the column
+            value: The value about to be written
+    	Returns: The column object
+        '''
+        column = self.columns[position]
+        if not column.accepts(value):
+            column = DictionaryColumn(column.castType, column.toList())
+            self.columns[position] = column
+        return column
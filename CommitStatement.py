@@ -21,7 +21,10 @@ class CommitStatement(Query):
         ''' 
         if self.database is not None:
             self.database.transactionInProgress = False 
-            self.database.save() 
+            # The changes of the transaction reach the log with one fsync;
+            # the lock files are removed after
+            self.database.commit()
+            self.database.removeUnusedFiles()
 
             if self.database.successfulTransactions > 0:
                 print("Transaction commited.")
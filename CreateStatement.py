@@ -7,8 +7,10 @@
 
 from Query import Query
 import os
+import re
 from Database import Database
 from Table import Table
+from Index import Index
 
 ################################################################################
 #	Class : CreateStatement
@@ -33,8 +35,7 @@ class CreateStatement(Query):
         if self.createType.upper() == "DATABASE" and self.dbName is not None:
             
             # Error if the target directory exists, otherwise create it
-            dirs = next(os.walk("."))[1] 
-            if self.dbName in dirs:
+            if os.path.isdir(self.dbName):
                 print ("!Failed to create database", self.dbName, "because it already exists.")
             else:
                 os.makedirs(self.dbName)
@@ -49,31 +50,94 @@ class CreateStatement(Query):
             # Create table and add it to the currently selected database
             # (If one is selected)
             if self.database.dbName is not None:
-                dirs = os.listdir("./" + self.database.dbName )
                 if self.database.tableInDB(tableName):
                     print ("!Failed to create table", tableName, "because it already exists.")
                 else:
-                    schema = self.__parseSchema(self.attributes[1:])
+                    schema, constraints = self.__parseSchema(self.attributes[1:])
+                    if schema is None:
+                        print ("!Failed to create table", tableName, "because", constraints + ".")
+                        return
                     newTable = Table(self.database.dbName, tableName, True)
                     newTable.setSchema(schema)
+                    # Each constraint is enforced through an index on its column
+                    for column, constraint in list(constraints.items()):
+                        if constraint == Index.PRIMARY_KEY:
+                            newTable.createIndex(tableName + "_pkey", [column], Index.BTREE, constraint)
+                        else:
+                            newTable.createIndex(tableName + "_" + column + "_key", [column], Index.BTREE, constraint)
                     self.database.addTable(newTable)
                     print ("Table", tableName, "created.")
             else:
                 print ("!Failed to create table", tableName, "because no database is selected.")
+        if self.createType.upper() in ["INDEX", "UNIQUE INDEX"] and self.database is not None:
+            self.__createIndex()
+
+    def __createIndex(self):
+        '''
+        Purpose:    Implementation of CREATE [UNIQUE] INDEX name ON
+                    table(column, ...), optionally followed by USING BTREE
+                    or USING HASH.
+        Parameters: None
+        Returns: None
+        '''
+        match = re.match(r"^(\w+)\s+on\s+(\w+)\s*\(\s*(\w+(?:\s*,\s*\w+)*)\s*\)(?:\s+using\s+(\w+))?$",
+                         " ".join(self.attributes).strip(), flags=re.IGNORECASE)
+        if match is None:
+            print ("!Invalid SQL Statement!")
+            return
+        indexName, tableName, columns, kind = match.groups()
+        columns = [column.strip() for column in columns.split(",")]
+        kind = Index.BTREE if kind is None else kind.upper()
+        if kind not in Index.STRUCTURES:
+            print ("!Failed to create index", indexName, "because", kind, "is not BTREE or HASH.")
+            return
+
+        if self.database.dbName is None:
+            print ("!Failed to create index", indexName, "because no database is selected.")
+            return
+        # Index names are unique within a database
+        for table in self.database.tables.values():
+            if indexName.lower() in table.indexes:
+                print ("!Failed to create index", indexName, "because it already exists.")
+                return
+        table = self.database.getTableByName(tableName)
+        if table is None:
+            print ("!Failed to create index", indexName, "because table", tableName, "does not exist.")
+            return
+        # Check for a lock
+        if not self.database.isWritable(table.tableName):
+            print(f"Error: Table {table.tableName} is locked!")
+            return
+        constraint = Index.UNIQUE if self.createType.upper() == "UNIQUE INDEX" else None
+        if table.createIndex(indexName, columns, kind, constraint):
+            print ("Index", indexName, "created.")
 
     def __parseSchema(self, schemaInput):
         '''
         Purpose:    Private helper function.  
-        Parameters: schemaInput: an aray of column names and types.
+        Parameters: schemaInput: an aray of column names and types, each
+                    optionally followed by PRIMARY KEY or UNIQUE.
         Returns:    schema: a dictionary with keys as column names and values
                     as types.
+                    constraints: a dictionary mapping constrained column
+                    names to Index.PRIMARY_KEY or Index.UNIQUE.
+                    (None, reason) if the constraints are invalid.
         '''
         joined = " ".join(schemaInput).strip()
         if(joined.endswith(')')): joined = joined[:-1]
         schemaVals = joined.split(',')
 
         schema = {}
+        constraints = {}
         for val in schemaVals:
             val = val.strip().split()
             schema[val[0]] = val[1] 
-        return schema
+            constraint = " ".join(val[2:]).upper()
+            if constraint == "":
+                continue
+            if constraint not in [Index.PRIMARY_KEY, Index.UNIQUE]:
+                return None, constraint + " is not a supported constraint"
+            if constraint == Index.PRIMARY_KEY and Index.PRIMARY_KEY in constraints.values():
+                return None, "it has more than one primary key"
+            constraints[val[0]] = constraint
+        return schema, constraints
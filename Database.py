@@ -6,6 +6,10 @@
 ################################################################################
 
 from Table import Table
+from Catalog import Catalog
+from WriteAheadLog import WriteAheadLog
+from FileLock import FileLock
+import Settings
 import os
 import glob
 
@@ -15,6 +19,9 @@ import glob
 ################################################################################
 class Database(object):
     '''Models and stores metadata for a SQL database'''
+    # Name of the file statements lock against pages written in place
+    LOCK_FILE = "db.lock"
+
     def __init__(self, dbName=None):
         '''
         Purpose:    Initializer function.  
@@ -24,6 +31,15 @@ class Database(object):
         # Initialize member variables.
         self.dbName = dbName
         self.tables = {}
+        self.catalog = None
+        self.log = None
+        # Lock shared by running statements and taken exclusively while
+        # pages are written to the table files in place
+        self.pageLock = None
+        self.inStatement = False
+        # Names of the tables whose commits are in the log but not written
+        # to their files yet
+        self.deferred = set()
 
         self.transactionInProgress = False
         self.successfulTransactions = 0
@@ -31,35 +47,219 @@ class Database(object):
         # If we know the database name (i.e. it exists already) read in the
         # tables and add them to the Database object.
         if self.dbName is not None:
+            # Pages of transactions committed before a crash are written to
+            # the table files first
+            self.log = WriteAheadLog(self.dbName)
+            self.pageLock = FileLock("./" + self.dbName + "/" + self.LOCK_FILE)
+            recovered = self.checkpoint()
+
+            # Tables the catalog describes are opened without reading their
+            # files. The others, or ones changed since the catalog was
+            # written, have their header read.
+            self.catalog = Catalog.load(self.dbName) or Catalog(self.dbName)
             tablesList = glob.glob(f"./{self.dbName}/*.tbl")
             for entry in tablesList:
                 entry = entry.split("/")[-1]
                 if entry.endswith(".tbl"):
                     entry = entry[0:-4]
-                temp = Table(self.dbName, entry)
+                header = self.catalog.header(entry)
+                temp = Table(self.dbName, entry, False, header)
+                if header is not None and temp.stamp != self.catalog.entries[temp.safeName]["stamp"]:
+                    temp = Table(self.dbName, entry)
                 #Strip off the .tbl extension 
                 self.tables[temp.safeName] = temp 
 
+            for table in self.tables.values():
+                if table.fileName in recovered:
+                    table.repair()
+                    table.save()
+            self.saveCatalog()
+
     def save(self):
         '''
         Purpose:    Saves the Database and all member tables currently in
-                    memory to the disk.  
+                    memory to the disk, and empties the write-ahead log.  
+        Parameters: None
+        Returns: None
+        '''
+        self.commit()
+        if self.dbName is not None:
+            self.checkpoint(Settings.synchronous != Settings.OFF_SYNC)
+        self.removeUnusedFiles()
+
+    def commit(self):
+        '''
+        Purpose:    Save the tables changed since the last commit. Their
+                    changed pages are first appended to the write-ahead log.
+                    With SYNCHRONOUS = FULL the log is synced, so a crash
+                    while the table files are written loses nothing once
+                    this returns. NORMAL leaves the log unsynced and the
+                    pages in memory until the next checkpoint, which syncs
+                    the log before writing them, and OFF writes the table
+                    files without the log.
+        Parameters: None
+        Returns: None
+        '''
+        if self.dbName is None:
+            return
+        # A statement committing gives up its lock first, since it is taken
+        # after the log's by the sessions writing pages
+        self.endStatement()
+        sync = Settings.synchronous != Settings.OFF_SYNC
+        tables = [table for table in self.tables.values() if table.dirty]
+        # Checkpoints of other sessions wait until the pages logged here
+        # are written, so they never empty the log before
+        self.log.begin()
+        try:
+            if sync:
+                rewritten = [table.fileName for table in tables if not table.logChanges(self.log)]
+            else:
+                rewritten = [table.fileName for table in tables]
+            self.log.commit(Settings.synchronous == Settings.FULL_SYNC)
+            # Tables written without the log are written after the
+            # checkpoint, so their older logged pages never replace theirs
+            for table in tables:
+                if table.fileName in rewritten:
+                    self.deferred.discard(table.safeName)
+                else:
+                    self.deferred.add(table.safeName)
+            if rewritten:
+                # Pages logged for a file before it is written without the
+                # log must never be replayed over it
+                self.checkpoint(sync)
+            # The log covers the files written from here on until they are
+            # synced by the next checkpoint
+            self.pageLock.lock(True)
+            try:
+                for table in tables:
+                    if Settings.synchronous != Settings.NORMAL_SYNC or table.fileName in rewritten:
+                        table.save(False)
+                        self.log.written(table.getFiles())
+                        self.deferred.discard(table.safeName)
+            finally:
+                self.pageLock.unlock()
+        finally:
+            self.log.end()
+        self.saveCatalog(False)
+        if rewritten or self.log.size > WriteAheadLog.CHECKPOINT_SIZE:
+            self.checkpoint(sync)
+
+    def checkpoint(self, sync=True):
+        '''
+        Purpose:    Write the tables whose commits were only logged to their
+                    files, after the log is synced, then empty the
+                    write-ahead log. Other sessions see those commits from
+                    then on. On opening the database, this recovers the
+                    commits logged before a crash.
+        Parameters: sync: False to empty the log without waiting for the
+                          disk
+        Returns:    The set of names of the table files whose pages did not
+                    match the log
+        '''
+        self.log.lock(True)
+        self.pageLock.lock(True)
+        try:
+            if self.deferred:
+                # A crash while the pages are written is repaired from the
+                # log, so it must be on disk first
+                if sync:
+                    self.log.sync()
+                for name in self.deferred:
+                    if name in self.tables:
+                        self.tables[name].save(False)
+                        self.log.written(self.tables[name].getFiles())
+                self.deferred = set()
+                self.saveCatalog(False)
+            return self.log.checkpoint(sync)
+        finally:
+            self.pageLock.unlock()
+            self.log.unlock()
+
+    def beginStatement(self):
+        '''
+        Purpose:    Keep other sessions from writing pages to the table files
+                    in place while a statement runs, so it reads the rows of
+                    whole commits. There is no snapshot: statements and those
+                    writes take turns.
+        Parameters: None
+        Returns:    None
+        '''
+        if self.dbName is not None and not self.inStatement:
+            self.pageLock.lock(False)
+            self.inStatement = True
+
+    def endStatement(self):
+        '''
+        Purpose:    Let other sessions write pages again once a statement
+                    started with beginStatement is done
+        Parameters: None
+        Returns:    None
+        '''
+        if self.inStatement:
+            self.pageLock.unlock()
+            self.inStatement = False
+
+    def removeUnusedFiles(self):
+        '''
+        Purpose:    Delete the files of the database directory no table uses,
+                    e.g. those of dropped tables and indexes, and lock files.
+                    Lock and temporary files of other processes still
+                    running are kept.
         Parameters: None
         Returns: None
         '''
-        # Call Table.save() for all tables in the database.
-        for table in self.tables.values():
-            table.save()
-        
         # Delete all files no longer stored in the model 
         if self.dbName is not None:
             dbDir = "./" + self.dbName + "/"
 
-            tableFiles = [tbl.fileName for tbl in self.tables.values()]
+            tableFiles = [Catalog.FILE_NAME, WriteAheadLog.FILE_NAME, WriteAheadLog.SYNC_FILE, self.LOCK_FILE]
+            for tbl in self.tables.values():
+                tableFiles += tbl.getFiles()
             diskFiles = os.listdir(dbDir)
             for filename in diskFiles:
-                if filename not in tableFiles:
-                    os.remove(dbDir + filename)
+                if filename not in tableFiles and not self.__ownedByOtherProcess(filename):
+                    try:
+                        os.remove(dbDir + filename)
+                    except FileNotFoundError:
+                        # Another session removed it first
+                        pass
+
+    def __ownedByOtherProcess(self, filename):
+        '''
+        Purpose:    Check if a file is a lock file (<table>.<pid>) or a
+                    temporary file (<file>.<pid>.new) of another process
+                    that is still running
+        Parameters: filename: The name of the file in the database directory
+        Returns:    True if the file must be kept
+        '''
+        parts = filename.split(".")
+        if parts[-1] == "new" and len(parts) > 2:
+            pid = parts[-2]
+        else:
+            pid = parts[-1]
+        if len(parts) < 2 or not pid.isdigit() or int(pid) == os.getpid():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Running under another user
+            return True
+        return True
+
+    def saveCatalog(self, sync=True):
+        '''
+        Purpose:    Record the saved state of the tables in the catalog file,
+                    if it changed
+        Parameters: sync: False to leave syncing the catalog file to the
+                          next checkpoint of the write-ahead log
+        Returns: None
+        '''
+        if self.dbName is not None and self.catalog.update(self.tables.values()):
+            self.catalog.save(sync)
+            if not sync:
+                self.log.written([Catalog.FILE_NAME])
 
     def addTable(self, newTable):
         '''
@@ -98,8 +298,11 @@ class Database(object):
         '''
         tableName = tableName.lower()
         if self.tableInDB(tableName):
-            tname = self.tables[tableName].tableName 
-            self.tables[tableName] = Table(self.dbName, tname)
+            # Reuse the table unless its file was changed since it was read.
+            # Changes not written to the file yet are kept.
+            table = self.tables[tableName]
+            if table.isStale() and not table.dirty:
+                self.tables[tableName] = Table(self.dbName, table.tableName)
             return self.tables[tableName]
         else:
             return None
@@ -111,15 +314,14 @@ class Database(object):
             tableName: The table name to search for
         Returns: True if the table is writable; False otherwise
         ''' 
-        # Check for a lock file 
+        # Check for a lock file, named after the pid of its owner. Index
+        # files share the table name but are not locks.
         files = glob.glob(f"./{self.dbName}/{tableName}.*")
-        if len(files) > 1:
+        locks = [filename.split('.')[-1] for filename in files]
+        locks = [extension for extension in locks if extension.isdigit()]
+        if len(locks) > 0:
             # Check the pid matches 
             pid = str(os.getpid())
-            for filename in files:
-                extension = filename.split('.')[2]
-                if extension == pid:
-                    return True 
-            return False 
+            return pid in locks
         return True 
         
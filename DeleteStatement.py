@@ -6,6 +6,7 @@
 ################################################################################
 
 from Query import Query 
+from Predicate import Predicate
 
 ################################################################################
 #	Class : DeleteStatement
@@ -52,6 +53,6 @@ class DeleteStatement(Query):
         ''' 
         tableName = queryInput[0] 
 
-        conditions = queryInput[2:]
+        conditions = Predicate.splitConditions(" ".join(queryInput[2:]))
 
         return tableName, conditions
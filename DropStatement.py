@@ -33,8 +33,7 @@ class DropStatement(Query):
         if self.dropType == "DATABASE":
             # Check if the databse already exists. If yes, delete database
             # folder otherwise print error.
-            dirs = next(os.walk("."))[1] 
-            if self.name in dirs:
+            if os.path.isdir(self.name):
                 shutil.rmtree(self.name)
                 print ("Database", self.name, "deleted.")
             else:
@@ -52,6 +51,20 @@ class DropStatement(Query):
                 print ("Table", self.name, "deleted.")
             else:
                 print ("!Failed to delete", self.name, "because it does not exist.")
+
+        elif self.dropType == "INDEX" and self.database is not None:
+
+            # Search every table of the database for the index.
+            for table in list(self.database.tables.values()):
+                if self.name.lower() in table.indexes:
+                    table = self.database.getTableByName(table.tableName)
+                    if table.indexes[self.name.lower()].constraint is not None:
+                        print ("!Failed to delete", self.name, "because it enforces a constraint.")
+                    else:
+                        table.dropIndex(self.name)
+                        print ("Index", self.name, "deleted.")
+                    return
+            print ("!Failed to delete", self.name, "because it does not exist.")
         else:
             print ("!Invalid SQL Statement!")
             
@@ -0,0 +1,131 @@
+################################################################################
+#	File : DurableFile.py
+#	Purpose : Replaces files atomically: a new file is written next to the
+#	          old one, synced, and renamed over it, so a reader or a crash
+#	          sees either the whole old file or the whole new one.
+################################################################################
+
+import os
+
+import Settings
+
+################################################################################
+#	Function : temporaryPath
+#	Purpose : Get the path a new version of a file is written to
+#	Parameters :
+#		path: The path of the file
+#	Returns: The path of the temporary file
+################################################################################
+def temporaryPath(path):
+    '''
+    Purpose : Get the path a new version of a file is written to
+    Parameters :
+        path: The path of the file
+    Returns: The path of the temporary file
+    '''
+    # Named after the process, so writers in other processes never share it
+    return path + "." + str(os.getpid()) + ".new"
+
+################################################################################
+#	Function : replace
+#	Purpose : Put a fully written temporary file in place of a file
+#	Parameters :
+#		tempPath: The path of the temporary file
+#		path: The path of the file to replace
+#		sync: False to leave syncing to a later checkpoint
+#	Returns: None
+################################################################################
+def replace(tempPath, path, sync=True):
+    '''
+    Purpose : Put a fully written temporary file in place of a file. The
+              new data is synced before the rename and the directory after
+              it, unless SYNCHRONOUS is OFF.
+    Parameters :
+        tempPath: The path of the temporary file
+        path: The path of the file to replace
+        sync: False to leave syncing to a later checkpoint
+    Returns: None
+    '''
+    sync = sync and Settings.synchronous != Settings.OFF_SYNC
+    if sync:
+        syncPath(tempPath)
+    os.replace(tempPath, path)
+    if sync:
+        syncPath(os.path.dirname(path) or ".")
+
+################################################################################
+#	Function : write
+#	Purpose : Replace a file with new contents
+#	Parameters :
+#		path: The path of the file
+#		writer: Function writing the new contents to an open binary file
+#		sync: False to leave syncing to a later checkpoint
+#	Returns: None
+################################################################################
+def write(path, writer, sync=True):
+    '''
+    Purpose : Replace a file with new contents
+    Parameters :
+        path: The path of the file
+        writer: Function writing the new contents to an open binary file
+        sync: False to leave syncing to a later checkpoint
+    Returns: None
+    '''
+    tempPath = temporaryPath(path)
+    try:
+        with open(tempPath, "wb") as fid:
+            writer(fid)
+        replace(tempPath, path, sync)
+    finally:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+
+################################################################################
+#	Function : append
+#	Purpose : Add data at the end of a file
+#	Parameters :
+#		path: The path of the file
+#		data: The bytes to add
+#		sync: False to leave syncing to a later checkpoint
+#	Returns: None
+################################################################################
+def append(path, data, sync=True):
+    '''
+    Purpose : Add data at the end of a file with one write, synced unless
+              SYNCHRONOUS is OFF. A crash may leave only part of the data,
+              so readers must check the end of the file.
+    Parameters :
+        path: The path of the file
+        data: The bytes to add
+        sync: False to leave syncing to a later checkpoint
+    Returns: None
+    '''
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if sync and Settings.synchronous != Settings.OFF_SYNC:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+################################################################################
+#	Function : syncPath
+#	Purpose : Wait until a file or directory is on disk
+#	Parameters :
+#		path: The path of the file or directory
+#	Returns: None
+################################################################################
+def syncPath(path):
+    '''
+    Purpose : Wait until a file or directory is on disk
+    Parameters :
+        path: The path of the file or directory
+    Returns: None
+    '''
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
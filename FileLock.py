@@ -0,0 +1,77 @@
+################################################################################
+#	File : FileLock.py
+#	Purpose : Shared and exclusive locks on a file, kept apart between the
+#	          sessions of a database whatever process they run in
+################################################################################
+
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Without file locks, sessions sharing a database are not coordinated
+    fcntl = None
+
+################################################################################
+#	Class : FileLock
+#	Purpose : Holds an flock on a file through a descriptor of its own, so
+#	          every FileLock object, in this process or another, is kept
+#	          apart from the others. Locks taken on one object nest, and the
+#	          strongest one taken is held.
+################################################################################
+class FileLock(object):
+    '''A shared or exclusive lock on a file'''
+    def __init__(self, path):
+        '''
+    	Purpose : Open the file to lock, making it if needed
+    	Parameters :
+    		path: The path of the file
+    	Returns: None
+        '''
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        # Lock modes taken and not released yet, innermost last, and the
+        # lock held on the file
+        self.locks = []
+        self.held = None
+
+    def __del__(self):
+        if getattr(self, "fd", None) is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def lock(self, exclusive):
+        '''
+    	Purpose : Lock the file until unlock is called
+    	Parameters :
+    		exclusive: True to keep every other lock out, False to only keep
+                       out exclusive ones
+    	Returns: None
+        '''
+        self.locks.append(exclusive)
+        self.__hold()
+
+    def unlock(self):
+        '''
+    	Purpose : Release the last lock taken
+    	Parameters : None
+    	Returns: None
+        '''
+        self.locks.pop()
+        self.__hold()
+
+    def __hold(self):
+        '''
+    	Purpose : Hold the strongest lock taken on the file
+    	Parameters : None
+    	Returns: None
+        '''
+        if not self.locks:
+            mode = None
+        else:
+            mode = "EX" if any(self.locks) else "SH"
+        if mode == self.held or fcntl is None:
+            return
+        flags = {None: fcntl.LOCK_UN, "SH": fcntl.LOCK_SH, "EX": fcntl.LOCK_EX}
+        fcntl.flock(self.fd, flags[mode])
+        self.held = mode
@@ -0,0 +1,718 @@
+################################################################################
+#	File : Index.py
+#	Purpose : Models a secondary index on a column of a table
+################################################################################
+
+import json
+import os
+from bisect import bisect_left, bisect_right
+
+import Pipeline
+import DurableFile
+from BTree import BTree
+from Predicate import Conjunction
+
+################################################################################
+#	Class : HashMap
+#	Purpose : Unordered map used by hash indexes, with the same interface as
+#	          BTree for the operations a hash index supports
+################################################################################
+class HashMap(object):
+    '''Maps each key to a list of values with O(1) lookups'''
+    def __init__(self, items=None):
+        self.buckets = dict(items) if items is not None else {}
+
+    @classmethod
+    def fromItems(cls, items):
+        '''
+    	Purpose : Build a map from items
+    	Parameters :
+    		items: A list of (key, list of values) pairs with unique keys
+    	Returns: A HashMap holding the items
+        '''
+        return cls((key, list(values)) for key, values in items)
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def get(self, key):
+        '''
+    	Purpose : Find the values stored under a key
+    	Parameters :
+    		key: The key to find
+    	Returns: The list of values. An empty list if the key is not stored.
+        '''
+        return self.buckets.get(key, [])
+
+    def insert(self, key, value):
+        '''
+    	Purpose : Add a value under a key
+    	Parameters :
+    		key: The key
+            value: The value to add to the key's list
+    	Returns: None
+        '''
+        self.buckets.setdefault(key, []).append(value)
+
+    def remove(self, key, value):
+        '''
+    	Purpose : Remove a value from a key
+    	Parameters :
+    		key: The key
+            value: The value to remove from the key's list
+    	Returns: True if the value was found
+        '''
+        values = self.buckets.get(key)
+        if values is None or value not in values:
+            return False
+        values.remove(value)
+        if not values:
+            del self.buckets[key]
+        return True
+
+    def items(self):
+        '''
+    	Purpose : Walk every key
+    	Parameters : None
+    	Returns: An iterable of (key, list of values) pairs
+        '''
+        return self.buckets.items()
+
+################################################################################
+#	Class : Index
+#	Purpose : Maps the values of one or more columns to the positions of the
+#	          rows that hold them, so conditions on the columns do not need a
+#	          full scan. Stored in its own file next to the table file.
+#	          Deleted rows are noted as gaps in the positions, so a delete
+#	          does not renumber every entry; the entries are renumbered once
+#	          enough gaps build up.
+################################################################################
+class Index(object):
+    '''Maps the values of columns to the positions of the rows holding them'''
+    BTREE = "BTREE"
+    HASH = "HASH"
+
+    # Constraints an index can enforce 
+    UNIQUE = "UNIQUE"
+    PRIMARY_KEY = "PRIMARY KEY"
+
+    # Structure holding the entries of each type of index 
+    STRUCTURES = {
+        BTREE: BTree,
+        HASH: HashMap
+    }
+
+    # Operators each type of index can answer: an ordered index answers
+    # point and range conditions, a hash index only equality
+    OPERATORS = {
+        BTREE: ["=", "<", ">", "<=", ">="],
+        HASH: ["="]
+    }
+
+    # A composite key holds one (tag, value) pair per column, so NULLs and
+    # values that could not be casted are indexed too and sort apart from
+    # the typed values: NULL < typed values < other values < MAX_TAG
+    NULL_TAG = 0
+    VALUE_TAG = 1
+    OTHER_TAG = 2
+    MAX_TAG = 3
+
+    # Smallest number of gaps kept before the entries are renumbered. More
+    # are kept for large indexes, up to the square root of their size.
+    COMPACT_GAPS = 64
+
+    # Changes appended to an index file, replayed in order when it is read
+    ADD_CHANGE = "add"
+    REMOVE_CHANGE = "remove"
+    DELETE_CHANGE = "delete"
+
+    def __init__(self, table, name, columns, kind=BTREE, constraint=None):
+        '''
+    	Purpose : Make an index that is built from the table on first use
+    	Parameters :
+    		table: The indexed Table object
+            name: The name of the index
+            columns: The list of indexed columns, most significant first
+            kind: The type of index
+            constraint: Index.UNIQUE or Index.PRIMARY_KEY to enforce on the
+                        column. None for a plain index.
+    	Returns: None
+        '''
+        self.table = table
+        self.name = name
+        self.columns = list(columns)
+        self.kind = kind
+        self.constraint = constraint
+        self.entries = None
+        # Sorted positions, as stored in the entries, of rows deleted since
+        # the entries were last renumbered, and the position each gap has
+        # among the rows left (gaps[i] - i)
+        self.gaps = []
+        self.offsets = []
+        self.path = None
+        # Stamp of the table file the index file was written for
+        self.stamp = None
+        # Changes made since the index file was written, appended to it
+        # when the index is next saved, or None if the file must be
+        # written again in full
+        self.changes = None
+        # (inode, size) of the index file as last read or written, and
+        # the size of its header and entries, written in full
+        self.fileState = None
+        self.fullSize = 0
+        self.dirty = True
+
+    def getFileName(self):
+        '''
+    	Purpose : Get the name of the file the index is stored in
+    	Parameters : None
+    	Returns: <table name>.<index name>.idx
+        '''
+        return self.table.tableName + "." + self.name.lower() + ".idx"
+
+    @classmethod
+    def load(cls, table, path):
+        '''
+    	Purpose : Read the header of an index file. The entries are only read
+                  when the index is first used.
+    	Parameters :
+    		table: The indexed Table object
+            path: The path of the index file
+    	Returns: The Index object, or None if the file cannot be read or an
+                 indexed column no longer exists
+        '''
+        try:
+            with open(path, "rb") as fid:
+                line = fid.readline()
+                header = json.loads(line.decode("utf-8"))
+                stamp = cls.__readStamp(fid)
+                stat = os.fstat(fid.fileno())
+            columns = [str(column) for column in header["columns"]]
+            kind, constraint = header["kind"], header["constraint"]
+            index = cls(table, str(header["name"]), columns, kind, constraint)
+            fullSize = len(line) + int(header["size"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if kind not in cls.STRUCTURES or any(column not in table.schema for column in columns):
+            return None
+        if stamp is not None and stamp == table.getFileStamp():
+            index.path = path
+            index.stamp = stamp
+            index.changes = []
+            index.fileState = (stat.st_ino, stat.st_size)
+            index.fullSize = fullSize
+            index.dirty = False
+        else:
+            # The table was written without the index: it is out of date
+            index.rebuild()
+        return index
+
+    def save(self, path, sync=True):
+        '''
+    	Purpose : Write the index to a file if it changed since it was read,
+                  or if the table file was written since. The changes made
+                  since the file was written are appended to it, unless they
+                  would make it more than twice its size written in full.
+    	Parameters :
+    		path: The path of the index file
+            sync: False to leave syncing the file to a later checkpoint
+    	Returns: None
+        '''
+        stamp = self.table.getFileStamp()
+        if not self.dirty and self.path == path and self.stamp == stamp and os.path.exists(path):
+            return
+        data = None
+        if self.changes is not None and self.path == path:
+            data = self.__line({"changes": self.changes}) if self.changes else b""
+            data += self.__line({"stamp": stamp})
+        if data is not None and self.__canAppend(path, len(data)):
+            DurableFile.append(path, data, sync)
+            self.fileState = (self.fileState[0], self.fileState[1] + len(data))
+        else:
+            self.__write(path, stamp, sync)
+        self.path = path
+        self.stamp = stamp
+        self.changes = []
+        self.dirty = False
+
+    def __canAppend(self, path, length):
+        '''
+    	Purpose : Check if the changes to the index can be appended to its
+                  file
+    	Parameters :
+    		path: The path of the index file
+            length: The number of bytes to append
+    	Returns: True if the file is the one last read or written by this
+                 index, untouched since, and would not grow past twice its
+                 size written in full
+        '''
+        if self.fileState is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_size) == self.fileState and stat.st_size + length <= 2 * self.fullSize
+
+    def __write(self, path, stamp, sync):
+        '''
+    	Purpose : Write the whole index to a file
+    	Parameters :
+    		path: The path of the index file
+            stamp: The stamp of the table file
+            sync: False to leave syncing the file to a later checkpoint
+    	Returns: None
+        '''
+        # The file holds the positions the rows have now
+        self.__compact(self.getEntries())
+        entries = self.__line([[key, rowIds] for key, rowIds in self.getEntries().items()])
+        header = self.__line({
+            "name": self.name,
+            "columns": self.columns,
+            "kind": self.kind,
+            "constraint": self.constraint,
+            "size": len(entries)
+        })
+        def writer(fid):
+            # One line for the header and one for the entries, then the
+            # state of the table file they were built from. Later saves
+            # append their changes and a new stamp line.
+            fid.write(header)
+            fid.write(entries)
+            fid.write(self.__line({"stamp": stamp}))
+        # Readers of the old file never see it half written
+        DurableFile.write(path, writer, sync)
+        stat = os.stat(path)
+        self.fileState = (stat.st_ino, stat.st_size)
+        self.fullSize = len(header) + len(entries)
+
+    def getEntries(self):
+        '''
+    	Purpose : Get the index entries, reading them from the index file or
+                  building them from the table the first time
+    	Parameters : None
+    	Returns: A BTree or HashMap object, depending on the type of index
+        '''
+        if self.entries is None:
+            entries = None
+            if self.path is not None:
+                try:
+                    entries = self.__read()
+                except (OSError, ValueError, KeyError, TypeError, IndexError):
+                    entries = None
+            if entries is not None:
+                self.entries = entries
+            else:
+                # The file was written over or cannot be read
+                self.rebuild()
+        return self.entries
+
+    def __read(self):
+        '''
+    	Purpose : Read the entries of the index file and replay the changes
+                  appended to it
+    	Parameters : None
+    	Returns: A BTree or HashMap object, or None if the file is no longer
+                 the one the index was loaded from
+        '''
+        with open(self.path, "rb") as fid:
+            stat = os.fstat(fid.fileno())
+            lines = fid.read().split(b"\n")
+        if (stat.st_ino, stat.st_size) != self.fileState or lines[-1] != b"":
+            return None
+        records = [json.loads(line.decode("utf-8")) for line in lines[1:-1]]
+        if tuple(records[-1]["stamp"]) != self.stamp:
+            return None
+        entries = self.STRUCTURES[self.kind].fromItems(
+            [(self.__decodeKey(key), rowIds) for key, rowIds in records[0]])
+        # The changes hold the positions the rows had when they were made
+        self.gaps, self.offsets = [], []
+        for record in records[1:]:
+            for change in record.get("changes", []):
+                if change[0] == self.DELETE_CHANGE:
+                    self.__delete(entries, change[1])
+                elif change[0] == self.ADD_CHANGE:
+                    entries.insert(self.__decodeKey(change[1]), self.__stored(change[2]))
+                else:
+                    entries.remove(self.__decodeKey(change[1]), self.__stored(change[2]))
+        return entries
+
+    def rebuild(self):
+        '''
+    	Purpose : Build the index entries from the rows of the table
+    	Parameters : None
+    	Returns: None
+        '''
+        positions = [self.table.attrIndex[column] for column in self.columns]
+        castTypes = self.__castTypes()
+        groups = {}
+        rowId = 0
+        for batch in Pipeline.scan(self.table, positions=positions):
+            for values in batch:
+                key = self.__key(values, castTypes)
+                if key is not None:
+                    groups.setdefault(key, []).append(rowId)
+                rowId += 1
+
+        items = list(groups.items())
+        if self.kind == self.BTREE:
+            items.sort(key=lambda item: item[0])
+        self.entries = self.STRUCTURES[self.kind].fromItems(items)
+        self.gaps, self.offsets = [], []
+        self.changes = None
+        self.dirty = True
+
+    def add(self, row, rowId):
+        '''
+    	Purpose : Add a row to the index
+    	Parameters :
+    		row: The row tuple
+            rowId: The position of the row
+    	Returns: None
+        '''
+        entries = self.getEntries()
+        key = self.keyOf(row)
+        if key is not None:
+            entries.insert(key, self.__stored(rowId))
+            self.__change([self.ADD_CHANGE, key, rowId])
+        self.dirty = True
+
+    def remove(self, row, rowId):
+        '''
+    	Purpose : Remove a row from the index
+    	Parameters :
+    		row: The row tuple as it was when it was indexed
+            rowId: The position of the row
+    	Returns: None
+        '''
+        entries = self.getEntries()
+        key = self.keyOf(row)
+        if key is not None:
+            entries.remove(key, self.__stored(rowId))
+            self.__change([self.REMOVE_CHANGE, key, rowId])
+        self.dirty = True
+
+    def delete(self, rowIds):
+        '''
+    	Purpose : Account for rows deleted from the table: their positions
+                  become gaps, so the rows after them move up without their
+                  entries being rewritten
+    	Parameters :
+    		rowIds: The sorted positions the deleted rows had
+    	Returns: None
+        '''
+        if not rowIds:
+            return
+        self.__delete(self.getEntries(), rowIds)
+        self.__change([self.DELETE_CHANGE, list(rowIds)])
+        self.dirty = True
+
+    def __delete(self, entries, rowIds):
+        '''
+    	Purpose : Note deleted rows as gaps, renumbering the entries once
+                  there are too many
+    	Parameters :
+    		entries: The BTree or HashMap holding the entries
+            rowIds: The sorted positions the deleted rows had
+    	Returns: None
+        '''
+        self.gaps = sorted(self.gaps + [self.__stored(rowId) for rowId in rowIds])
+        self.offsets = [gap - i for i, gap in enumerate(self.gaps)]
+        if len(self.gaps) > max(self.COMPACT_GAPS, int(len(entries) ** 0.5)):
+            self.__compact(entries)
+
+    def __compact(self, entries):
+        '''
+    	Purpose : Remove the entries of deleted rows and give the others their
+                  positions in the table again
+    	Parameters :
+    		entries: The BTree or HashMap holding the entries
+    	Returns: None
+        '''
+        if not self.gaps:
+            return
+        deleted = set(self.gaps)
+        removed = [(key, rowId) for key, values in entries.items() for rowId in values if rowId in deleted]
+        for key, rowId in removed:
+            entries.remove(key, rowId)
+        first = self.gaps[0]
+        for key, values in entries.items():
+            # Only the positions after the first deleted row change
+            if max(values) > first:
+                values[:] = [rowId - bisect_left(self.gaps, rowId) for rowId in values]
+        self.gaps, self.offsets = [], []
+
+    def __stored(self, rowId):
+        '''
+    	Purpose : Get the position a row is stored under in the entries
+    	Parameters :
+    		rowId: The position of the row in the table
+    	Returns: The stored position, counting the gaps before it
+        '''
+        return rowId + bisect_right(self.offsets, rowId)
+
+    def __positions(self, stored):
+        '''
+    	Purpose : Get the positions in the table of stored positions
+    	Parameters :
+    		stored: A list of positions stored in the entries
+    	Returns: The list of positions of the rows not deleted
+        '''
+        if not self.gaps:
+            return stored
+        positions = []
+        for rowId in stored:
+            i = bisect_left(self.gaps, rowId)
+            if i == len(self.gaps) or self.gaps[i] != rowId:
+                positions.append(rowId - i)
+        return positions
+
+    def __found(self, items):
+        '''
+    	Purpose : Turn the stored positions of entries found into positions
+                  in the table
+    	Parameters :
+    		items: An iterable of (key, stored positions) pairs
+    	Returns: A generator of (key, row positions) pairs, without keys
+                 whose rows were all deleted
+        '''
+        for key, stored in items:
+            rowIds = self.__positions(stored)
+            if rowIds:
+                yield key, rowIds
+
+    def __change(self, change):
+        '''
+    	Purpose : Note a change to append to the index file on the next save
+    	Parameters :
+    		change: A [kind, ...] list of an ADD, REMOVE or DELETE change
+    	Returns: None
+        '''
+        if self.changes is not None:
+            self.changes.append(change)
+
+    def keyOf(self, row):
+        '''
+    	Purpose : Get the key a row is indexed under
+    	Parameters :
+    		row: The row tuple
+    	Returns: The key. None if the row is not indexed.
+        '''
+        values = [row[self.table.attrIndex[column]] for column in self.columns]
+        return self.__key(values, self.__castTypes())
+
+    def keyValues(self, key):
+        '''
+    	Purpose : Get back the column values a key was built from
+    	Parameters :
+    		key: A key of the index
+    	Returns: The list of values, in the order of the indexed columns
+        '''
+        if len(self.columns) == 1:
+            return [key]
+        return [part[1] if len(part) > 1 else None for part in key]
+
+    def match(self, value):
+        '''
+    	Purpose : Find the rows whose indexed column equals a value, e.g. to
+                  probe a single column index with the join key of another
+                  table
+    	Parameters :
+    		value: The value to find
+    	Returns: The positions of the matching rows, in no particular order
+        '''
+        if value is None or len(self.columns) != 1:
+            return []
+        try:
+            return self.positions(value)
+        except TypeError:
+            # A value of another type cannot be ordered against the keys
+            return []
+
+    def positions(self, key):
+        '''
+    	Purpose : Find the rows indexed under a key
+    	Parameters :
+    		key: A key of the index, e.g. from keyOf
+    	Returns: The positions of the rows, in no particular order
+        '''
+        return self.__positions(self.getEntries().get(key))
+
+    def lookup(self, predicate):
+        '''
+    	Purpose : Find the rows matching a condition with the index
+    	Parameters :
+    		predicate: A compiled Predicate or Conjunction on the table
+    	Returns: The sorted positions of the rows matching the conditions the
+                 index can answer (the others are not checked), or None if
+                 the index cannot answer any of them
+        '''
+        result = self.search(Conjunction.of(predicate))
+        if result is None:
+            return None
+        items, residual = result
+        return sorted(rowId for key, rowIds in items for rowId in rowIds)
+
+    def search(self, predicates):
+        '''
+    	Purpose : Find the index entries matching some conditions. Equality
+                  conditions on a leading run of the indexed columns fix a
+                  key prefix, then a B-tree can bound the next column with
+                  range conditions.
+    	Parameters :
+    		predicates: A list of compiled Predicate objects that must all hold
+    	Returns: (entries, residual) where entries is an iterable of (key,
+                 row positions) pairs and residual is the list of conditions
+                 the index did not check. None if no condition can be
+                 answered by the index.
+        '''
+        castTypes = dict(zip(self.columns, self.__castTypes()))
+        usable = [p for p in predicates if p.valid and p.valuePosition is None
+                  and p.operator in self.OPERATORS[self.kind]
+                  and p.column in castTypes and isinstance(p.value, castTypes[p.column])]
+
+        prefix, used = [], []
+        low, high, lowInclusive, highInclusive = None, None, True, True
+        for column in self.columns:
+            equal = [p for p in usable if p.column == column and p.operator == "="]
+            if equal:
+                prefix.append(equal[0].value)
+                used.append(equal[0])
+                continue
+            for p in usable:
+                if p.column != column or p.operator == "=":
+                    continue
+                used.append(p)
+                # Keep the tightest bound on each side
+                inclusive = p.operator in ["<=", ">="]
+                if p.operator in [">", ">="]:
+                    if low is None or p.value > low or (p.value == low and not inclusive):
+                        low, lowInclusive = p.value, inclusive
+                elif high is None or p.value < high or (p.value == high and not inclusive):
+                    high, highInclusive = p.value, inclusive
+            break
+
+        if not used:
+            return None
+        if self.kind == self.HASH and len(prefix) < len(self.columns):
+            return None
+        residual = [p for p in predicates if not any(p is u for u in used)]
+        return self.__found(self.__entriesFor(prefix, low, high, lowInclusive, highInclusive)), residual
+
+    def __entriesFor(self, prefix, low, high, lowInclusive, highInclusive):
+        '''
+    	Purpose : Walk the entries under a key prefix and within bounds on
+                  the next column
+    	Parameters :
+    		prefix: The values of the leading columns
+            low, high: The bounds of the next column. Unbounded if None.
+            lowInclusive, highInclusive: Whether each bound is included
+    	Returns: An iterable of (key, row positions) pairs
+        '''
+        entries = self.getEntries()
+        ranged = low is not None or high is not None
+        if len(self.columns) == 1:
+            if not ranged:
+                rowIds = entries.get(prefix[0])
+                return [(prefix[0], rowIds)] if rowIds else []
+            return entries.range(low, high, lowInclusive, highInclusive)
+
+        key = tuple((self.VALUE_TAG, value) for value in prefix)
+        if len(prefix) == len(self.columns):
+            rowIds = entries.get(key)
+            return [(key, rowIds)] if rowIds else []
+        if not ranged:
+            # Every key starting with the prefix, NULLs included
+            return entries.range(key, key + ((self.MAX_TAG,),))
+
+        # A shorter tuple sorts before every tuple it starts, so tagging the
+        # bound with MAX_TAG puts it after every key holding that value
+        if low is None:
+            lowKey = key + ((self.VALUE_TAG,),)
+        elif lowInclusive:
+            lowKey = key + ((self.VALUE_TAG, low),)
+        else:
+            lowKey = key + ((self.VALUE_TAG, low), (self.MAX_TAG,))
+        if high is None:
+            highKey, highInclusive = key + ((self.OTHER_TAG,),), False
+        elif highInclusive:
+            highKey = key + ((self.VALUE_TAG, high), (self.MAX_TAG,))
+        else:
+            highKey = key + ((self.VALUE_TAG, high),)
+        return entries.range(lowKey, highKey, True, highInclusive)
+
+    def __key(self, values, castTypes):
+        '''
+    	Purpose : Build the key of some column values
+    	Parameters :
+    		values: The values of the indexed columns
+            castTypes: The python types of the indexed columns
+    	Returns: The value itself for a single column index, None if it is
+                 NULL or not of the column type (it never matches a point or
+                 range condition, so it is not indexed). A tuple of (tag,
+                 value) pairs for a composite index.
+        '''
+        if len(values) == 1:
+            return values[0] if isinstance(values[0], castTypes[0]) else None
+        key = []
+        for value, castType in zip(values, castTypes):
+            if value is None:
+                key.append((self.NULL_TAG,))
+            elif isinstance(value, castType):
+                key.append((self.VALUE_TAG, value))
+            else:
+                key.append((self.OTHER_TAG, value))
+        return tuple(key)
+
+    def __castTypes(self):
+        '''
+    	Purpose : Get the python types of the indexed columns
+    	Parameters : None
+    	Returns: A list of python types
+        '''
+        return [self.table.getType(self.table.schema[column]) for column in self.columns]
+
+    def __decodeKey(self, key):
+        '''
+    	Purpose : Turn a key read from an index file back into the key it was
+                  written from
+    	Parameters :
+    		key: The key decoded from JSON
+    	Returns: The key. The (tag, value) pairs of a composite key are
+                 tuples again.
+        '''
+        if len(self.columns) == 1:
+            return key
+        return tuple(tuple(part) for part in key)
+
+    @staticmethod
+    def __line(value):
+        '''
+    	Purpose : Encode a value as a line of an index file
+    	Parameters :
+    		value: A value made of lists, dictionaries, numbers, strings and
+                   None
+    	Returns: The line as bytes
+        '''
+        return (json.dumps(value) + "\n").encode("utf-8")
+
+    @staticmethod
+    def __readStamp(fid):
+        '''
+    	Purpose : Read the stamp of the table file an index file was written
+                  for, from the last line of the file
+    	Parameters :
+    		fid: The index file, opened for reading in binary mode
+    	Returns: A (size, modification time) tuple, or None if the last line
+                 is not a whole stamp line
+        '''
+        size = fid.seek(0, os.SEEK_END)
+        fid.seek(max(0, size - 4096))
+        lines = fid.read().split(b"\n")
+        if len(lines) < 2 or lines[-1] != b"":
+            return None
+        try:
+            stamp = json.loads(lines[-2].decode("utf-8"))["stamp"]
+            return tuple(stamp) if stamp is not None else None
+        except (ValueError, KeyError, TypeError):
+            return None
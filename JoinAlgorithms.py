@@ -0,0 +1,306 @@
+################################################################################
+#	File : JoinAlgorithms.py
+#	Purpose : Join operators used to match the rows of two tables
+################################################################################
+
+from bisect import bisect_left, bisect_right
+
+import Joins
+
+# Every input is a list of (key, item) pairs where key is the already casted
+# join column value. Rows whose key could not be casted must be left out.
+# The keys of an input all have the type of its join column, but the two
+# inputs may not: an int column can be joined with a varchar one.
+
+BAND_OPERATORS = ["<", ">", "<=", ">=", "!=", "<>"]
+
+################################################################################
+#	Function : chooseAlgorithm
+#	Purpose : Pick the join algorithm for a join condition
+#	Parameters : 
+#		operator: The operator of the join condition as a string
+#		left: The left input
+#		right: The right input
+#	Returns: One of Joins.HASH_JOIN, Joins.MERGE_JOIN, Joins.BAND_JOIN or None
+#	         if the operator is not supported
+################################################################################
+def chooseAlgorithm(operator, left, right):
+    ''' 
+    Purpose : Pick the join algorithm for a join condition
+    Parameters : 
+        operator: The operator of the join condition as a string
+        left: The left input
+        right: The right input
+    Returns: One of Joins.HASH_JOIN, Joins.MERGE_JOIN, Joins.BAND_JOIN or None
+             if the operator is not supported
+    ''' 
+    # Keys that cannot be ordered against each other are only ever
+    # compared for equality
+    ordered = isComparable(left, right)
+    if operator == "=":
+        # Inputs that are already in key order can be merged without
+        # building a hash table 
+        if ordered and isSorted(left) and isSorted(right):
+            return Joins.MERGE_JOIN
+        return Joins.HASH_JOIN
+    if operator in BAND_OPERATORS and ordered:
+        return Joins.BAND_JOIN
+    return None
+
+################################################################################
+#	Function : join
+#	Purpose : Match two inputs with the algorithm suited to the operator
+#	Parameters : 
+#		left: The left input
+#		operator: The operator of the join condition as a string
+#		right: The right input
+#	Returns: A generator of (left item, right item) pairs that satisfy
+#	         "left key <operator> right key"
+################################################################################
+def join(left, operator, right):
+    ''' 
+    Purpose : Match two inputs with the algorithm suited to the operator
+    Parameters : 
+        left: The left input
+        operator: The operator of the join condition as a string
+        right: The right input
+    Returns: A generator of (left item, right item) pairs that satisfy
+             "left key <operator> right key"
+    ''' 
+    algorithm = chooseAlgorithm(operator, left, right)
+    if algorithm == Joins.HASH_JOIN:
+        return hashJoin(left, right)
+    if algorithm == Joins.MERGE_JOIN:
+        return mergeJoin(left, right)
+    if algorithm == Joins.BAND_JOIN:
+        return bandJoin(left, operator, right)
+    return iter([])
+
+################################################################################
+#	Function : hashJoin
+#	Purpose : Equi-join two inputs, building a hash table on the smaller one
+#	Parameters : 
+#		left: The left input
+#		right: The right input
+#	Returns: A generator of matching (left item, right item) pairs
+################################################################################
+def hashJoin(left, right):
+    ''' 
+    Purpose : Equi-join two inputs, building a hash table on the smaller one
+    Parameters : 
+        left: The left input
+        right: The right input
+    Returns: A generator of matching (left item, right item) pairs
+    ''' 
+    buildLeft = len(left) <= len(right)
+    build, probe = (left, right) if buildLeft else (right, left)
+
+    hashTable = {}
+    for key, item in build:
+        hashTable.setdefault(key, []).append(item)
+
+    for key, item in probe:
+        for match in hashTable.get(key, []):
+            yield (match, item) if buildLeft else (item, match)
+
+################################################################################
+#	Function : mergeJoin
+#	Purpose : Equi-join two inputs by merging them in key order
+#	Parameters : 
+#		left: The left input
+#		right: The right input
+#	Returns: A generator of matching (left item, right item) pairs
+################################################################################
+def mergeJoin(left, right):
+    ''' 
+    Purpose : Equi-join two inputs by merging them in key order
+    Parameters : 
+        left: The left input
+        right: The right input
+    Returns: A generator of matching (left item, right item) pairs
+    ''' 
+    if not isSorted(left):
+        left = sorted(left, key=lambda pair: pair[0])
+    if not isSorted(right):
+        right = sorted(right, key=lambda pair: pair[0])
+
+    i, j = 0, 0
+    while i < len(left) and j < len(right):
+        lKey, rKey = left[i][0], right[j][0]
+        if lKey < rKey:
+            i += 1
+        elif lKey > rKey:
+            j += 1
+        else:
+            # Find the run of equal keys on the right and pair it with
+            # every left item that has the same key
+            end = j
+            while end < len(right) and right[end][0] == lKey:
+                end += 1
+            while i < len(left) and left[i][0] == lKey:
+                for k in range(j, end):
+                    yield left[i][1], right[k][1]
+                i += 1
+            j = end
+
+################################################################################
+#	Function : bandJoin
+#	Purpose : Join two inputs on an inequality by sorting the right input and
+#	          binary searching the band of matches for each left key
+#	Parameters : 
+#		left: The left input
+#		operator: The operator of the join condition as a string
+#		right: The right input
+#	Returns: A generator of matching (left item, right item) pairs
+################################################################################
+def bandJoin(left, operator, right):
+    ''' 
+    Purpose : Join two inputs on an inequality by sorting the right input and
+              binary searching the band of matches for each left key
+    Parameters : 
+        left: The left input
+        operator: The operator of the join condition as a string
+        right: The right input
+    Returns: A generator of matching (left item, right item) pairs
+    ''' 
+    for lItem, matches in probe(left, operator, right):
+        for rItem in matches:
+            yield lItem, rItem
+
+################################################################################
+#	Function : probe
+#	Purpose : Find the matches of every left item, keeping the left order.
+#	          Used by outer joins, which must also see the unmatched items.
+#	Parameters : 
+#		left: The left input, which may contain items with a None key. Any
+#		      iterable, so it can be streamed.
+#		operator: The operator of the join condition as a string
+#		right: The right input
+#		lookup: Optional function mapping a left key to its matches, e.g.
+#		        an index on the right side. Built from right if None.
+#	Returns: A generator of (left item, list of right items) pairs
+################################################################################
+def probe(left, operator, right, lookup=None):
+    ''' 
+    Purpose : Find the matches of every left item, keeping the left order.
+              Used by outer joins, which must also see the unmatched items.
+    Parameters : 
+        left: The left input, which may contain items with a None key. Any
+              iterable, so it can be streamed.
+        operator: The operator of the join condition as a string
+        right: The right input
+        lookup: Optional function mapping a left key to its matches, e.g.
+                an index on the right side. Built from right if None.
+    Returns: A generator of (left item, list of right items) pairs
+    ''' 
+    if lookup is None:
+        lookup = buildLookup(right, operator)
+    for key, item in left:
+        yield item, lookup(key) if key is not None else []
+
+################################################################################
+#	Function : buildLookup
+#	Purpose : Index the right input of a join once so each left key can be
+#	          matched without scanning it: a hash table for "=" and a sorted
+#	          array searched with bisect for inequalities
+#	Parameters : 
+#		right: The right input
+#		operator: The operator of the join condition as a string
+#	Returns: A function mapping a left key to the list of matching right items
+################################################################################
+def buildLookup(right, operator):
+    ''' 
+    Purpose : Index the right input of a join once so each left key can be
+              matched without scanning it: a hash table for "=" and a sorted
+              array searched with bisect for inequalities
+    Parameters : 
+        right: The right input
+        operator: The operator of the join condition as a string
+    Returns: A function mapping a left key to the list of matching right items
+    ''' 
+    if operator == "=":
+        hashTable = {}
+        for key, item in right:
+            hashTable.setdefault(key, []).append(item)
+        return lambda key: hashTable.get(key, [])
+
+    if operator not in BAND_OPERATORS:
+        return lambda key: []
+
+    right = sorted(right, key=lambda pair: pair[0])
+    rKeys = [key for key, item in right]
+    rItems = [item for key, item in right]
+    rKind = keyKind(rKeys[0]) if rKeys else None
+
+    def lookup(key):
+        # A key of another type has no order against the right keys, so
+        # it matches nothing
+        if keyKind(key) != rKind:
+            return []
+        lo, hi = bisect_left(rKeys, key), bisect_right(rKeys, key)
+        if operator == "<":
+            return rItems[hi:]
+        elif operator == "<=":
+            return rItems[lo:]
+        elif operator == ">":
+            return rItems[:lo]
+        elif operator == ">=":
+            return rItems[:hi]
+        return rItems[:lo] + rItems[hi:]
+    return lookup
+
+################################################################################
+#	Function : isSorted
+#	Purpose : Check if an input is in key order
+#	Parameters : 
+#		pairs: The input to check
+#	Returns: True if the keys never decrease
+################################################################################
+def isSorted(pairs):
+    ''' 
+    Purpose : Check if an input is in key order
+    Parameters : 
+        pairs: The input to check
+    Returns: True if the keys never decrease
+    ''' 
+    return all(pairs[i][0] <= pairs[i + 1][0] for i in range(len(pairs) - 1))
+
+################################################################################
+#	Function : keyKind
+#	Purpose : Get the kind of a join key, keys of the same kind being ordered
+#	          against each other
+#	Parameters : 
+#		key: The join key
+#	Returns: float for any number, the type of the key otherwise
+################################################################################
+def keyKind(key):
+    ''' 
+    Purpose : Get the kind of a join key, keys of the same kind being ordered
+              against each other
+    Parameters : 
+        key: The join key
+    Returns: float for any number, the type of the key otherwise
+    ''' 
+    if isinstance(key, (int, float)):
+        return float
+    return type(key)
+
+################################################################################
+#	Function : isComparable
+#	Purpose : Check if the keys of two inputs can be ordered against each other
+#	Parameters : 
+#		left: The left input
+#		right: The right input
+#	Returns: True if either input is empty or their keys are of the same kind
+################################################################################
+def isComparable(left, right):
+    ''' 
+    Purpose : Check if the keys of two inputs can be ordered against each other
+    Parameters : 
+        left: The left input
+        right: The right input
+    Returns: True if either input is empty or their keys are of the same kind
+    ''' 
+    if not left or not right:
+        return True
+    return keyKind(left[0][0]) == keyKind(right[0][0])
@@ -8,4 +8,9 @@
 NO_JOIN = None
 INNER_JOIN = 0 
 LEFT_OUTER_JOIN = 1
-RIGHT_OUTER_JOIN = 2
\ No newline at end of file
+RIGHT_OUTER_JOIN = 2
+
+# Algorithms used to evaluate a join condition 
+HASH_JOIN = 3
+MERGE_JOIN = 4
+BAND_JOIN = 5
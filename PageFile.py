@@ -0,0 +1,624 @@
+################################################################################
+#	File : PageFile.py
+#	Purpose : Binary table file made of fixed-size pages: a header page with
+#	          the schema, directory pages listing the row pages in order, and
+#	          slotted row pages. Pages are read and written through the
+#	          buffer pool.
+################################################################################
+
+import os
+import mmap
+import struct
+from bisect import bisect_right
+
+import Settings
+import DurableFile
+from BufferPool import BufferPool
+
+################################################################################
+#	Class : PageFile
+#	Purpose : The rows of a table stored in a page file. Reads like a list of
+#	          row tuples; only the pages holding the rows read or changed
+#	          are loaded, and only the changed ones are written back.
+################################################################################
+class PageFile(object):
+    '''The rows of a table stored in a binary page file'''
+    PAGE_SIZE = 8192
+    MAGIC = b"PDBT"
+    VERSION = 1
+
+    # Header page: magic, version, page size, row count, page count, row
+    # page count, free page count, first directory page, schema length,
+    # followed by the schema line
+    HEADER = struct.Struct("<4sHIQIIIIH")
+    # Directory page: next directory page (0 for the last one) and entry
+    # count, followed by the entries. The row pages come first, in row
+    # order, then the free pages.
+    DIRECTORY = struct.Struct("<IH")
+    # Directory entry: page number and number of rows in the page
+    ENTRY = struct.Struct("<IH")
+    ENTRIES_PER_PAGE = (PAGE_SIZE - DIRECTORY.size) // ENTRY.size
+    # Row page: slot count and start of the row data, which grows down
+    # from the end of the page, followed by one (offset, length) slot
+    # per row
+    PAGE_HEADER = struct.Struct("<HH")
+    SLOT = struct.Struct("<HH")
+    MAX_ROW_SIZE = PAGE_SIZE - PAGE_HEADER.size - SLOT.size
+
+    # Encoded values: a tag byte, then the value
+    NULL_TAG = 0
+    INT_TAG = 1
+    FLOAT_TAG = 2
+    TEXT_TAG = 3
+    BIG_INT_TAG = 4
+    INT_VALUE = struct.Struct("<Bq")
+    FLOAT_VALUE = struct.Struct("<Bd")
+    TEXT_VALUE = struct.Struct("<BI")
+
+    def __init__(self, path):
+        '''
+    	Purpose : Open a page file
+    	Parameters :
+    		path: The path of the file
+    	Returns: None
+        '''
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR)
+        # Read-only map of the file, made on the first page read
+        self.map = None
+        self.pool = BufferPool.shared()
+        self.pool.validate(path)
+
+        header = self.pool.get(self, 0)
+        (magic, version, pageSize, self.rowCount, self.pageCount, entryCount,
+         freeCount, directoryPage, schemaLength) = self.HEADER.unpack_from(header)
+        if magic != self.MAGIC or version != self.VERSION or pageSize != self.PAGE_SIZE:
+            raise ValueError(path + " is not a version " + str(self.VERSION) + " page file")
+        start = self.HEADER.size
+        self.schema = bytes(header[start:start + schemaLength]).decode("utf-8")
+
+        # Read the directory into [page number, row count] entries
+        self.directoryPages = []
+        items = []
+        while directoryPage != 0:
+            self.directoryPages.append(directoryPage)
+            page = self.pool.get(self, directoryPage)
+            directoryPage, count = self.DIRECTORY.unpack_from(page)
+            end = self.DIRECTORY.size + count * self.ENTRY.size
+            items += [list(item) for item in self.ENTRY.iter_unpack(page[self.DIRECTORY.size:end])]
+        self.entries = items[:entryCount]
+        self.free = [pageNo for pageNo, count in items[entryCount:entryCount + freeCount]]
+        self.starts = None
+        self.dirtyFrom = None
+
+    def __del__(self):
+        # The map is left to the pages still viewing it
+        if getattr(self, "fd", None) is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    @property
+    def mapped(self):
+        '''
+    	Purpose : Check if pages are read from a map of the file, which the
+                  operating system caches, rather than copied into the pool
+    	Parameters : None
+    	Returns: True in the MMAP load mode
+        '''
+        return Settings.loadMode == Settings.MMAP_LOAD
+
+    @classmethod
+    def isPageFile(cls, path):
+        '''
+    	Purpose : Check if a file is a page file rather than a text table file
+    	Parameters :
+    		path: The path of the file
+    	Returns: True if the file starts with the page file magic
+        '''
+        with open(path, "rb") as fid:
+            return fid.read(len(cls.MAGIC)) == cls.MAGIC
+
+    @classmethod
+    def readHeader(cls, path):
+        '''
+    	Purpose : Read the schema line and row count of a page file without
+                  opening it
+    	Parameters :
+    		path: The path of the file
+    	Returns: A (schema line, row count) tuple
+        '''
+        with open(path, "rb") as fid:
+            header = fid.read(cls.PAGE_SIZE)
+        fields = cls.HEADER.unpack_from(header)
+        rowCount, schemaLength = fields[3], fields[-1]
+        return header[cls.HEADER.size:cls.HEADER.size + schemaLength].decode("utf-8"), rowCount
+
+    @classmethod
+    def create(cls, path, schema, rows):
+        '''
+    	Purpose : Write a new page file, replacing any file at the path
+                  atomically
+    	Parameters :
+    		path: The path of the file
+            schema: The schema line of the table
+            rows: An iterable of row tuples
+    	Returns: The PageFile object
+        '''
+        pool = BufferPool.shared()
+        pool.discard(path)
+        # The rows go to a new file that then replaces the old one, so
+        # readers and maps of the old file never see it cut short
+        newPath = DurableFile.temporaryPath(path)
+        try:
+            with open(newPath, "wb") as fid:
+                fid.write(bytes(cls.PAGE_SIZE))
+                entries = []
+                for raws in cls.__pack(cls.encodeRow(row) for row in rows):
+                    fid.write(cls.packPage(raws))
+                    entries.append([len(entries) + 1, len(raws)])
+                # An empty header the directory is added to below
+                header = bytearray(cls.PAGE_SIZE)
+                cls.HEADER.pack_into(header, 0, cls.MAGIC, cls.VERSION, cls.PAGE_SIZE, 0, len(entries) + 1, 0, 0, 0, 0)
+                fid.seek(0)
+                fid.write(header)
+
+            pageFile = cls(newPath)
+            pageFile.schema = schema
+            pageFile.entries = entries
+            pageFile.rowCount = sum(count for pageNo, count in entries)
+            pageFile.dirtyFrom = 0
+            pageFile.__writeMeta()
+            pageFile.sync()
+            DurableFile.replace(newPath, path)
+        finally:
+            # A file left unfinished never replaces the old one
+            pool.discard(newPath)
+            if os.path.exists(newPath):
+                os.remove(newPath)
+        return cls(path)
+
+    def __len__(self):
+        return self.rowCount
+
+    def __iter__(self):
+        for i in range(len(self.entries)):
+            for raw in self.__rawRows(i):
+                yield self.decodeRow(raw)
+
+    def __getitem__(self, index):
+        '''
+    	Purpose : Read a row, or a list of rows for a slice
+    	Parameters :
+    		index: The position of the row, or a slice of positions
+    	Returns: The row tuple, or a list of row tuples
+        '''
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.rowCount)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.__readRange(start, stop)
+        if index < 0:
+            index += self.rowCount
+        if not 0 <= index < self.rowCount:
+            raise IndexError("row index out of range")
+        i, slot = self.__locate(index)
+        page = self.pool.get(self, self.entries[i][0])
+        offset, length = self.SLOT.unpack_from(page, self.PAGE_HEADER.size + slot * self.SLOT.size)
+        return self.decodeRow(page[offset:offset + length])
+
+    def __setitem__(self, index, row):
+        '''
+    	Purpose : Replace a row. Only its page is rewritten, split in two if
+                  the row grew out of it.
+    	Parameters :
+    		index: The position of the row
+            row: The new row tuple
+    	Returns: None
+        '''
+        self.update([index], lambda old: row)
+
+    def append(self, row):
+        '''
+    	Purpose : Add a row at the end, in the last page if it has room
+    	Parameters :
+    		row: The row tuple
+    	Returns: None
+        '''
+        raw = self.__encodeChecked(row)
+        if self.entries:
+            pageNo, count = self.entries[-1]
+            page = self.pool.get(self, pageNo)
+            slots, freeStart = self.PAGE_HEADER.unpack_from(page)
+            slotEnd = self.PAGE_HEADER.size + (slots + 1) * self.SLOT.size
+            if freeStart - len(raw) >= slotEnd:
+                page = bytearray(page)
+                offset = freeStart - len(raw)
+                page[offset:freeStart] = raw
+                self.SLOT.pack_into(page, slotEnd - self.SLOT.size, offset, len(raw))
+                self.PAGE_HEADER.pack_into(page, 0, slots + 1, offset)
+                self.pool.put(self, pageNo, page)
+                self.entries[-1][1] += 1
+                self.__changed(len(self.entries) - 1)
+                self.rowCount += 1
+                self.__writeMeta()
+                return
+        if self.starts is not None:
+            self.starts.append(self.rowCount)
+        pageNo = self.__allocate()
+        self.pool.put(self, pageNo, self.packPage([raw]))
+        self.entries.append([pageNo, 1])
+        self.__changed(len(self.entries) - 1)
+        self.rowCount += 1
+        self.__writeMeta()
+
+    def update(self, rowIds, function):
+        '''
+    	Purpose : Replace some rows, rewriting each of their pages once
+    	Parameters :
+    		rowIds: The positions of the rows
+            function: Maps an old row tuple to the new one
+    	Returns: None
+        '''
+        pages = {}
+        for rowId in rowIds:
+            i, slot = self.__locate(rowId)
+            pages.setdefault(i, []).append(slot)
+        # Last page first, so splitting a page does not move the ones left
+        for i in sorted(pages, reverse=True):
+            raws = self.__rawRows(i)
+            for slot in pages[i]:
+                raws[slot] = self.__encodeChecked(function(self.decodeRow(raws[slot])))
+            self.__writeRows(i, raws)
+        if pages:
+            self.__writeMeta()
+
+    def delete(self, rowIds):
+        '''
+    	Purpose : Remove some rows. Only the pages holding them are rewritten;
+                  each is merged into the page before it when both fit in
+                  one, and emptied pages are freed.
+    	Parameters :
+    		rowIds: The sorted positions of the rows to remove
+    	Returns: None
+        '''
+        if not rowIds:
+            return
+        deleted = set(rowIds)
+        starts = self.__starts()
+        pages = sorted({self.__locate(rowId)[0] for rowId in deleted})
+        entries, last, kept = [], 0, None
+        for i in pages:
+            if last < i:
+                entries += self.entries[last:i]
+                kept = None
+            raws = [raw for slot, raw in enumerate(self.__rawRows(i)) if starts[i] + slot not in deleted]
+            if entries and kept is None:
+                kept = self.__rawRows(i - 1)
+            if entries and self.__fitsPage(kept + raws):
+                # The rows left move into the page before, so deleting
+                # keeps the pages packed without rewriting the whole file
+                kept += raws
+                self.pool.put(self, entries[-1][0], self.packPage(kept))
+                entries[-1] = [entries[-1][0], len(kept)]
+                self.free.append(self.entries[i][0])
+            elif raws:
+                self.pool.put(self, self.entries[i][0], self.packPage(raws))
+                entries.append([self.entries[i][0], len(raws)])
+                kept = raws
+            else:
+                self.free.append(self.entries[i][0])
+            last = i + 1
+        entries += self.entries[last:]
+        self.entries = entries
+        self.rowCount -= len(deleted)
+        self.starts = None
+        self.__changed(max(0, pages[0] - 1))
+        self.__writeMeta()
+
+    def changes(self):
+        '''
+    	Purpose : Get the pages changed since the file was last written
+    	Parameters : None
+    	Returns: A generator of (page number, page bytes) tuples in page
+                 order
+        '''
+        return self.pool.changes(self.path)
+
+    def sync(self):
+        '''
+    	Purpose : Write the changed pages of the file
+    	Parameters : None
+    	Returns: None
+        '''
+        self.pool.flush(self.path)
+
+    def readPage(self, pageNo):
+        '''
+    	Purpose : Read a page from the file. Pages past the end of the file
+                  read as zeros.
+    	Parameters :
+    		pageNo: The number of the page
+    	Returns: The page bytes. In the MMAP load mode, a view of the mapped
+                 page that nothing is copied or decoded from until a row of
+                 it is read.
+        '''
+        offset = pageNo * self.PAGE_SIZE
+        if self.mapped:
+            if self.map is None or offset + self.PAGE_SIZE > len(self.map):
+                # The file grew since it was mapped
+                size = os.fstat(self.fd).st_size
+                if size > 0:
+                    self.map = memoryview(mmap.mmap(self.fd, size, access=mmap.ACCESS_READ))
+            if self.map is not None and offset + self.PAGE_SIZE <= len(self.map):
+                return self.map[offset:offset + self.PAGE_SIZE]
+        page = os.pread(self.fd, self.PAGE_SIZE, offset)
+        if len(page) < self.PAGE_SIZE:
+            page += bytes(self.PAGE_SIZE - len(page))
+        return page
+
+    def writePage(self, pageNo, page):
+        '''
+    	Purpose : Write a page to the file
+    	Parameters :
+    		pageNo: The number of the page
+            page: The page bytes
+    	Returns: None
+        '''
+        os.pwrite(self.fd, bytes(page), pageNo * self.PAGE_SIZE)
+
+    @classmethod
+    def packPage(cls, raws):
+        '''
+    	Purpose : Build a row page
+    	Parameters :
+    		raws: The encoded rows of the page
+    	Returns: The page bytes
+        '''
+        page = bytearray(cls.PAGE_SIZE)
+        end = cls.PAGE_SIZE
+        for slot, raw in enumerate(raws):
+            end -= len(raw)
+            page[end:end + len(raw)] = raw
+            cls.SLOT.pack_into(page, cls.PAGE_HEADER.size + slot * cls.SLOT.size, end, len(raw))
+        cls.PAGE_HEADER.pack_into(page, 0, len(raws), end)
+        return page
+
+    @classmethod
+    def encodeRow(cls, row):
+        '''
+    	Purpose : Encode a row tuple
+    	Parameters :
+    		row: The row tuple
+    	Returns: The encoded bytes
+        '''
+        parts = []
+        for value in row:
+            if value is None:
+                parts.append(bytes([cls.NULL_TAG]))
+            elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+                parts.append(cls.INT_VALUE.pack(cls.INT_TAG, value))
+            elif isinstance(value, float):
+                parts.append(cls.FLOAT_VALUE.pack(cls.FLOAT_TAG, value))
+            else:
+                tag = cls.BIG_INT_TAG if isinstance(value, int) else cls.TEXT_TAG
+                text = str(value).encode("utf-8")
+                parts.append(cls.TEXT_VALUE.pack(tag, len(text)))
+                parts.append(text)
+        return b"".join(parts)
+
+    @classmethod
+    def decodeRow(cls, raw):
+        '''
+    	Purpose : Decode an encoded row
+    	Parameters :
+    		raw: The encoded bytes
+    	Returns: The row tuple
+        '''
+        values = []
+        position = 0
+        while position < len(raw):
+            tag = raw[position]
+            if tag == cls.NULL_TAG:
+                values.append(None)
+                position += 1
+            elif tag == cls.INT_TAG:
+                values.append(cls.INT_VALUE.unpack_from(raw, position)[1])
+                position += cls.INT_VALUE.size
+            elif tag == cls.FLOAT_TAG:
+                values.append(cls.FLOAT_VALUE.unpack_from(raw, position)[1])
+                position += cls.FLOAT_VALUE.size
+            else:
+                length = cls.TEXT_VALUE.unpack_from(raw, position)[1]
+                position += cls.TEXT_VALUE.size
+                text = bytes(raw[position:position + length]).decode("utf-8")
+                values.append(int(text) if tag == cls.BIG_INT_TAG else text)
+                position += length
+        return tuple(values)
+
+    @classmethod
+    def fits(cls, row):
+        '''
+    	Purpose : Check if a row fits in a page
+    	Parameters :
+    		row: The row tuple
+    	Returns: True if the encoded row fits in an empty page
+        '''
+        return len(cls.encodeRow(row)) <= cls.MAX_ROW_SIZE
+
+    @classmethod
+    def __pack(cls, raws):
+        '''
+    	Purpose : Group encoded rows into pages, filling each page in order
+    	Parameters :
+    		raws: An iterable of encoded rows
+    	Returns: A generator of lists of encoded rows, one per page
+        '''
+        pending, size = [], cls.PAGE_HEADER.size
+        for raw in raws:
+            if len(raw) > cls.MAX_ROW_SIZE:
+                raise ValueError("row of " + str(len(raw)) + " bytes does not fit in a page")
+            if size + cls.SLOT.size + len(raw) > cls.PAGE_SIZE:
+                yield pending
+                pending, size = [], cls.PAGE_HEADER.size
+            pending.append(raw)
+            size += cls.SLOT.size + len(raw)
+        if pending:
+            yield pending
+
+    @classmethod
+    def __fitsPage(cls, raws):
+        '''
+    	Purpose : Check if some encoded rows fit in one page
+    	Parameters :
+    		raws: A list of encoded rows
+    	Returns: True if they fit
+        '''
+        size = cls.PAGE_HEADER.size + sum(cls.SLOT.size + len(raw) for raw in raws)
+        return size <= cls.PAGE_SIZE
+
+    def __encodeChecked(self, row):
+        '''
+    	Purpose : Encode a row that must fit in a page
+    	Parameters :
+    		row: The row tuple
+    	Returns: The encoded bytes
+        '''
+        raw = self.encodeRow(row)
+        if len(raw) > self.MAX_ROW_SIZE:
+            raise ValueError("row of " + str(len(raw)) + " bytes does not fit in a page")
+        return raw
+
+    def __readRange(self, start, stop):
+        '''
+    	Purpose : Read the rows in a range of positions
+    	Parameters :
+    		start: The position of the first row
+            stop: The position after the last row
+    	Returns: A list of row tuples
+        '''
+        rows = []
+        if start >= stop:
+            return rows
+        i, slot = self.__locate(start)
+        while len(rows) < stop - start:
+            page = self.pool.get(self, self.entries[i][0])
+            last = min(self.entries[i][1], slot + stop - start - len(rows))
+            for s in range(slot, last):
+                offset, length = self.SLOT.unpack_from(page, self.PAGE_HEADER.size + s * self.SLOT.size)
+                rows.append(self.decodeRow(page[offset:offset + length]))
+            i, slot = i + 1, 0
+        return rows
+
+    def __rawRows(self, i):
+        '''
+    	Purpose : Read the encoded rows of a row page
+    	Parameters :
+    		i: The position of the page in the directory
+    	Returns: A list of encoded rows
+        '''
+        page = self.pool.get(self, self.entries[i][0])
+        raws = []
+        for slot in range(self.entries[i][1]):
+            offset, length = self.SLOT.unpack_from(page, self.PAGE_HEADER.size + slot * self.SLOT.size)
+            raws.append(bytes(page[offset:offset + length]))
+        return raws
+
+    def __writeRows(self, i, raws):
+        '''
+    	Purpose : Store the rows of a row page, moving the ones that no longer
+                  fit to new pages right after it
+    	Parameters :
+    		i: The position of the page in the directory
+            raws: The encoded rows of the page
+    	Returns: None
+        '''
+        groups = list(self.__pack(raws))
+        self.pool.put(self, self.entries[i][0], self.packPage(groups[0]))
+        self.entries[i][1] = len(groups[0])
+        for n, group in enumerate(groups[1:]):
+            pageNo = self.__allocate()
+            self.pool.put(self, pageNo, self.packPage(group))
+            self.entries.insert(i + n + 1, [pageNo, len(group)])
+        if len(groups) > 1:
+            self.starts = None
+        self.__changed(i)
+
+    def __locate(self, rowId):
+        '''
+    	Purpose : Find the page holding a row
+    	Parameters :
+    		rowId: The position of the row
+    	Returns: (position of the page in the directory, slot in the page)
+        '''
+        starts = self.__starts()
+        i = bisect_right(starts, rowId) - 1
+        return i, rowId - starts[i]
+
+    def __starts(self):
+        '''
+    	Purpose : Get the position of the first row of each row page
+    	Parameters : None
+    	Returns: A list of row positions
+        '''
+        if self.starts is None:
+            self.starts = []
+            start = 0
+            for pageNo, count in self.entries:
+                self.starts.append(start)
+                start += count
+        return self.starts
+
+    def __allocate(self):
+        '''
+    	Purpose : Get a page for new rows, reusing a free one if possible
+    	Parameters : None
+    	Returns: The page number
+        '''
+        if self.free:
+            self.__changed(len(self.entries))
+            return self.free.pop()
+        self.pageCount += 1
+        return self.pageCount - 1
+
+    def __changed(self, i):
+        '''
+    	Purpose : Note that the directory changed from an entry on
+    	Parameters :
+    		i: The position of the first changed entry
+    	Returns: None
+        '''
+        if self.dirtyFrom is None or i < self.dirtyFrom:
+            self.dirtyFrom = i
+
+    def __writeMeta(self):
+        '''
+    	Purpose : Store the header page and the changed directory pages in
+                  the pool
+    	Parameters : None
+    	Returns: None
+        '''
+        if self.dirtyFrom is not None:
+            items = self.entries + [[pageNo, 0] for pageNo in self.free]
+            needed = max(1, -(-len(items) // self.ENTRIES_PER_PAGE))
+            while len(self.directoryPages) < needed:
+                self.pageCount += 1
+                self.directoryPages.append(self.pageCount - 1)
+            for n in range(self.dirtyFrom // self.ENTRIES_PER_PAGE, len(self.directoryPages)):
+                chunk = items[n * self.ENTRIES_PER_PAGE:(n + 1) * self.ENTRIES_PER_PAGE]
+                page = bytearray(self.PAGE_SIZE)
+                following = self.directoryPages[n + 1] if n + 1 < len(self.directoryPages) else 0
+                self.DIRECTORY.pack_into(page, 0, following, len(chunk))
+                for e, (pageNo, count) in enumerate(chunk):
+                    self.ENTRY.pack_into(page, self.DIRECTORY.size + e * self.ENTRY.size, pageNo, count)
+                self.pool.put(self, self.directoryPages[n], page)
+            self.dirtyFrom = None
+
+        schema = self.schema.encode("utf-8")
+        if self.HEADER.size + len(schema) > self.PAGE_SIZE:
+            raise ValueError("schema does not fit in the header page")
+        header = bytearray(self.PAGE_SIZE)
+        self.HEADER.pack_into(header, 0, self.MAGIC, self.VERSION, self.PAGE_SIZE, self.rowCount,
+                              self.pageCount, len(self.entries), len(self.free),
+                              self.directoryPages[0], len(schema))
+        header[self.HEADER.size:self.HEADER.size + len(schema)] = schema
+        self.pool.put(self, 0, header)
@@ -18,6 +18,7 @@ from DeleteStatement import DeleteStatement
 from UpdateStatement import UpdateStatement
 from BeginTransactionStatement import BeginTransactionStatement
 from CommitStatement import CommitStatement
+from SetStatement import SetStatement
 
 from queue import Queue
 
@@ -51,7 +52,8 @@ class Parser(object):
             "DELETE": self.__parseDelete,
             "UPDATE": self.__parseUpdate,
             "BEGIN": self.__parseBegin,
-            "COMMIT": self.__parseCommit
+            "COMMIT": self.__parseCommit,
+            "SET": self.__parseSet
         }
         # Split up input and handle comments and ".EXIT" statement. 
         SQLinput = SQLinput.strip()
@@ -83,6 +85,10 @@ class Parser(object):
             return CreateStatement("DATABASE", dbName=input[1])
         elif input[0].upper() == "TABLE":
             return CreateStatement("TABLE", attributes=input[1:])
+        elif input[0].upper() == "INDEX":
+            return CreateStatement("INDEX", attributes=input[1:])
+        elif input[0].upper() == "UNIQUE" and len(input) > 1 and input[1].upper() == "INDEX":
+            return CreateStatement("UNIQUE INDEX", attributes=input[2:])
         else:
             pass #ERROR
 
@@ -114,6 +120,8 @@ class Parser(object):
             return DropStatement("DATABASE", input[1])        
         elif input[0].upper() == "TABLE":
             return DropStatement("TABLE", input[1])
+        elif input[0].upper() == "INDEX":
+            return DropStatement("INDEX", input[1])
         self.__invalidStatement()
         return None 
 
@@ -188,4 +196,14 @@ class Parser(object):
             return None
         return CommitStatement()
 
-        
+    def __parseSet(self, input):
+        '''
+    	Purpose : Parse a SET statement
+    	Parameters :
+    		input: The input to parse
+    	Returns: SetStatement object for current query
+        '''
+        if len(input) < 1:
+            self.__invalidStatement()
+            return None
+        return SetStatement(input)
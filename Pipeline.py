@@ -0,0 +1,197 @@
+################################################################################
+#	File : Pipeline.py
+#	Purpose : Pull-based query operators. Every operator is a generator of
+#	          row batches (lists of row tuples), so a query only holds one
+#	          batch per operator in memory and its first rows come out
+#	          before the last ones are read.
+################################################################################
+
+import Settings
+
+# Number of rows handed from one operator to the next at a time 
+BATCH_SIZE = 1024
+
+################################################################################
+#	Function : scan
+#	Purpose : Read the rows of a table, filtered and projected as they are read
+#	Parameters : 
+#		table: The table to read
+#		predicate: Optional compiled Predicate the rows must match
+#		positions: Optional column positions to keep. All columns if None.
+#		batchSize: Number of rows per batch
+#	Returns: A generator of row batches
+################################################################################
+def scan(table, predicate=None, positions=None, batchSize=BATCH_SIZE):
+    ''' 
+    Purpose : Read the rows of a table, filtered and projected as they are read
+    Parameters : 
+        table: The table to read
+        predicate: Optional compiled Predicate the rows must match
+        positions: Optional column positions to keep. All columns if None.
+        batchSize: Number of rows per batch
+    Returns: A generator of row batches
+    ''' 
+    if table.storage == Settings.COLUMN_STORAGE:
+        rows = table.rows
+        # Filter a whole column at once, then decode only the selected rows
+        # of the kept columns, one batch at a time
+        if positions is None:
+            positions = range(len(table.schema))
+        if predicate is not None:
+            selection = rows.select(predicate)
+        else:
+            selection = range(len(rows))
+        for start in range(0, len(selection), batchSize):
+            yield rows.project(positions, selection[start:start + batchSize])
+        return
+
+    # Blocks the zone map rules out are neither parsed nor checked
+    batches = (table.readRows(start, min(start + batchSize, stop))
+               for first, stop in table.blockRanges(predicate)
+               for start in range(first, stop, batchSize))
+    if predicate is not None:
+        batches = filterRows(batches, predicate)
+    if positions is not None:
+        batches = project(batches, positions)
+    for batch in batches:
+        yield batch
+
+################################################################################
+#	Function : fetch
+#	Purpose : Read some rows of a table by position, e.g. the rows an index
+#	          found
+#	Parameters : 
+#		table: The table to read
+#		rowIds: The sorted positions of the rows to read
+#		positions: Optional column positions to keep. All columns if None.
+#		batchSize: Number of rows per batch
+#	Returns: A generator of row batches
+################################################################################
+def fetch(table, rowIds, positions=None, batchSize=BATCH_SIZE):
+    ''' 
+    Purpose : Read some rows of a table by position, e.g. the rows an index
+              found
+    Parameters : 
+        table: The table to read
+        rowIds: The sorted positions of the rows to read
+        positions: Optional column positions to keep. All columns if None.
+        batchSize: Number of rows per batch
+    Returns: A generator of row batches
+    ''' 
+    if positions is None:
+        positions = range(len(table.schema))
+    for start in range(0, len(rowIds), batchSize):
+        selection = rowIds[start:start + batchSize]
+        if table.storage == Settings.COLUMN_STORAGE:
+            yield table.rows.project(positions, selection)
+        else:
+            yield [tuple([row[p] for p in positions]) for row in table.getRows(selection)]
+
+################################################################################
+#	Function : filterRows
+#	Purpose : Keep the rows of each batch that match a predicate
+#	Parameters : 
+#		batches: The input row batches
+#		predicate: The compiled Predicate the rows must match
+#	Returns: A generator of non-empty row batches
+################################################################################
+def filterRows(batches, predicate):
+    ''' 
+    Purpose : Keep the rows of each batch that match a predicate
+    Parameters : 
+        batches: The input row batches
+        predicate: The compiled Predicate the rows must match
+    Returns: A generator of non-empty row batches
+    ''' 
+    for batch in batches:
+        batch = [row for row in batch if predicate(row)]
+        if batch:
+            yield batch
+
+################################################################################
+#	Function : project
+#	Purpose : Keep some columns of every row
+#	Parameters : 
+#		batches: The input row batches
+#		positions: The positions of the columns to keep, in output order
+#	Returns: A generator of row batches
+################################################################################
+def project(batches, positions):
+    ''' 
+    Purpose : Keep some columns of every row
+    Parameters : 
+        batches: The input row batches
+        positions: The positions of the columns to keep, in output order
+    Returns: A generator of row batches
+    ''' 
+    for batch in batches:
+        yield [tuple([row[i] for i in positions]) for row in batch]
+
+################################################################################
+#	Function : crossJoin
+#	Purpose : Pair every row of a stream with every row of a table
+#	Parameters : 
+#		batches: The left row batches
+#		rtable: The right table
+#		batchSize: Number of rows per output batch
+#		where: Optional conditions on the right table alone its rows must
+#		       match
+#	Returns: A generator of batches of concatenated (left + right) rows
+################################################################################
+def crossJoin(batches, rtable, batchSize=BATCH_SIZE, where=None):
+    ''' 
+    Purpose : Pair every row of a stream with every row of a table
+    Parameters : 
+        batches: The left row batches
+        rtable: The right table
+        batchSize: Number of rows per output batch
+        where: Optional conditions on the right table alone its rows must
+               match
+    Returns: A generator of batches of concatenated (left + right) rows
+    ''' 
+    # The right side is read once per left row, so decode it only once 
+    right = list(rows(rtable.getBatches(["*"], where) if where else scan(rtable)))
+    return batched((lRow + rRow for lRow in rows(batches) for rRow in right), batchSize)
+
+################################################################################
+#	Function : batched
+#	Purpose : Group a stream of single rows into batches
+#	Parameters : 
+#		rowIter: An iterable of rows
+#		batchSize: Number of rows per batch
+#	Returns: A generator of row batches
+################################################################################
+def batched(rowIter, batchSize=BATCH_SIZE):
+    ''' 
+    Purpose : Group a stream of single rows into batches
+    Parameters : 
+        rowIter: An iterable of rows
+        batchSize: Number of rows per batch
+    Returns: A generator of row batches
+    ''' 
+    batch = []
+    for row in rowIter:
+        batch.append(row)
+        if len(batch) == batchSize:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+################################################################################
+#	Function : rows
+#	Purpose : Flatten row batches
+#	Parameters : 
+#		batches: The row batches
+#	Returns: A generator of single rows
+################################################################################
+def rows(batches):
+    ''' 
+    Purpose : Flatten row batches
+    Parameters : 
+        batches: The row batches
+    Returns: A generator of single rows
+    ''' 
+    for batch in batches:
+        for row in batch:
+            yield row
@@ -0,0 +1,184 @@
+################################################################################
+#	File : Predicate.py
+#	Purpose : Models a compiled WHERE / ON condition
+################################################################################
+
+import operator
+import re
+
+################################################################################
+#	Class : Predicate
+#	Purpose : A "column <operator> value" condition compiled once against a
+#	          table so that checking a row is a lookup and a comparison
+################################################################################
+class Predicate(object):
+    '''A "column <operator> value" condition compiled against a table'''
+    OPERATORS = {
+        "=": operator.eq,
+        "!=": operator.ne,
+        "<>": operator.ne,
+        "<": operator.lt,
+        ">": operator.gt,
+        "<=": operator.le,
+        ">=": operator.ge
+    }
+
+    # Longer operators first so "<=" is not split into "<" and "=" 
+    OPERATOR_PATTERN = r"(<=|>=|!=|<>|=|<|>)"
+
+    # AND keyword outside of quoted literals 
+    AND_PATTERN = r"\s+and\s+(?=(?:[^']*'[^']*')*[^']*$)"
+
+    def __init__(self, table, column, op, value):
+        '''
+    	Purpose : Resolve the column position, cast function, typed literal
+                  and operator
+    	Parameters :
+    		table: The table the condition is evaluated on
+            column: LHS of the conditional
+            op: operator as a string
+            value: RHS of the conditional, either a literal or a
+                   table.column reference to another column of the row
+    	Returns: None
+        '''
+        # Data sanitization 
+        self.column = column.strip().replace("'", '')
+        self.operator = op.strip()
+        self.value = value.strip().replace("'", '')
+        self.valueColumn = None
+        self.castType = None
+        self.position = None
+        self.valuePosition = None
+        self.compare = self.OPERATORS.get(self.operator)
+        self.valid = False
+
+        if self.compare is None or self.column not in table.schema:
+            return
+        self.castType = table.getType(table.schema[self.column])
+        self.position = table.attrIndex[self.column]
+
+        try:
+            if '.' in self.value and self.value in table.schema:
+                # Compare against another column of the same row 
+                self.valueColumn = self.value
+                self.valuePosition = table.attrIndex[self.value]
+            else:
+                self.value = table.castColumn(self.value, self.castType)
+        except (TypeError, ValueError):
+            return
+        self.valid = True
+
+    def __call__(self, row):
+        '''
+    	Purpose : Check a row against the condition
+    	Parameters :
+    		row: The row tuple to check
+    	Returns: True if the row matches the condition
+        '''
+        if not self.valid:
+            return False
+        rVal = self.value if self.valuePosition is None else row[self.valuePosition]
+        return self.test(row[self.position], rVal)
+
+    def test(self, lVal, rVal):
+        '''
+    	Purpose : Compare two values with the condition's operator
+    	Parameters :
+    		lVal: The value of the condition's column
+            rVal: The literal or the value of the other column
+    	Returns: True if the values match the condition
+        '''
+        # Rows hold typed values, so no per-row cast is needed. NULLs and
+        # padding of the wrong type fail the comparison.
+        if lVal is None or rVal is None:
+            return False
+        try:
+            return self.compare(lVal, rVal)
+        except TypeError:
+            return False
+
+    @staticmethod
+    def splitCondition(text):
+        '''
+    	Purpose : Split condition text into its column, operator and value
+    	Parameters :
+    		text: The condition text, i.e. "price >= 100"
+    	Returns: A [column, operator, value] list of stripped strings
+        '''
+        return [x.strip() for x in filter(None, re.split(Predicate.OPERATOR_PATTERN, text, 1))]
+
+    @staticmethod
+    def splitConditions(text):
+        '''
+    	Purpose : Split the conditions of a WHERE clause joined with AND
+    	Parameters :
+    		text: The WHERE clause, i.e. "a = 1 AND price >= 100"
+    	Returns: A list of [column, operator, value] lists. Empty if the
+                 clause is empty.
+        '''
+        if text is None or text.strip() == "":
+            return []
+        return [Predicate.splitCondition(condition)
+                for condition in re.split(Predicate.AND_PATTERN, text.strip(), flags=re.IGNORECASE)]
+
+    @staticmethod
+    def compile(table, where):
+        '''
+    	Purpose : Compile the conditions of a WHERE clause against a table
+    	Parameters :
+    		table: The table the conditions are evaluated on
+            where: A [column, operator, value] list, or a list of them
+                   that must all hold
+    	Returns: A Predicate for one condition, a Conjunction for several,
+                 None if there is no condition
+        '''
+        if where is None or len(where) == 0:
+            return None
+        if isinstance(where[0], str):
+            where = [where]
+        predicates = [Predicate(table, c[0], c[1], c[2]) for c in where]
+        if len(predicates) == 1:
+            return predicates[0]
+        return Conjunction(predicates)
+
+################################################################################
+#	Class : Conjunction
+#	Purpose : Several compiled conditions that must all hold
+################################################################################
+class Conjunction(object):
+    '''Several compiled conditions that must all hold'''
+    def __init__(self, predicates):
+        '''
+    	Purpose : Combine compiled conditions
+    	Parameters :
+    		predicates: A list of Predicate objects
+    	Returns: None
+        '''
+        self.predicates = predicates
+        self.valid = all(predicate.valid for predicate in predicates)
+
+    def __call__(self, row):
+        '''
+    	Purpose : Check a row against every condition
+    	Parameters :
+    		row: The row tuple to check
+    	Returns: True if the row matches all of the conditions
+        '''
+        for predicate in self.predicates:
+            if not predicate(row):
+                return False
+        return True
+
+    @staticmethod
+    def of(predicate):
+        '''
+    	Purpose : Get the conditions of a compiled WHERE clause
+    	Parameters :
+    		predicate: A Predicate, a Conjunction or None
+    	Returns: A list of Predicate objects
+        '''
+        if predicate is None:
+            return []
+        if isinstance(predicate, Conjunction):
+            return predicate.predicates
+        return [predicate]
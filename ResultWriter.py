@@ -0,0 +1,153 @@
+################################################################################
+#	File : ResultWriter.py
+#	Purpose : Writes query results a batch of rows at a time, through a
+#	          buffer, to stdout or to a file
+################################################################################
+
+import csv
+import io
+import json
+import sys
+
+import Settings
+
+# Number of characters collected before they are written out 
+BUFFER_SIZE = 1 << 16
+
+################################################################################
+#	Class : ResultWriter
+#	Purpose : Formats result rows as pipe-delimited text, CSV or JSON Lines
+#	          and writes them out as they are produced
+################################################################################
+class ResultWriter(object):
+    '''Formats result rows and writes them out as they are produced'''
+    def __init__(self, formatValue, outputFormat=None, output=None):
+        ''' 
+        Purpose : Start writing a result
+        Parameters : 
+            formatValue: Function converting a typed value to text
+            outputFormat: One of the Settings formats. Settings.outputFormat
+                          if None.
+            output: Path of the file to append to. Settings.outputFile if
+                    None; stdout if that is None as well.
+        Returns: None
+        ''' 
+        self.formatValue = formatValue
+        self.outputFormat = outputFormat or Settings.outputFormat
+        self.path = output if output is not None else Settings.outputFile
+        self.names = []
+        self.rowCount = 0
+        self.buffer = []
+        self.buffered = 0
+        self.file = None
+        if self.path is not None:
+            self.file = open(self.path, "a", newline='')
+
+    def writeHeader(self, attrList, types):
+        ''' 
+        Purpose : Write the header of a result
+        Parameters : 
+            attrList: The names of the result columns, optionally prefixed
+                      with a table name
+            types: The type string of each column
+        Returns: None
+        ''' 
+        names = [attr.split(".")[-1] for attr in attrList]
+        # JSON keys must be unique, so joins keep the table prefix on
+        # repeated names 
+        self.names = names if len(set(names)) == len(names) else list(attrList)
+
+        if self.outputFormat == Settings.PIPE_FORMAT:
+            self.__write("|".join(n + " " + t for n, t in zip(names, types)) + "\n")
+        elif self.outputFormat == Settings.CSV_FORMAT:
+            self.__write(self.__csvLines([names]))
+
+    def writeRows(self, rows):
+        ''' 
+        Purpose : Write a batch of result rows
+        Parameters : 
+            rows: A list of row tuples in header order
+        Returns: None
+        ''' 
+        if not rows:
+            return
+        self.rowCount += len(rows)
+        if self.outputFormat == Settings.CSV_FORMAT:
+            self.__write(self.__csvLines([[self.__csvValue(v) for v in row] for row in rows]))
+        elif self.outputFormat == Settings.JSON_FORMAT:
+            lines = [json.dumps(dict(zip(self.names, row))) for row in rows]
+            self.__write("\n".join(lines) + "\n")
+        else:
+            lines = ["|".join(self.formatValue(v) for v in row) for row in rows]
+            self.__write("\n".join(lines) + "\n")
+
+    def close(self):
+        ''' 
+        Purpose : Finish the result and flush everything that is buffered
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        # An empty pipe-delimited result still ends with a blank line 
+        if self.rowCount == 0 and self.outputFormat == Settings.PIPE_FORMAT:
+            self.__write("\n")
+        self.__flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __csvValue(self, value):
+        ''' 
+        Purpose : Convert a typed value to a CSV field
+        Parameters : 
+            value: The value to convert
+        Returns: The field text. An empty field for NULL.
+        ''' 
+        if value is None:
+            return ""
+        return self.formatValue(value)
+
+    def __csvLines(self, rows):
+        ''' 
+        Purpose : Quote rows as CSV
+        Parameters : 
+            rows: A list of lists of field strings
+        Returns: The CSV text of the rows
+        ''' 
+        text = io.StringIO()
+        csv.writer(text, lineterminator="\n").writerows(rows)
+        return text.getvalue()
+
+    def __write(self, text):
+        ''' 
+        Purpose : Buffer text, writing it out once the buffer is full
+        Parameters : 
+            text: The text to write
+        Returns: None
+        ''' 
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= BUFFER_SIZE:
+            self.__flush()
+
+    def __flush(self):
+        ''' 
+        Purpose : Write out everything that is buffered
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        if not self.buffer:
+            return
+        # stdout is looked up on every flush so redirections are honored 
+        stream = self.file if self.file is not None else sys.stdout
+        stream.write("".join(self.buffer))
+        stream.flush()
+        self.buffer = []
+        self.buffered = 0
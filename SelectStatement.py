@@ -7,7 +7,11 @@
 
 from Query import Query
 from Table import Table
+from Predicate import Predicate
+from ResultWriter import ResultWriter
 import Joins 
+import JoinAlgorithms
+import Pipeline
 
 import re
 
@@ -32,16 +36,15 @@ class SelectStatement(Query):
         # Determine table/columns to be selected.
         fields, aliases, conditions, joinType = self.__parseTables()
 
-        #TODO Extend condition handling to include multiple conditions with "AND" "OR" or "NOT"
+        #TODO Extend condition handling to include "OR" or "NOT"
         #TODO Extend condition handling to include "BETWEEN" "LIKE" and "IN"
-        conditionColumn = None
-        conditionValue = None
-        conditionOperator = None
         if conditions is not None:
-            conditions = list(filter(None, re.split(r"(=|!=|<>|<|>|<=|>=)", conditions)))
-            conditionColumn = conditions[0].strip()
-            conditionOperator = conditions[1].strip()
-            conditionValue = conditions[2].strip()
+            conditions = Predicate.splitConditions(conditions)
+
+        count = self.__isCount(fields)
+        if count and len(fields) > 1:
+            print ("!Failed to query because COUNT(*) takes a single table.")
+            return None
 
         columnInTables = False
         # For each table/column pair verify add the Table objects to a list.
@@ -50,20 +53,22 @@ class SelectStatement(Query):
             if temp is None:
                 print ("!Failed to query table", table, "because it does not exist.")
                 return None
-            if "*" not in fields[table]:
+            if "*" not in fields[table] and not count:
                 for column in fields[table]:
                     if not temp.attrExists(column):
                         print ("!Failed to query table", table, "because column",column,"does not exist.")
                         return None
         
         # Step One: Replace aliases in conditions with table names
-        conditions = self.__replaceAliasesInConditional(conditions, aliases)
+        if conditions is not None:
+            conditions = [self.__replaceAliasesInConditional(condition, aliases) for condition in conditions]
         
         # Step Two: Check that tables in the conditions are being selected
-        tableName1, columns1, tableName2, columns2 = None, None, None, None
-        if conditions is not None:
-            tableName1, columns1 = self.__splitColAndTable(conditions[0])
-            tableName2, columns2 = self.__splitColAndTable(conditions[2])
+        references = []
+        for condition in conditions or []:
+            tableName1, columns1 = self.__splitColAndTable(condition[0])
+            tableName2, columns2 = self.__splitColAndTable(condition[2])
+            references.append((tableName1, columns1, tableName2, columns2))
 
             # Check if table1 is in fields.keys
             if tableName1 is not None and tableName1 not in list(fields.keys()):
@@ -75,13 +80,20 @@ class SelectStatement(Query):
                 print ("!Failed to query because", tableName2, "is not being selected.")
                 return None
 
+            # Check the columns compared across tables exist before a join
+            # is built on them
+            if len(fields) > 1:
+                for tableName, column in [(tableName1, columns1), (tableName2, columns2)]:
+                    if tableName is not None and not self.database.getTableByName(tableName).attrExists(column):
+                        print ("!Failed to query table", tableName, "because column", column, "does not exist.")
+                        return None
+
         # Step Three: Create a temporary table that will merge all the data
         #   Schema keys should be TableName.attribute
         workingTable = Table(None, "MERGE", True)
 
-        # Step Four: For each row in the left table, create a new row
-        #            for each row in the right table and add to the
-        #            temporary table.
+        # Step Four: Join the rows of the tables into a stream of merged
+        #            rows with the schema of the temporary table.
         tables = []
         attrList = [] 
         schema = {}
@@ -97,29 +109,84 @@ class SelectStatement(Query):
                 modifiedSchema[tname + "." + k] = v 
             schema = {**schema, **modifiedSchema}
 
+        # Joins are streamed into the printer a batch at a time instead of
+        # being collected into the working table first
+        batches = None
         if len(tables) == 1:
             workingTable = tables[0]
             attrList = fields[workingTable.getFriendlyName()]
-            if conditions is not None:
-                conditions[0] = columns1 
-                conditions[2] = columns2 
+            for condition, (tableName1, columns1, tableName2, columns2) in zip(conditions or [], references):
+                condition[0] = columns1 
+                condition[2] = columns2 
+            if count:
+                self.__printCount(workingTable, conditions)
+                return None
         elif joinType == Joins.INNER_JOIN:
-            tname1 = tables[0].getFriendlyName()
-            tname2 = tables[1].getFriendlyName()
-            for tb1Row in tables[0].getDataByAttrName("*"):
-                tb1Row = self.__addTableNameToRow(tname1, tb1Row) 
-                for tb2Row in tables[1].getDataByAttrName("*"):
-                    tb2Row = self.__addTableNameToRow(tname2, tb2Row)
-                    row = {**tb1Row, **tb2Row}
-                    workingTable.rows.append(row)
+            # Conditions on a single table filter its rows as it is read,
+            # before the join
+            where = {table.safeName: [] for table in tables}
+            joinConditions, remaining = [], []
+            for condition, (tableName1, columns1, tableName2, columns2) in zip(conditions or [], references):
+                tableName = self.__singleTable(tableName1, tableName2)
+                if tableName is not None:
+                    where[tableName].append([columns1, condition[1], columns2])
+                elif self.__isJoinCondition(condition, tableName1, tableName2):
+                    joinConditions.append(condition)
+                else:
+                    remaining.append(condition)
+            lWhere, rWhere = where[tables[0].safeName], where[tables[1].safeName]
+
+            # The first condition between the two tables drives the join,
+            # which picks its algorithm from the operator. The others are
+            # checked on the joined rows.
+            if joinConditions:
+                batches = Table.iterInnerJoin(tables[0], tables[1], joinConditions[0], lWhere, rWhere)
+                remaining += joinConditions[1:]
+            else:
+                batches = Pipeline.crossJoin(tables[0].getBatches(["*"], lWhere), tables[1], where=rWhere)
+            conditions = remaining
             workingTable.setSchema(schema)
         else:
-            workingTable = Table.OuterJoin(tables[0], tables[1], joinType, conditions)
+            if conditions is not None and len(conditions) > 1:
+                print ("!Failed to query because an outer join takes a single condition.")
+                return None
+            batches = Table.iterOuterJoin(tables[0], tables[1], joinType,
+                                          conditions[0] if conditions else None)
             workingTable.setSchema(schema)
+            conditions = None
 
-        # Step Five: Call getDataByAttrName with the conditions to get a
-        #            set of correct data
-        workingTable.printTableByAttr(attrList, conditions, joinType)
+        # Step Five: Print the rows matching the conditions as they are
+        #            produced
+        workingTable.printTableByAttr(attrList, conditions, batches)
+
+    def __isCount(self, fields):
+        '''
+        Purpose:    Check if the query selects COUNT(*)
+        Parameters: fields: Dictionary of table/column pairs
+        Returns:    True if COUNT(*) is the only selected column
+        '''
+        columns = [column for columnList in fields.values() for column in columnList]
+        return len(set(columns)) == 1 and columns[0].replace(" ", "").upper() == "COUNT(*)"
+
+    def __printCount(self, table, conditions):
+        '''
+        Purpose:    Print the number of rows of a table matching some
+                    conditions. Without conditions the count is read from
+                    the table file header or the catalog, without reading
+                    any row.
+        Parameters: table: The Table to count the rows of
+                    conditions: The conditions the rows must match, or None
+        Returns:    None
+        '''
+        if conditions:
+            # Reading a single column lets an index answer the count
+            column = list(table.schema.keys())[:1]
+            count = sum(len(batch) for batch in table.getBatches(column, conditions))
+        else:
+            count = table.getRowCount()
+        with ResultWriter(table.formatValue) as writer:
+            writer.writeHeader(["COUNT(*)"], ["int"])
+            writer.writeRows([(count,)])
 
     def __parseTables(self):
         '''
@@ -171,8 +238,11 @@ class SelectStatement(Query):
         table = None
         column = None
 
+        # Quoted and numeric literals are never table.column references
         splitTable = conditionVal.split('.')
-        if(len(splitTable) > 1):
+        if conditionVal.startswith("'") or re.match(r"^-?\d+\.\d*$", conditionVal):
+            column = conditionVal.strip()
+        elif(len(splitTable) > 1):
             table = splitTable[0].strip()
             column = splitTable[1].strip()
         else:
@@ -194,7 +264,8 @@ class SelectStatement(Query):
         # Set all aliases to lowercase in conditional
         for i in range(len(conditional)):
             dotIndex = conditional[i].find('.')
-            conditional[i] = conditional[i][0:dotIndex].lower() + conditional[i][dotIndex:]
+            if dotIndex >= 0:
+                conditional[i] = conditional[i][0:dotIndex].lower() + conditional[i][dotIndex:]
 
         conditions = conditional
         for alias, trueName in list(aliases.items()):
@@ -205,18 +276,34 @@ class SelectStatement(Query):
                 conditions[2] = conditional[2].replace(alias, trueName)
         return conditions
 
-    def __addTableNameToRow(self, tname, row):
+    def __isJoinCondition(self, conditions, tableName1, tableName2):
         '''
-    	Purpose : Add a table's name to a row's keys
-    	Parameters : 
-    		tname: The name of the table to prepend to the row's keys
-            row: The row to correct
-     	Returns: A new row with the table name prepended to each key
-        '''
-        newRow = {}
-        for k, v in list(row.items()):
-            newRow[tname + "." + k] = v 
-        return newRow 
+    	Purpose : Check if a condition compares a column of each table
+    	Parameters :
+    		conditions: The condition list [lhs, operator, rhs]
+            tableName1: The table referenced by the lhs (None for a literal)
+            tableName2: The table referenced by the rhs (None for a literal)
+    	Returns: True if the condition can be evaluated by Table.InnerJoin
+        '''
+        if conditions is None or conditions[1] not in ["="] + JoinAlgorithms.BAND_OPERATORS:
+            return False
+        if tableName1 is None or tableName2 is None:
+            return False
+        return tableName1 != tableName2
+
+    def __singleTable(self, tableName1, tableName2):
+        '''
+    	Purpose : Find the table a condition alone refers to
+    	Parameters :
+            tableName1: The table referenced by the lhs (None for a literal)
+            tableName2: The table referenced by the rhs (None for a literal)
+    	Returns: The table name, or None if the condition refers to both
+                 tables or names no table
+        '''
+        names = set([tableName1, tableName2]) - set([None])
+        if len(names) != 1:
+            return None
+        return names.pop()
 
     def __splitOnJoin(self, text):
         '''
@@ -0,0 +1,152 @@
+################################################################################
+#	File : SetStatement.py
+#	Purpose : Models a SET statement that changes a session setting
+################################################################################
+
+from Query import Query
+from ColumnStore import ColumnStore
+from BufferPool import BufferPool
+import Settings
+
+################################################################################
+#	Class : SetStatement
+#	Purpose : Models a SET <setting> = <value> statement
+################################################################################
+class SetStatement(Query):
+    '''Models a SET <setting> = <value> statement'''
+    def __init__(self, queryInput):
+        super(SetStatement, self).__init__()
+        self.database = None
+        self.name, self.text = self.__parseSet(queryInput)
+        self.value = self.text.upper() if self.text is not None else None
+
+    def execute(self):
+        ''' 
+        Purpose : Execute a SET statement
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        states = {
+            "STORAGE": self.__setStorage,
+            "FORMAT": self.__setFormat,
+            "OUTPUT": self.__setOutput,
+            "BUFFER_POOL": self.__setBufferPool,
+            "LOAD": self.__setLoad,
+            "SYNCHRONOUS": self.__setSynchronous
+        }
+        if self.name in states.keys():
+            states[self.name]()
+        else:
+            print("!Invalid SQL statement!")
+
+    def __setStorage(self):
+        ''' 
+        Purpose : Switch between row and column storage. Tables that are
+                  already loaded are converted right away.
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        if self.value not in [Settings.ROW_STORAGE, Settings.COLUMN_STORAGE]:
+            print("!Failed to set STORAGE because", self.value, "is not ROW or COLUMN.")
+            return
+        if self.value == Settings.COLUMN_STORAGE and not ColumnStore.isAvailable():
+            print("!Failed to set STORAGE to COLUMN because NumPy is not installed.")
+            return
+
+        Settings.storage = self.value
+        if self.database is not None:
+            for table in list(self.database.tables.values()):
+                table.setStorage(self.value)
+        print("STORAGE set to", self.value + ".")
+
+    def __setFormat(self):
+        ''' 
+        Purpose : Choose the format query results are written in
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        formats = [Settings.PIPE_FORMAT, Settings.CSV_FORMAT, Settings.JSON_FORMAT]
+        if self.value not in formats:
+            print("!Failed to set FORMAT because", self.value, "is not PIPE, CSV or JSON.")
+            return
+        Settings.outputFormat = self.value
+        print("FORMAT set to", self.value + ".")
+
+    def __setOutput(self):
+        ''' 
+        Purpose : Send query results to a file, or back to stdout. The file
+                  is emptied once here and every result is appended to it.
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        if self.value == "STDOUT":
+            Settings.outputFile = None
+            print("OUTPUT set to STDOUT.")
+            return
+        try:
+            open(self.text, "w").close()
+        except OSError:
+            print("!Failed to set OUTPUT because", self.text, "cannot be written.")
+            return
+        Settings.outputFile = self.text
+        print("OUTPUT set to", self.text + ".")
+
+    def __setBufferPool(self):
+        ''' 
+        Purpose : Change how many megabytes of table pages are kept in memory
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        if self.value is None or not self.value.isdigit() or int(self.value) == 0:
+            print("!Failed to set BUFFER_POOL because", self.value, "is not a positive number of megabytes.")
+            return
+        Settings.bufferPoolSize = int(self.value) * 1024 * 1024
+        BufferPool.shared().resize(Settings.bufferPoolSize)
+        print("BUFFER_POOL set to", self.value, "MB.")
+
+    def __setLoad(self):
+        ''' 
+        Purpose : Choose how table file pages are read: mapped into memory,
+                  or copied into the buffer pool
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        if self.value not in [Settings.MMAP_LOAD, Settings.READ_LOAD]:
+            print("!Failed to set LOAD because", self.value, "is not MMAP or READ.")
+            return
+        Settings.loadMode = self.value
+        print("LOAD set to", self.value + ".")
+
+    def __setSynchronous(self):
+        ''' 
+        Purpose : Choose how long commits wait for the disk, trading
+                  durability for speed
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        levels = [Settings.OFF_SYNC, Settings.NORMAL_SYNC, Settings.FULL_SYNC]
+        if self.value not in levels:
+            print("!Failed to set SYNCHRONOUS because", self.value, "is not OFF, NORMAL or FULL.")
+            return
+        Settings.synchronous = self.value
+        print("SYNCHRONOUS set to", self.value + ".")
+
+    def __parseSet(self, queryInput):
+        ''' 
+        Purpose : Parse the setting name and value
+        Parameters : 
+            queryInput: The tokens after SET, i.e. ["STORAGE", "=", "COLUMN"]
+        Returns: (name, value) tuple, the name uppercase and the value as
+                 written without quotes
+        ''' 
+        joined = " ".join(queryInput).split('=')
+        if len(joined) != 2:
+            return None, None
+        return joined[0].strip().upper(), joined[1].strip().replace("'", '')
@@ -0,0 +1,43 @@
+################################################################################
+#	File : Settings.py
+#	Purpose : Session-wide settings, changed with the SET statement
+################################################################################
+
+# Ways a table can keep its rows in memory 
+ROW_STORAGE = "ROW"
+COLUMN_STORAGE = "COLUMN"
+
+# Storage used for tables loaded from disk 
+storage = ROW_STORAGE
+
+# Formats a query result can be written in 
+PIPE_FORMAT = "PIPE"
+CSV_FORMAT = "CSV"
+JSON_FORMAT = "JSON"
+
+# Format of query results 
+outputFormat = PIPE_FORMAT
+
+# File query results are appended to. stdout if None.
+outputFile = None
+
+# Bytes of table file pages the buffer pool keeps in memory 
+bufferPoolSize = 64 * 1024 * 1024
+
+# Ways table file pages can be read 
+READ_LOAD = "READ"
+MMAP_LOAD = "MMAP"
+
+# How table file pages are read: mapped into memory, or copied into the
+# buffer pool 
+loadMode = MMAP_LOAD
+
+# How long commits wait for the disk: OFF never syncs, NORMAL syncs at
+# checkpoints only, which write the pages of its commits to the table files,
+# FULL syncs the write-ahead log on every commit 
+OFF_SYNC = "OFF"
+NORMAL_SYNC = "NORMAL"
+FULL_SYNC = "FULL"
+
+# Durability of commits 
+synchronous = FULL_SYNC
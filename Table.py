@@ -6,7 +6,17 @@
 ################################################################################
 
 import os
+import glob
 import Joins
+import JoinAlgorithms
+import Pipeline
+import Settings
+from Predicate import Predicate, Conjunction
+from ColumnStore import ColumnStore
+from Index import Index
+from ZoneMap import ZoneMap
+from PageFile import PageFile
+from ResultWriter import ResultWriter
 
 ################################################################################
 #	Class : Table
@@ -15,7 +25,15 @@ import Joins
 
 
 class Table(object):
-    def __init__(self, dbName, tableName, newlyCreated=False):
+    # Layout version of a text table file
+    TEXT_LAYOUT = 0
+    # Kinds of changes to rows held in memory, applied to the table file
+    # when the table is saved
+    APPEND_CHANGE = "APPEND"
+    UPDATE_CHANGE = "UPDATE"
+    DELETE_CHANGE = "DELETE"
+
+    def __init__(self, dbName, tableName, newlyCreated=False, header=None):
         # Initialize member variables.
         self.dbName = dbName
         self.tableName = tableName
@@ -23,33 +41,283 @@ class Table(object):
         #    self.tableName += '.tbl'
         self.fileName = tableName + ".tbl"
         self.safeName = tableName.lower()
+        self.storage = Settings.ROW_STORAGE
+        # Directory of the table file while its rows, zone map and indexes
+        # are not read yet
+        self.__pending = None
+        # Number of rows recorded in the table file header, known before
+        # the rows are read. None for a text table file.
+        self.knownRowCount = None
+        # Changes made since the table file was written, or None if the
+        # file must be written again in full
+        self.__changes = None
+        self.layoutVersion = PageFile.VERSION
+        self.indexes = {}
+        self.zoneMap = None
+        self.rows = []
+        # State of the table file the table was read from or last saved to
+        self.stamp = self.getFileStamp()
 
         # If the table is not brand new:
         if not newlyCreated:
             # Check to ensure the table does exist.  If it does, read in
-            # the table schema and data.
+            # the table schema, unless the catalog gave it. The data is read
+            # when first used.
             dbDir = './' + self.dbName + '/'
-            if self.fileName not in os.listdir(dbDir):
+            if not os.path.isfile(dbDir + self.fileName):
                 print("!Table", self.tableName, "not found")
             else:
                 self.schema = None
-                self.rows = []
-                # Read in and store all data from the table
-                fid = open(dbDir + self.fileName)
-                lines = fid.readlines()
-
-                # Set the table schema
-                self.schema = self.__parseSchema(lines[0])
-
-                # Store each row as an entry in the dictionary
-                for row in lines[1:]:
-                    parsedRow = self.__parseRow(row)
-                    self.rows.append(parsedRow)
-                fid.close()
+                if header is None:
+                    header = self.__readHeader(dbDir + self.fileName)
+                schema, self.knownRowCount, self.layoutVersion = header
+                self.setSchema(self.__parseSchema(schema))
+                self.__pending = dbDir
+                self.setStorage(Settings.storage)
         # If the table is new, create empty table.
         else:
-            self.schema = {}
-            self.rows = []
+            self.setSchema({})
+        # Only tables changed since they were read or saved are written
+        self.dirty = newlyCreated
+
+    def __readHeader(self, path):
+        '''
+        Purpose:    Read the schema line and row count of a table file
+     	Parameters: path: The path of the table file
+    	Returns:    A (schema line, row count, layout version) tuple. The row
+                    count of a text table file is None.
+        '''
+        if PageFile.isPageFile(path):
+            return PageFile.readHeader(path) + (PageFile.VERSION,)
+        with open(path) as fid:
+            return fid.readline(), None, self.TEXT_LAYOUT
+
+    def __load(self):
+        '''
+        Purpose:    Read the rows, zone map and indexes of the table the
+                    first time any of them is used
+     	Parameters: None
+    	Returns:    None
+        '''
+        dbDir = self.__pending
+        if dbDir is None:
+            return
+        self.__pending = None
+        if PageFile.isPageFile(dbDir + self.fileName):
+            # Rows stay in the file and its pages are read through the
+            # buffer pool as they are needed
+            self.rows = PageFile(dbDir + self.fileName)
+            self.__changes = []
+        else:
+            # A text table file from an older version, turned into a page
+            # file when the table is next saved
+            fid = open(dbDir + self.fileName)
+            lines = fid.readlines()
+            fid.close()
+
+            # Each row becomes a tuple in schema order, with every cell
+            # casted to its column type once. Rows are parsed a block at a
+            # time when first read, so the blocks a zone map skips are
+            # never parsed.
+            self.__loadRows(lines[1:])
+            self.dirty = True
+        self.__loadZoneMap(dbDir)
+        self.setStorage(self.storage)
+        self.__loadIndexes(dbDir)
+
+    def isLoaded(self):
+        '''
+        Purpose:    Check if the rows, zone map and indexes were read
+     	Parameters: None
+    	Returns:    False until the table data is first used
+        '''
+        return self.__pending is None
+
+    @property
+    def __rows(self):
+        '''
+        Purpose:    Get the rows as stored, reading the table first if needed
+     	Parameters: None
+    	Returns:    A list of row tuples, a PageFile or a ColumnStore
+        '''
+        self.__load()
+        return self.__stored
+
+    @property
+    def indexes(self):
+        '''
+        Purpose:    Get the indexes of the table, reading the table first if
+                    needed
+     	Parameters: None
+    	Returns:    A dictionary mapping lowercase index names to indexes
+        '''
+        self.__load()
+        return self.__indexes
+
+    @indexes.setter
+    def indexes(self, indexes):
+        self.__indexes = indexes
+
+    @property
+    def zoneMap(self):
+        '''
+        Purpose:    Get the zone map of the table, reading the table first if
+                    needed
+     	Parameters: None
+    	Returns:    A ZoneMap object, or None until it is built
+        '''
+        self.__load()
+        return self.__zoneMap
+
+    @zoneMap.setter
+    def zoneMap(self, zoneMap):
+        self.__zoneMap = zoneMap
+
+    @property
+    def rows(self):
+        '''
+        Purpose:    Get every row of the table, parsing the ones not read yet
+     	Parameters: None
+    	Returns:    A list of row tuples, a PageFile or a ColumnStore
+        '''
+        rows = self.__rows
+        if self.__unparsed:
+            self.__parseRows(0, self.getRowCount())
+        return rows
+
+    @rows.setter
+    def rows(self, rows):
+        '''
+        Purpose:    Replace every row of the table. The zone map no longer
+                    matches the rows and is rebuilt when next needed.
+     	Parameters: rows: A list of row tuples, a PageFile or a ColumnStore
+    	Returns:    None
+        '''
+        self.__load()
+        self.__stored = rows
+        self.__lines = None
+        self.__unparsed = set()
+        self.zoneMap = None
+
+    def getRowCount(self):
+        '''
+        Purpose:    Count the rows of the table without parsing them
+     	Parameters: None
+    	Returns:    The number of rows
+        '''
+        if self.__pending is not None and self.knownRowCount is not None:
+            return self.knownRowCount
+        return len(self.__rows)
+
+    def readRows(self, start, stop):
+        '''
+        Purpose:    Read a range of rows of a row-stored table, parsing only
+                    the blocks it covers
+     	Parameters: start: The position of the first row
+                    stop: The position after the last row
+    	Returns:    A list of row tuples
+        '''
+        rows = self.__rows
+        if self.__unparsed:
+            self.__parseRows(start, stop)
+        return rows[start:stop]
+
+    def getRows(self, rowIds):
+        '''
+        Purpose:    Read some rows by position, parsing only their blocks
+     	Parameters: rowIds: The positions of the rows
+    	Returns:    A list of row tuples
+        '''
+        rows = self.__rows
+        if self.__unparsed:
+            for block in sorted(set(rowId // ZoneMap.BLOCK_SIZE for rowId in rowIds)):
+                self.__parseBlock(block)
+        return [rows[rowId] for rowId in rowIds]
+
+    def blockRanges(self, predicate=None):
+        '''
+        Purpose:    Find the rows a scan has to read
+     	Parameters: predicate: Optional compiled Predicate or Conjunction
+    	Returns:    A list of (start, stop) row ranges. The blocks the zone
+                    map rules out are left out.
+        '''
+        if predicate is None or self.getRowCount() == 0:
+            return [(0, self.getRowCount())]
+        return self.__zones().ranges(predicate)
+
+    def __zones(self):
+        '''
+        Purpose:    Get the zone map, building it from the rows if needed
+     	Parameters: None
+    	Returns:    A ZoneMap object
+        '''
+        if self.zoneMap is None:
+            self.zoneMap = ZoneMap.build(self.__castTypes(), Pipeline.scan(self))
+        return self.zoneMap
+
+    def __castTypes(self):
+        '''
+        Purpose:    Get the python type of each column
+     	Parameters: None
+    	Returns:    A list of python types in schema order
+        '''
+        return [self.getType(dataType) for dataType in self.schema.values()]
+
+    def __loadRows(self, lines):
+        '''
+        Purpose:    Keep the row lines of a text table file to parse on demand
+     	Parameters: lines: The row lines of the table file
+    	Returns:    None
+        '''
+        self.rows = [None] * len(lines)
+        self.__lines = lines
+        self.__unparsed = set(range((len(lines) + ZoneMap.BLOCK_SIZE - 1) // ZoneMap.BLOCK_SIZE))
+
+    def __loadZoneMap(self, dbDir):
+        '''
+        Purpose:    Read the zone map stored with the table
+     	Parameters: dbDir: The directory of the database
+    	Returns:    None
+        '''
+        zoneMap = ZoneMap.load(dbDir + self.__zoneMapFile())
+        # A zone map written for another state of the table file, or for
+        # other columns, is rebuilt
+        if zoneMap is not None and zoneMap.stamp is not None and zoneMap.stamp == self.getFileStamp() \
+                and zoneMap.rowCount == self.getRowCount() and zoneMap.castTypes == self.__castTypes():
+            self.zoneMap = zoneMap
+
+    def __parseRows(self, start, stop):
+        '''
+        Purpose:    Parse the blocks of rows covering a range
+     	Parameters: start: The position of the first row
+                    stop: The position after the last row
+    	Returns:    None
+        '''
+        for block in range(start // ZoneMap.BLOCK_SIZE, (stop - 1) // ZoneMap.BLOCK_SIZE + 1):
+            self.__parseBlock(block)
+
+    def __parseBlock(self, block):
+        '''
+        Purpose:    Parse a block of rows if it was not read yet
+     	Parameters: block: The number of the block
+    	Returns:    None
+        '''
+        if block not in self.__unparsed:
+            return
+        start = block * ZoneMap.BLOCK_SIZE
+        stop = min(start + ZoneMap.BLOCK_SIZE, len(self.__lines))
+        self.__rows[start:stop] = [self.__parseRow(line) for line in self.__lines[start:stop]]
+        self.__unparsed.discard(block)
+        if not self.__unparsed:
+            self.__lines = None
+
+    def __zoneMapFile(self):
+        '''
+        Purpose:    Get the name of the file the zone map is stored in
+     	Parameters: None
+    	Returns:    <table name>.zmap
+        '''
+        return self.tableName + ".zmap"
 
     def getFriendlyName(self):
         '''
@@ -60,57 +328,406 @@ class Table(object):
         '''
         return self.safeName
 
-    def save(self):
+    def save(self, sync=True):
         '''
-        Purpose:    Write a table file to disk for persistent storage
-    	Parameters: None
+        Purpose:    Write a table file to disk for persistent storage. Tables
+                    not changed since they were read or saved are skipped.
+    	Parameters: sync: False to leave syncing the zone map and index
+                          files to a later checkpoint of the write-ahead log
     	Returns:    None
         '''
-        if self.dbName is not None:
+        if self.dbName is not None and self.dirty:
             dbDir = './' + self.dbName + '/'
-            fid = open(dbDir + self.fileName, mode='w')
+            path = dbDir + self.fileName
+            pageFile = self.__changedFile()
+            if pageFile is not None:
+                # Only the pages changed since the last save are written
+                pageFile.sync()
+            else:
+                # Rows held in memory are written to a new page file, with
+                # the schema in its header page
+                pageFile = PageFile.create(path, self.getSchemaString().strip(),
+                                           Pipeline.rows(Pipeline.scan(self)))
+                self.layoutVersion = PageFile.VERSION
+                if self.storage == Settings.ROW_STORAGE:
+                    # The rows are read back from the file from now on
+                    zoneMap = self.zoneMap
+                    self.rows = pageFile
+                    self.zoneMap = zoneMap
 
-            # Write the schema as the first row
-            fid.write(self.getSchemaString())
+            zoneMap = self.__zones()
+            stamp = self.getFileStamp()
+            if zoneMap.dirty or zoneMap.stamp != stamp or not os.path.exists(dbDir + self.__zoneMapFile()):
+                zoneMap.save(dbDir + self.__zoneMapFile(), stamp, sync)
 
-            # Write each row to the file
-            for row in self.rows:
-                fid.write(" | ".join(row.values()))
-                fid.write('\n')
-            fid.close()
+            # Write the indexes that changed and remove the dropped ones
+            for index in self.indexes.values():
+                index.save(dbDir + index.getFileName(), sync)
+            for path in self.__indexFiles(dbDir):
+                if os.path.basename(path) not in self.getFiles():
+                    os.remove(path)
+            self.stamp = self.getFileStamp()
+            self.dirty = False
+            self.__changes = []
+
+    def logChanges(self, log):
+        '''
+        Purpose:    Add the pages of the table file changed since the last
+                    save to the commit in progress of a write-ahead log, so
+                    they can be written again if saving the table fails
+     	Parameters: log: The WriteAheadLog of the database
+    	Returns:    False if the table file is written again in full when
+                    the table is next saved, so there are no pages to log
+        '''
+        if self.dbName is None or not self.dirty:
+            return True
+        pageFile = self.__changedFile()
+        if pageFile is None:
+            return False
+        log.logPages(self.fileName, pageFile.changes())
+        return True
+
+    def repair(self):
+        '''
+        Purpose:    Rebuild the zone map and indexes of a table whose file
+                    was recovered from the write-ahead log, since they may
+                    have been written for other rows
+     	Parameters: None
+    	Returns:    None
+        '''
+        self.zoneMap = None
+        for index in self.indexes.values():
+            index.rebuild()
+        self.dirty = True
+
+    def __changedFile(self):
+        '''
+        Purpose:    Get the page file holding the changes made to the table
+                    since the last save. Changes to rows held in column
+                    storage are applied to the pages of the file first.
+     	Parameters: None
+    	Returns:    The PageFile object, or None if the table file has to be
+                    written again in full
+        '''
+        path = './' + self.dbName + '/' + self.fileName
+        if isinstance(self.__rows, PageFile) and self.__rows.path == path:
+            return self.__rows
+        if self.__changes is None or not os.path.isfile(path) or not PageFile.isPageFile(path):
+            return None
+        pageFile = PageFile(path)
+        for kind, rowIds, value in self.__changes:
+            if kind == self.APPEND_CHANGE:
+                pageFile.append(value)
+            elif kind == self.UPDATE_CHANGE:
+                pageFile.update(rowIds, lambda row: self.__updateRow(row, value))
+            else:
+                pageFile.delete(rowIds)
+        # The changed pages wait in the buffer pool until the file is
+        # written
+        self.__changes = []
+        return pageFile
+
+    def getFileStamp(self):
+        '''
+        Purpose:    Get the size and modification time of the table file
+    	Parameters: None
+    	Returns:    A (size, modification time) tuple. None if there is no
+                    table file.
+        '''
+        if self.dbName is None:
+            return None
+        try:
+            stat = os.stat('./' + self.dbName + '/' + self.fileName)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def getStatistics(self):
+        '''
+        Purpose:    Get the smallest and largest value of each numeric column
+                    from the zone map
+    	Parameters: None
+    	Returns:    A dictionary mapping column names to [min, max]. None if
+                    the table was not read or has no zone map yet.
+        '''
+        if not self.isLoaded() or self.zoneMap is None:
+            return None
+        names = list(self.schema.keys())
+        statistics = {}
+        for position in self.zoneMap.positions:
+            bounds = self.zoneMap.bounds(position)
+            if bounds is not None:
+                statistics[names[position]] = bounds
+        return statistics
+
+    def isStale(self):
+        '''
+        Purpose:    Check if the table file changed since the table was read
+                    or saved, e.g. by another process
+    	Parameters: None
+    	Returns:    True if the table has to be read again
+        '''
+        return self.getFileStamp() != self.stamp
+
+    def getFiles(self):
+        '''
+        Purpose:    Get the files a table is stored in
+    	Parameters: None
+    	Returns:    The names of the table file, its zone map file and its
+                    index files
+        '''
+        if self.__pending is not None:
+            # The index files of a table not read yet are all kept
+            return [self.fileName, self.__zoneMapFile()] + \
+                   [os.path.basename(path) for path in self.__indexFiles(self.__pending)]
+        return [self.fileName, self.__zoneMapFile()] + [index.getFileName() for index in self.indexes.values()]
+
+    def createIndex(self, name, columns, kind=Index.BTREE, constraint=None):
+        '''
+        Purpose:    Index one or more columns of the table
+    	Parameters: name: The name of the index
+                    columns: The list of columns to index, most significant
+                             first
+                    kind: Index.BTREE or Index.HASH
+                    constraint: Index.UNIQUE or Index.PRIMARY_KEY to enforce
+                                through the index. None for a plain index.
+    	Returns:    True if the index was created. False if not.
+        '''
+        if name.lower() in self.indexes:
+            print("!Failed to create index", name, "because it already exists.")
+            return False
+        for column in columns:
+            if not self.attrExists(column):
+                print("!Failed to create index", name, "because column", column, "does not exist.")
+                return False
+        index = Index(self, name, columns, kind, constraint)
+        index.rebuild()
+        if constraint is not None:
+            # Keys holding a NULL never collide with another key
+            counts = [len(rowIds) for key, rowIds in index.getEntries().items()
+                      if None not in index.keyValues(key)]
+            if any(count > 1 for count in counts):
+                print("!Failed to create index", name, "because column", ", ".join(columns), "has duplicate values.")
+                return False
+            # A primary key must hold a value in every row
+            if constraint == Index.PRIMARY_KEY and sum(counts) != self.getRowCount():
+                print("!Failed to create index", name, "because column", ", ".join(columns), "has NULL values.")
+                return False
+        self.indexes[name.lower()] = index
+        self.dirty = True
+        return True
+
+    def dropIndex(self, name):
+        '''
+        Purpose:    Remove an index from the table
+    	Parameters: name: The name of the index
+    	Returns:    True if the index was removed. False if it does not exist.
+        '''
+        if self.indexes.pop(name.lower(), None) is None:
+            return False
+        self.dirty = True
+        return True
+
+    def __loadIndexes(self, dbDir):
+        '''
+        Purpose:    Read the headers of the index files of the table
+    	Parameters: dbDir: The directory of the database
+    	Returns:    None
+        '''
+        for path in sorted(self.__indexFiles(dbDir)):
+            index = Index.load(self, path)
+            if index is not None:
+                self.indexes[index.name.lower()] = index
+
+    def __indexFiles(self, dbDir):
+        '''
+        Purpose:    Find the index files of the table on disk
+    	Parameters: dbDir: The directory of the database
+    	Returns:    A list of paths
+        '''
+        return glob.glob(glob.escape(dbDir + self.tableName) + ".*.idx")
+
+    def __indexSearch(self, predicate):
+        '''
+        Purpose:    Pick the index answering the most conditions
+    	Parameters: predicate: The compiled Predicate or Conjunction
+    	Returns:    (index, entries, residual) as returned by Index.search,
+                    or None if no index can answer any of the conditions
+        '''
+        predicates = Conjunction.of(predicate)
+        best = None
+        for index in self.indexes.values():
+            result = index.search(predicates)
+            if result is None:
+                continue
+            # A hash index answers "=" in O(1), so it wins ties
+            rank = (len(predicates) - len(result[1]), index.kind == Index.HASH)
+            if best is None or rank > best[0]:
+                best = (rank, index, result)
+        if best is None:
+            return None
+        rank, index, (entries, residual) = best
+        return index, entries, residual
+
+    def __indexLookup(self, predicate):
+        '''
+        Purpose:    Find the rows matching a condition with an index
+    	Parameters: predicate: The compiled Predicate or Conjunction
+    	Returns:    The sorted positions of the matching rows, or None if no
+                    index can answer the condition
+        '''
+        found = self.__indexSearch(predicate)
+        if found is None:
+            return None
+        index, entries, residual = found
+        rowIds = sorted(rowId for key, ids in entries for rowId in ids)
+        if residual:
+            # Check the other conditions on the rows the index found
+            check = Conjunction(residual)
+            rows = Pipeline.rows(Pipeline.fetch(self, rowIds))
+            rowIds = [rowId for rowId, row in zip(rowIds, rows) if check(row)]
+        return rowIds
+
+    def __coveringScan(self, predicate, positions):
+        '''
+        Purpose:    Answer a query from an index alone when it holds every
+                    column the query reads, without touching the rows
+    	Parameters: predicate: The compiled Predicate or Conjunction
+                    positions: The column positions to output
+    	Returns:    A generator of row batches, or None if no index covers
+                    the query
+        '''
+        predicates = Conjunction.of(predicate)
+        needed = set(positions)
+        for p in predicates:
+            needed.update(x for x in [p.position, p.valuePosition] if x is not None)
+        best = None
+        for index in self.indexes.values():
+            if not needed.issubset(self.attrIndex[column] for column in index.columns):
+                continue
+            result = index.search(predicates)
+            if result is not None and (best is None or len(result[1]) < len(best[1][1])):
+                best = (index, result)
+        if best is None:
+            return None
+
+        index, (entries, residual) = best
+        check = Conjunction(residual) if residual else None
+        indexPositions = [self.attrIndex[column] for column in index.columns]
+        found = []
+        for key, rowIds in entries:
+            # Rebuild a row from the key; the other columns are never read
+            row = [None] * len(self.schema)
+            for position, value in zip(indexPositions, index.keyValues(key)):
+                row[position] = value
+            row = tuple(row)
+            if check is None or check(row):
+                found.extend((rowId, row) for rowId in rowIds)
+        # Keep the order of the table, as a scan would
+        found.sort(key=lambda item: item[0])
+        return Pipeline.project(Pipeline.batched(row for rowId, row in found), positions)
+
+    def __uniqueViolation(self, rows, rowIds=None, positions=None):
+        '''
+        Purpose:    Check new rows against the UNIQUE / PRIMARY KEY
+                    constraints of the table with their indexes
+    	Parameters: rows: The new row tuples
+                    rowIds: The positions of the rows they replace. None for
+                            rows added to the table.
+                    positions: The column positions that changed. Every
+                               column if None.
+    	Returns:    The Index whose constraint would be broken, or None if
+                    every constraint holds
+        '''
+        replaced = set(rowIds) if rowIds is not None else set()
+        for index in self.indexes.values():
+            if index.constraint is None or not self.__affects(index, positions):
+                continue
+            columns = [self.attrIndex[column] for column in index.columns]
+            keys = set()
+            for row in rows:
+                if any(row[position] is None for position in columns):
+                    if index.constraint == Index.PRIMARY_KEY:
+                        return index
+                    continue
+                key = index.keyOf(row)
+                if key in keys:
+                    return index
+                keys.add(key)
+                for rowId in index.positions(key):
+                    if rowId not in replaced:
+                        return index
+        return None
+
+    def __affects(self, index, positions):
+        '''
+        Purpose:    Check if changing some columns changes the keys of an index
+    	Parameters: index: The Index object
+                    positions: The changed column positions. Every column if
+                               None.
+    	Returns:    True if one of the indexed columns changed
+        '''
+        if positions is None:
+            return True
+        return any(self.attrIndex[column] in positions for column in index.columns)
 
-    def getDataByAttrName(self, attrList, where=None, joinType=None):
+    def __indexProbe(self, column):
+        '''
+        Purpose:    Get a lookup matching join keys against an index, so a
+                    join does not have to build its own hash table
+    	Parameters: column: The join column of this table
+    	Returns:    A function mapping a join key to the list of matching
+                    rows, or None if the column has no index
+        '''
+        indexes = [index for index in self.indexes.values() if index.columns == [column]]
+        if not indexes:
+            return None
+        index = min(indexes, key=lambda index: index.kind != Index.HASH)
+        return lambda key: self.getRows(sorted(index.match(key)))
+
+    def getDataByAttrName(self, attrList, where=None):
         '''
         Purpose:    Fetches table data from specified columns.
         Parameters: attrList: array of attributes to fetch.
-                    where: conditional to filter (Not yet implemented)
-        Returns:    array of tuples filtered by attributes requested.
+                    where: Optional conditional to filter on, or a list of
+                           conditionals that must all hold
+        Returns:    array of dictionaries filtered by attributes requested.
         '''
         returnSet = []
         if ["*" in tmp for tmp in attrList][0]:
             attrList = list(self.schema.keys())
-        if where is None or len(where) == 0:
-            for row in self.rows:
-                temp = {}
-                for key in list(self.schema.keys()):
-                    if key in attrList:
-                        temp[key] = row[key]
-                returnSet.append(temp)
-        else:
-            for row in self.rows:
-                if self.conditionCheck(where[0], where[1], where[2], row):
-                    temp = self.__buildRow(row, attrList)
-                    returnSet.append(temp)
-                elif joinType == Joins.LEFT_OUTER_JOIN:
-                    # Set all values from left table to NULL 
-                    prefix = self.__getPrefix(list(self.schema.keys())[0])
-                    temp = self.__buildRow(row, attrList, joinType, prefix)
-                    returnSet.append(temp)
-
-
-
+        keys = [key for key in self.schema.keys() if key in attrList]
+        for values in Pipeline.rows(self.getBatches(keys, where)):
+            returnSet.append(dict(zip(keys, values)))
         return returnSet
 
+    def getBatches(self, attrList, where=None, batches=None):
+        '''
+        Purpose:    Streams table data from specified columns.
+        Parameters: attrList: array of attributes to fetch, in output order.
+                    where: Optional conditional to filter on, or a list of
+                           conditionals that must all hold
+                    batches: Optional row batches to read instead of the
+                             rows of the table (e.g. the output of a join)
+        Returns:    A generator of row batches holding the requested columns
+        '''
+        if ["*" in tmp for tmp in attrList][0]:
+            attrList = list(self.schema.keys())
+        positions = [self.attrIndex[attr] for attr in attrList]
+        predicate = Predicate.compile(self, where)
+        if batches is None and predicate is not None:
+            covered = self.__coveringScan(predicate, positions)
+            if covered is not None:
+                return covered
+            rowIds = self.__indexLookup(predicate)
+            if rowIds is not None:
+                return Pipeline.fetch(self, rowIds, positions)
+        if batches is None:
+            return Pipeline.scan(self, predicate, positions)
+        if predicate is not None:
+            batches = Pipeline.filterRows(batches, predicate)
+        return Pipeline.project(batches, positions)
+
     def addColumn(self, attrName, dataType):
         '''
         Purpose:    Adds a column to the table.
@@ -124,9 +741,10 @@ class Table(object):
                   "because it already exists")
             return False
 
+        rows = [row + (None,) for row in self.rows]
         self.schema[attrName] = dataType
-        for row in self.rows:
-            row[attrName] = "NULL"
+        self.setSchema(self.schema)
+        self.__setRows(rows)
         return True
 
     def dropColumn(self, attrName):
@@ -138,9 +756,15 @@ class Table(object):
         if not self.__attrInSchema(attrName):
             return False
 
+        position = self.attrIndex[attrName]
+        rows = [row[:position] + row[position + 1:] for row in self.rows]
         self.schema.pop(attrName)
-        for row in self.rows:
-            row.pop(attrName)
+        self.setSchema(self.schema)
+        self.__setRows(rows)
+        # Indexes on the column go with it
+        for name, index in list(self.indexes.items()):
+            if attrName in index.columns:
+                self.indexes.pop(name)
         return True
 
     def modifyColumn(self, attrName, dataType):
@@ -153,13 +777,27 @@ class Table(object):
         if not self.__attrInSchema(attrName):
             return False
 
+        # Check the stored text of every value, so 3.14 is not castable to int
         castable = True
+        position = self.attrIndex[attrName]
         for row in self.rows:
-            if not self.__isCastableTo(row[attrName], dataType):
+            if row[position] is None:
+                continue
+            if not self.__isCastableTo(self.formatValue(row[position]), dataType):
                 castable = False
                 break
         if castable:
             self.schema[attrName] = dataType
+            castType = self.getType(dataType)
+            rows = []
+            for row in self.rows:
+                value = self.parseValue(self.formatValue(row[position]), castType)
+                rows.append(row[:position] + (value,) + row[position + 1:])
+            self.__setRows(rows)
+            # The values of the column changed type, so re-key its indexes
+            for index in self.indexes.values():
+                if attrName in index.columns:
+                    index.rebuild()
             return True
         else:
             return False
@@ -170,7 +808,50 @@ class Table(object):
      	Parameters: schema: A dictionary containing the schema for the table
     	Returns:    None
         '''
+        # Rows not read yet are parsed with the column types they were
+        # written with
+        if self.__unparsed:
+            self.__parseRows(0, self.getRowCount())
         self.schema = schema
+        self.zoneMap = None
+        self.dirty = True
+        self.__changes = None
+        # Every row is a tuple in schema order; map names to positions once
+        self.attrIndex = {attrName: i for i, attrName in enumerate(schema.keys())}
+
+    def setStorage(self, storage):
+        '''
+        Purpose:    Switch the table between row and column storage
+     	Parameters: storage: Settings.ROW_STORAGE or Settings.COLUMN_STORAGE
+    	Returns:    None
+        '''
+        if storage == Settings.COLUMN_STORAGE and not ColumnStore.isAvailable():
+            storage = Settings.ROW_STORAGE
+        self.storage = storage
+        if self.__pending is not None:
+            # The rows are put in this storage when they are read
+            return
+        if storage == Settings.ROW_STORAGE and not isinstance(self.__rows, ColumnStore):
+            return
+        # The rows keep their values, so the zone map and the table file
+        # still hold
+        zoneMap, dirty, changes = self.zoneMap, self.dirty, self.__changes
+        self.__setRows(self.rows)
+        self.zoneMap, self.dirty, self.__changes = zoneMap, dirty, changes
+
+    def __setRows(self, rows):
+        '''
+        Purpose:    Replace every row of the table, in the table's storage
+     	Parameters: rows: An iterable of row tuples
+    	Returns:    None
+        '''
+        if self.storage == Settings.COLUMN_STORAGE:
+            castTypes = [self.getType(dataType) for dataType in self.schema.values()]
+            self.rows = ColumnStore(castTypes, rows)
+        else:
+            self.rows = list(rows)
+        self.dirty = True
+        self.__changes = None
 
     def getSchemaString(self):
         '''
@@ -206,7 +887,7 @@ class Table(object):
                       "because there must be a value for every attribute")
                 return False
 
-            row = {}
+            row = []
             index = 0
             for attrName, dataType in list(self.schema.items()):
                 # Check that the data type of this element is correct
@@ -215,9 +896,10 @@ class Table(object):
                           "because data type does not match schema!")
                     return False
                 # Add to the row
-                row[attrName] = values[index]
+                row.append(self.castColumn(values[index], self.getType(dataType)))
                 index += 1
-            self.rows.append(row)
+            if not self.__appendRow(tuple(row)):
+                return False
             print("1 new record inserted.")
             return True
 
@@ -227,7 +909,7 @@ class Table(object):
                       "because there must be a value for every attribute")
                 return False
             
-            row = {}
+            row = []
             index = 0 
             for attrName, dataType in list(self.schema.items()):
                 # Check to see if the column has data 
@@ -238,12 +920,13 @@ class Table(object):
                               "because data type does not match schema!")
                         return False
                     # Add to the row 
-                    row[attrName] = values[index]
+                    row.append(self.castColumn(values[index], self.getType(dataType)))
                     index += 1
                 else:
                     # Set value to NULL 
-                    row[attrName] = "NULL"
-            self.rows.append(row)
+                    row.append(None)
+            if not self.__appendRow(tuple(row)):
+                return False
             print("1 new record inserted.")
             return True 
 
@@ -251,27 +934,52 @@ class Table(object):
         '''
         Purpose : Delete items from the table given certain conditions
     	Parameters :
-    		where: A list of conditions. If None, delete all entries in the table
+    		where: A condition list, or a list of them that must all hold.
+                   If None, delete all entries in the table
     	Returns: Boolean representing status of the operation
         '''
         if where is None or len(where) == 0:
-            self.rows = []
+            self.__setRows([])
+            self.__rebuildIndexes()
             return True
 
-        # Check that the column exists
-        column = where[0]
-
-        if not self.attrExists(column):
-            print("!Failed to delete from table", self.tableName,
-                  "because column", column, "does not exist")
-            return False
+        # Check that the columns exist
+        for column in self.__conditionColumns(where):
+            if not self.attrExists(column):
+                print("!Failed to delete from table", self.tableName,
+                      "because column", column, "does not exist")
+                return False
 
         # Go through all data, check conditions. If the condition passes, delete
-        delRows = self.getDataByAttrName('*', where)
-        for row in delRows:
-            self.rows.remove(row)
-        print(len(delRows), "records" if len(
-            delRows) > 1 else "record", "deleted.")
+        predicate = Predicate.compile(self, where)
+        rowIds = self.__indexLookup(predicate)
+        zoneMap = self.zoneMap
+        if isinstance(self.__rows, ColumnStore):
+            # Evaluate the condition for every row at once and drop the
+            # selected positions from each column in bulk
+            mask = self.rows.mask(predicate) if rowIds is None else self.rows.positionMask(rowIds)
+            deleted = mask.nonzero()[0].tolist()
+            self.__record(self.DELETE_CHANGE, deleted)
+            self.rows.compress(~mask)
+        else:
+            deleted = sorted(set(self.__matchingRows(predicate) if rowIds is None else rowIds))
+            if deleted and isinstance(self.__rows, PageFile):
+                # Only the pages from the first deleted row on are rewritten
+                self.__rows.delete(deleted)
+            elif deleted:
+                removed = set(deleted)
+                self.__setRows([row for i, row in enumerate(self.rows) if i not in removed])
+        if deleted:
+            # The rows after each deleted one moved up: the zone map and
+            # indexes drop the deleted rows and shift the others in place
+            if zoneMap is not None:
+                zoneMap.delete(deleted)
+            self.zoneMap = zoneMap
+            for index in self.indexes.values():
+                index.delete(deleted)
+            self.dirty = True
+        count = len(deleted)
+        print(count, "records" if count > 1 else "record", "deleted.")
         return True
 
     def update(self, updates, where=None):
@@ -279,7 +987,8 @@ class Table(object):
         Purpose : Updates items from the table given certain conditions
     	Parameters :
             updates: A dictionary of updates to make to the table
-    		where: A list of conditions. If None, update all entries in the table
+    		where: A condition list, or a list of them that must all hold.
+                   If None, update all entries in the table
     	Returns: Boolean representing status of the operation
         '''
         # Verify that the columns to update exist in the table.
@@ -288,32 +997,197 @@ class Table(object):
                 print("!Failed to update table", self.tableName,
                       "because", column, "is not an attribute in the table.")
                 return False
+            if not self.__isCastableTo(value, self.schema[column]):
+                print("!Failed to update table", self.tableName,
+                      "because data type does not match schema!")
+                return False
+
+        # Cast the new values once instead of once per updated row, keyed
+        # by their position in the row
+        updates = {self.attrIndex[column]: self.castColumn(value, self.getType(self.schema[column]))
+                   for column, value in list(updates.items())}
         # If where isn't specified, update every row.
         if where is None or len(where) == 0:
-            for row in self.rows:
-                for column, value in list(updates.items()):
-                    row[column] = value
+            if not self.__checkUpdate(updates, list(range(self.getRowCount()))):
+                return False
+            if isinstance(self.__rows, ColumnStore):
+                self.rows.assign(None, updates)
+                self.zoneMap = None
+                # Every page changes, so the file is written again
+                self.__changes = None
+            elif isinstance(self.__rows, PageFile):
+                self.__rows.update(range(self.getRowCount()), lambda row: self.__updateRow(row, updates))
+                self.zoneMap = None
+            else:
+                self.__setRows([self.__updateRow(row, updates) for row in self.rows])
+            self.__rebuildIndexes(updates)
+            self.dirty = True
             return True
 
         # Else update only the rows that match the where.
-        column = where[0]
-        operator = where[1]
-        value = where[2]
-
-        # Verify that the where column exists.
-        if not self.attrExists(column):
-            print("!Failed to update table", self.tableName, "because",
-                  column, "is not an attribute in the table.")
-            return False
+        # Verify that the where columns exist.
+        for column in self.__conditionColumns(where):
+            if not self.attrExists(column):
+                print("!Failed to update table", self.tableName, "because",
+                      column, "is not an attribute in the table.")
+                return False
 
         # For every row of the table, check against the where conditional and update if successful.
-        for row in self.rows:
-            if self.conditionCheck(column, operator, value, row):
-                for upCol, upVal in list(updates.items()):
-                    row[upCol] = upVal
+        predicate = Predicate.compile(self, where)
+        rowIds = self.__indexLookup(predicate)
+        # Indexes on an updated column are re-keyed for the updated rows
+        changed = [index for index in self.indexes.values() if self.__affects(index, updates)]
+        mask = None
+        if isinstance(self.__rows, ColumnStore):
+            # Evaluate the condition for every row at once
+            mask = self.rows.mask(predicate) if rowIds is None else self.rows.positionMask(rowIds)
+            if rowIds is None:
+                rowIds = mask.nonzero()[0].tolist()
+        elif rowIds is None:
+            rowIds = self.__matchingRows(predicate)
+        if not self.__checkUpdate(updates, rowIds):
+            return False
+
+        before = list(Pipeline.rows(Pipeline.fetch(self, rowIds))) if changed else []
+        if mask is not None:
+            # Overwrite the selected positions of each updated column in bulk
+            self.rows.assign(mask, updates)
+            self.__record(self.UPDATE_CHANGE, rowIds, updates)
+        elif isinstance(self.__rows, PageFile):
+            # Each page holding an updated row is rewritten once
+            self.__rows.update(rowIds, lambda row: self.__updateRow(row, updates))
+        else:
+            for i, row in zip(rowIds, self.getRows(rowIds)):
+                self.__rows[i] = self.__updateRow(row, updates)
+        if self.zoneMap is not None:
+            # The new values now live in the blocks of the updated rows
+            values = tuple(updates.get(i) for i in range(len(self.schema)))
+            for rowId in rowIds:
+                self.zoneMap.widen(rowId, values)
 
+        for rowId, row in zip(rowIds or [], before):
+            newRow = self.__updateRow(row, updates)
+            for index in changed:
+                index.remove(row, rowId)
+                index.add(newRow, rowId)
+        if rowIds:
+            self.dirty = True
         return True
 
+    def __checkUpdate(self, updates, rowIds):
+        '''
+    	Purpose:    Check that an update keeps the UNIQUE / PRIMARY KEY
+                    constraints of the table, and that the updated rows
+                    still fit in a page
+    	Parameters: updates: A dictionary mapping positions to new values
+                    rowIds: The positions of the updated rows
+    	Returns:    True if every constraint holds
+        '''
+        # Only new text can make a row outgrow its page
+        grows = any(isinstance(value, str) for value in updates.values())
+        constrained = any(index.constraint is not None and self.__affects(index, updates)
+                          for index in self.indexes.values())
+        if not grows and not constrained:
+            return True
+        rows = [self.__updateRow(row, updates) for row in Pipeline.rows(Pipeline.fetch(self, rowIds))]
+        if grows and not all(PageFile.fits(row) for row in rows):
+            print("!Failed to update table", self.tableName,
+                  "because a row would not fit in a page.")
+            return False
+        if not constrained:
+            return True
+        index = self.__uniqueViolation(rows, rowIds, updates)
+        if index is not None:
+            print("!Failed to update table", self.tableName,
+                  "because it would break the", index.constraint, "constraint on", ", ".join(index.columns) + ".")
+            return False
+        return True
+
+    def __appendRow(self, row):
+        '''
+    	Purpose:    Add a row at the end of the table and to its indexes,
+                    unless it breaks a UNIQUE / PRIMARY KEY constraint
+    	Parameters: row: The row tuple to add
+    	Returns:    True if the row was added
+        '''
+        index = self.__uniqueViolation([row])
+        if index is not None:
+            print("!Failed to insert on table", self.tableName,
+                  "because it would break the", index.constraint, "constraint on", ", ".join(index.columns) + ".")
+            return False
+        if not PageFile.fits(row):
+            print("!Failed to insert on table", self.tableName,
+                  "because the row does not fit in a page.")
+            return False
+        # Appended rows never go to a block that is still unparsed
+        if self.__unparsed:
+            self.__parseBlock((self.getRowCount() - 1) // ZoneMap.BLOCK_SIZE)
+        self.__rows.append(row)
+        self.dirty = True
+        self.__record(self.APPEND_CHANGE, None, row)
+        rowId = self.getRowCount() - 1
+        if self.zoneMap is not None:
+            self.zoneMap.add(row)
+        for index in self.indexes.values():
+            index.add(row, rowId)
+        return True
+
+    def __record(self, kind, rowIds, value=None):
+        '''
+    	Purpose:    Note a change to apply to the table file when the table is
+                    next saved. Rows in a page file are changed in place, so
+                    only the changes to rows held in memory are kept.
+    	Parameters: kind: APPEND_CHANGE, UPDATE_CHANGE or DELETE_CHANGE
+                    rowIds: The sorted positions of the changed rows
+                    value: The appended row, or the updates of the rows
+    	Returns:    None
+        '''
+        if self.__changes is not None and not isinstance(self.__stored, PageFile):
+            self.__changes.append((kind, rowIds, value))
+
+    def __matchingRows(self, predicate):
+        '''
+    	Purpose:    Find the rows matching a condition, reading only the
+                    blocks the zone map cannot rule out
+    	Parameters: predicate: The compiled Predicate or Conjunction
+    	Returns:    The sorted positions of the matching rows
+        '''
+        rowIds = []
+        for start, stop in self.blockRanges(predicate):
+            rows = self.readRows(start, stop)
+            rowIds.extend(start + i for i, row in enumerate(rows) if predicate(row))
+        return rowIds
+
+    def __conditionColumns(self, where):
+        '''
+    	Purpose:    Get the columns a WHERE clause checks
+    	Parameters: where: A condition list, or a list of them
+    	Returns:    A list of column names
+        '''
+        if isinstance(where[0], str):
+            where = [where]
+        return [condition[0] for condition in where]
+
+    def __rebuildIndexes(self, updates=None):
+        '''
+    	Purpose:    Rebuild the indexes after many rows changed
+    	Parameters: updates: Only rebuild the indexes on these column
+                             positions. Every index if None.
+    	Returns:    None
+        '''
+        for index in self.indexes.values():
+            if self.__affects(index, updates):
+                index.rebuild()
+
+    def __updateRow(self, row, updates):
+        '''
+    	Purpose:    Build the updated copy of a row
+    	Parameters: row: The row to update
+                    updates: A dictionary mapping positions to new values
+    	Returns:    A new row tuple with the updates applied
+        '''
+        return tuple(updates.get(i, value) for i, value in enumerate(row))
+
     def __parseSchema(self, schemaInput):
         '''
         Purpose:    Parses schema in format saved to files.
@@ -337,16 +1211,12 @@ class Table(object):
         '''
     	Purpose:    Parse a row of data into a structured form
     	Parameters: rowInput: The row to parse
-    	Returns:    A dictionary containing the data and column names
+    	Returns:    A tuple containing the typed data in schema order
         '''
         columns = rowInput.split('|')
-        attributes = list(self.schema.keys())
-
-        row = {}
-        for i in range(len(columns)):
-            row[attributes[i]] = columns[i].strip()
+        castTypes = [self.getType(dataType) for dataType in self.schema.values()]
 
-        return row
+        return tuple(self.parseValue(columns[i].strip(), castTypes[i]) for i in range(len(columns)))
 
     def __attrInSchema(self, attrName):
         '''
@@ -391,48 +1261,10 @@ class Table(object):
             value: RHS of the conditional
             row: The row to compare with
         Returns: True if the values match the given conditional statement
+        Note : Compiles a one-off Predicate. To check many rows, build the
+               Predicate once and call it on each row instead.
         ''' 
-        # Data sanitization
-        column = column.strip().replace("'", '')
-        operator = operator.strip()
-        value = value.strip().replace("'", '')
-
-        castType = None 
-        try:
-            castType = self.getType(self.schema[column])
-            if '.' in value:
-                castType2 = self.getType(self.schema[value])
-                value = self.castColumn(row[value], castType2)
-            else:
-                value = self.castColumn(value, castType)
-        except:
-            return False 
-
-        testValue = self.castColumn(row[column], castType)
-        return self.__conditionCompare(testValue, operator, value)
-
-    def __conditionCompare(self, lVal, operator, rVal):
-        ''' 
-        Purpose : Compare two values based on a string operator
-        Parameters : 
-            lVal: LHS
-            operator: Operator as a string
-            rVal: RHS
-        Returns: The result of the comparison
-        ''' 
-        if operator == "=":
-            return lVal == rVal
-        if operator == "!=" or operator == "<>":
-            return lVal != rVal
-        if operator == "<":
-            return lVal < rVal
-        if operator == ">":
-            return lVal > rVal
-        if operator == "<=":
-            return lVal <= rVal
-        if operator == ">=":
-            return lVal >= rVal
-        return False
+        return Predicate(self, column, operator, value)(row)
 
     def castColumn(self, column, castType):
         ''' 
@@ -444,6 +1276,36 @@ class Table(object):
         ''' 
         return castType(column)
 
+    def parseValue(self, text, castType):
+        ''' 
+        Purpose : Cast a value read from a table file to its column type
+        Parameters : 
+            text: The value as stored on disk
+            castType: The python type of the column
+        Returns: The typed value. None for NULL, and the text itself if it
+                 cannot be casted
+        ''' 
+        if text == "NULL":
+            return None
+        try:
+            return castType(text)
+        except (TypeError, ValueError):
+            return text
+
+    def formatValue(self, value):
+        ''' 
+        Purpose : Convert a typed value back to the text stored on disk
+        Parameters : 
+            value: The value to convert
+        Returns: The value as a string. NULL for None
+        ''' 
+        if value is None:
+            return "NULL"
+        if type(value) is float:
+            text = repr(value)
+            return text[:-2] if text.endswith(".0") else text
+        return str(value)
+
     def getType(self, string):
         ''' 
         Purpose : Get a python type from a string
@@ -463,41 +1325,24 @@ class Table(object):
         if string == "float":
             return float
     
-    def printTableByAttr( self, attrList, where=None, joinType=None):
+    def printTableByAttr( self, attrList, where=None, batches=None):
         ''' 
-        Purpose : Print a table given attributes / conditionals
+        Purpose : Print a table given attributes / conditionals. Rows are
+                  written a batch at a time as they are produced, in the
+                  format and to the output chosen with SET FORMAT / OUTPUT.
         Parameters : 
             attrList: A list of attributes to print
             where: Optional conditional
-            joinType: Optional join type
+            batches: Optional row batches to print instead of the rows of
+                     the table (e.g. the output of a join)
         Returns: None
         ''' 
-        header = ""
-        body = ""
-        rows = self.getDataByAttrName(attrList, where, joinType)
-        index = 1
         if ["*" in tmp for tmp in attrList][0]:
-            attrList = self.schema.keys()
-        for attr in attrList:
-            cleanAttr = attr.split(".")
-            if( len(cleanAttr) > 1):
-                cleanAttr = cleanAttr[1]
-            else:
-                cleanAttr = cleanAttr[0]
-            header += cleanAttr + " " + self.schema[attr]
-            header += "|" if(index<len(attrList)) else ""
-            index += 1
-        print(header)
-
-        for row in rows:
-            index = 1
-            for value in row.values():
-                body += value
-                body += "|" if(index<len(row)) else ""
-                index += 1
-            body += "\n"
-        body = body[0:-1]
-        print(body)
+            attrList = list(self.schema.keys())
+        with ResultWriter(self.formatValue) as writer:
+            writer.writeHeader(attrList, [self.schema[attr] for attr in attrList])
+            for batch in self.getBatches(attrList, where, batches):
+                writer.writeRows(batch)
 
     def printTable( self ):
         ''' 
@@ -508,54 +1353,75 @@ class Table(object):
         ''' 
         self.printTableByAttr( ["*"] )
 
-    def __getPrefix(self, attribute):
-        '''
-    	Purpose : Get the prefix of a given attribute
-    	Parameters : 
-    		attribute: The attribute to get
-    	Returns: The prefix (before the .) of the attribute. None if there is no .
-        '''
-        result = attribute.split('.')
-        if(len(result) == 1):
-            return None 
-        return result[0]
-
-    def __buildRow(self, row, attrList, joinType=Joins.NO_JOIN, prefix=None):
-        '''
-    	Purpose : Build a row based on a join type
-    	Parameters : 
-            row: The row currently being looked at 
-            attrList: The list of attributes to be returned 
-    		joinType: the type of join performed
-            prefix: The tablename used for building the row
-    	Returns: A row built based on the join type / prefix given
-        '''
-        temp = {}
-        for key in list(self.schema.keys()):
-            if key in attrList:
-                if joinType == Joins.LEFT_OUTER_JOIN and self.__getPrefix(key) != prefix:
-                    temp[key] = ""
-                else:
-                    temp[key] = row[key]
-        return temp 
+    def __mergedSchema(self, rtable):
+        '''
+    	Purpose : Build the schema of a join result
+    	Parameters :
+    		rtable: The right table of the join (self is the left table)
+    	Returns: A schema with every column prefixed by its table name, left
+                 table columns first
+        '''
+        schema = {}
+        for table in [self, rtable]:
+            for k, v in list(table.schema.items()):
+                schema[table.getFriendlyName() + "." + k] = v
+        return schema
+
+    def __joinColumns(self, rtable, conditions):
+        '''
+    	Purpose : Split a join condition into the join column of each table
+    	Parameters :
+    		rtable: The right table of the join (self is the left table)
+            conditions: The join condition as [lhs, operator, rhs]
+    	Returns: (left column, operator, right column) tuple without table
+                 prefixes, with the operator flipped if the condition named
+                 the right table first
+        '''
+        flipped = {"<": ">", ">": "<", "<=": ">=", ">=": "<="}
+        lhs = conditions[0].strip().split('.')
+        operator = conditions[1].strip()
+        rhs = conditions[2].strip().split('.')
+        if lhs[0] == rtable.getFriendlyName() and rhs[0] == self.getFriendlyName():
+            lhs, rhs = rhs, lhs
+            operator = flipped.get(operator, operator)
+        return lhs[-1], operator, rhs[-1]
+
+    def __joinInput(self, column, keepNulls=False, where=None):
+        '''
+    	Purpose : Build the input of a join algorithm from this table
+    	Parameters :
+    		column: The join column of this table
+            keepNulls: Keep rows whose value cannot be casted with a None key
+            where: Optional conditions on this table alone the rows must
+                   match, checked as the table is read
+    	Returns: A generator of (join key, row) pairs, read a batch at a time
+        '''
+        castType = self.getType(self.schema[column])
+        position = self.attrIndex[column]
+        # The conditions can use the zone map and indexes of the table
+        batches = self.getBatches(["*"], where) if where else Pipeline.scan(self)
+        for row in Pipeline.rows(batches):
+            key = self.__joinKey(row[position], castType)
+            if key is not None or keepNulls:
+                yield key, row
 
-    def __addTableNameToRow(self, tname, row):
+    def __joinKey(self, value, castType):
         '''
-    	Purpose : Add a table's name to a row's keys
+    	Purpose : Get the key used to match a join column value
     	Parameters :
-    		tname: The name of the table to prepend to the row's keys
-            row: The row to correct
-    	Returns: A new row with the table name prepended to each key
+    		value: The typed value stored in the row
+            castType: The python type of the join column
+    	Returns: The value itself. None for NULL or a value that does not
+                 have the column type
         '''
-        newRow = {}
-        for k, v in list(row.items()):
-            newRow[tname + "." + k] = v
-        return newRow
+        if isinstance(value, castType):
+            return value
+        return None
 
     @classmethod 
     def OuterJoin(cls, ltable, rtable, joinType, conditions):
         ''' 
-        Purpose : Do an outer join on two tables 
+        Purpose : Do an outer join on two tables
         Parameters : 
             ltable: The left table 
             rtable: The right table
@@ -563,8 +1429,29 @@ class Table(object):
             conditions: Conditions for adding rows
         Returns: Table object representing the join operation
         ''' 
-        found = False 
+        batches = cls.iterOuterJoin(ltable, rtable, joinType, conditions)
+        if batches is None:
+            return None
         T = Table(None, "MERGE", True)
+        T.setSchema(cls.__mergedSchema(ltable, rtable))
+        T.rows = list(Pipeline.rows(batches))
+        return T 
+
+    @classmethod 
+    def iterOuterJoin(cls, ltable, rtable, joinType, conditions):
+        ''' 
+        Purpose : Stream an outer join of two tables. Equi-joins probe a hash
+                  table built on the inner side, so unmatched rows are
+                  NULL-padded in a single pass over the outer side, which
+                  is never materialized.
+        Parameters : 
+            ltable: The left table 
+            rtable: The right table
+            joinType: The type of join (use Joins.TYPE)
+            conditions: Conditions for adding rows
+        Returns: A generator of batches of joined rows (left table columns
+                 first), None for an unknown join type
+        ''' 
         L, R = None, None
         if joinType == Joins.LEFT_OUTER_JOIN:
             L = ltable 
@@ -575,31 +1462,78 @@ class Table(object):
         else:
             return None
 
-        lName = L.getFriendlyName()
-        rName = R.getFriendlyName()
+        lCol, operator, rCol = cls.__joinColumns(L, R, conditions)
 
-        lCol = conditions[0].strip() # lCol = conditions[0].replace(lName, '')[1:]
-        operator = conditions[1].strip()
-        rCol = conditions[2].strip() # rCol = conditions[2].replace(rName, '')[1:]
-
-        for lRow in L.rows:
-            found = False 
-            lRow = cls.__addTableNameToRow(L, lName, lRow)
-            lVal = lRow[lCol]
-            index = 1
-            for rRow in R.rows:
-                rRow = cls.__addTableNameToRow(R, rName, rRow)
-                rVal = rRow[rCol]
-                if(cls.__conditionCompare(L, lVal, operator, rVal)):
-                    # Add the row normally 
-                    row = {**lRow, **rRow}
-                    T.rows.append(row)
-                    found = True 
-                elif index == len(R.rows) and found == False:
-                    for k in list(rRow.keys()):
-                        rRow[k] = ""
-                    row = {**lRow, **rRow}
-                    T.rows.append(row)
-                index += 1
+        # Unmatched left rows are kept with a None key so they get padded 
+        left = cls.__joinInput(L, lCol, True)
+        right = cls.__joinInput(R, rCol)
+        nullRow = (None,) * len(R.schema)
+        # An index on the inner join column is probed instead of building a
+        # hash table over the inner table
+        lookup = cls.__indexProbe(R, rCol) if operator == "=" else None
+
+        def joined():
+            for lRow, matches in JoinAlgorithms.probe(left, operator, right, lookup):
+                # Unmatched rows are padded with NULLs on the other side 
+                for rRow in matches or [nullRow]:
+                    if L is ltable:
+                        yield lRow + rRow
+                    else:
+                        yield rRow + lRow
+        return Pipeline.batched(joined())
+
+    @classmethod
+    def InnerJoin(cls, ltable, rtable, conditions):
+        ''' 
+        Purpose : Do an inner join on two tables
+        Parameters : 
+            ltable: The left table 
+            rtable: The right table
+            conditions: Condition between a column of each table
+        Returns: Table object representing the join operation
+        ''' 
+        T = Table(None, "MERGE", True)
+        T.setSchema(cls.__mergedSchema(ltable, rtable))
+        T.rows = list(Pipeline.rows(cls.iterInnerJoin(ltable, rtable, conditions)))
         return T 
 
+    @classmethod
+    def iterInnerJoin(cls, ltable, rtable, conditions, lWhere=None, rWhere=None):
+        ''' 
+        Purpose : Stream an inner join of two tables. The algorithm is picked
+                  from the operator: a hash join (or a merge join if both
+                  inputs are already in key order) for "=" and a sorted band
+                  join for inequalities, so no condition costs O(n * m)
+                  unless the output itself is that large. Only the (key,
+                  row) inputs are held in memory, never the joined rows.
+                  Equi-joins on an indexed column probe the index instead.
+                  Conditions on one table filter its rows before the join.
+        Parameters : 
+            ltable: The left table 
+            rtable: The right table
+            conditions: Condition between a column of each table
+            lWhere: Optional conditions on the left table alone
+            rWhere: Optional conditions on the right table alone
+        Returns: A generator of batches of joined rows (left table columns
+                 first)
+        ''' 
+        lCol, operator, rCol = cls.__joinColumns(ltable, rtable, conditions)
+
+        # An index on the join column of a table with no conditions of its
+        # own is probed with the keys of the other table, which is streamed
+        # instead of being collected
+        if operator == "=":
+            rLookup = cls.__indexProbe(rtable, rCol) if not rWhere else None
+            if rLookup is not None:
+                left = cls.__joinInput(ltable, lCol, where=lWhere)
+                return Pipeline.batched(lRow + rRow for key, lRow in left for rRow in rLookup(key))
+            lLookup = cls.__indexProbe(ltable, lCol) if not lWhere else None
+            if lLookup is not None:
+                right = cls.__joinInput(rtable, rCol, where=rWhere)
+                return Pipeline.batched(lRow + rRow for key, rRow in right for lRow in lLookup(key))
+
+        # The algorithms pick their build side from the input sizes 
+        left = list(cls.__joinInput(ltable, lCol, where=lWhere))
+        right = list(cls.__joinInput(rtable, rCol, where=rWhere))
+        pairs = JoinAlgorithms.join(left, operator, right)
+        return Pipeline.batched(lRow + rRow for lRow, rRow in pairs)
@@ -6,6 +6,7 @@
 ################################################################################
 
 from Query import Query 
+from Predicate import Predicate
 import re 
 
 ################################################################################
@@ -69,8 +70,8 @@ class UpdateStatement(Query):
 
         # Check for a where clause 
         if len(splitJoin) > 1:
-            conditions = list(filter(None, re.split(r"(=|!=|<>|<|>|<=|>=)", splitJoin[1])))
-            conditions = [x.strip().replace("'", '') for x in conditions]
+            conditions = [[x.replace("'", '') for x in condition]
+                          for condition in Predicate.splitConditions(splitJoin[1])]
         
         return tableName, updates, conditions
             
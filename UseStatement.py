@@ -26,7 +26,7 @@ class UseStatement(Query):
      	Parameters: None
     	Returns:    Database context of the current database.
         '''
-        if self.dbName in next(os.walk("."))[1]:
+        if os.path.isdir(self.dbName):
             print ("Using database", self.dbName + ".")
             return Database(self.dbName)
         else:
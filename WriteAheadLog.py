@@ -0,0 +1,327 @@
+################################################################################
+#	File : WriteAheadLog.py
+#	Purpose : Log of the table file pages changed by committed statements,
+#	          replayed when a database is opened after a crash
+################################################################################
+
+import os
+import struct
+import zlib
+
+import DurableFile
+from BufferPool import BufferPool
+from FileLock import FileLock
+from PageFile import PageFile
+
+################################################################################
+#	Class : WriteAheadLog
+#	Purpose : Before the changed pages of a commit are written to the table
+#	          files, they are appended to the log of the database with a
+#	          single fsync. A crash while the table files are written is
+#	          recovered by writing the pages of every committed transaction
+#	          again. A checkpoint writes the last committed version of every
+#	          page in the log to its table file, syncs the files and empties
+#	          the log, so the commits of every session sharing the log are
+#	          kept. Sessions committing to the same log while an fsync is in
+#	          progress, in any process, share the next one.
+################################################################################
+class WriteAheadLog(object):
+    '''The write-ahead log of a database'''
+    # Name of the log file in the database directory
+    FILE_NAME = "db.wal"
+    # Name of the file holding the size of the log known to be synced.
+    # The session syncing the log holds a lock on it.
+    SYNC_FILE = "db.sync"
+    SYNCED = struct.Struct("<Q")
+
+    # Record: kind, file name length, page number, data length and CRC-32
+    # of the other fields, the file name and the data that follow it
+    RECORD = struct.Struct("<BHIII")
+    PAGE_RECORD = 1
+    COMMIT_RECORD = 2
+
+    # Size the log may reach before the table files are checkpointed
+    CHECKPOINT_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, dbName):
+        '''
+    	Purpose : Open the log of a database
+    	Parameters :
+    		dbName: The name of the database
+    	Returns: None
+        '''
+        self.dbDir = './' + dbName + '/'
+        self.path = self.dbDir + self.FILE_NAME
+        # Commits are appended to the log
+        self.fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self.fileLock = FileLock(self.path)
+        # The synced size is read and written through the descriptor of the
+        # lock on it
+        self.syncLock = FileLock(self.dbDir + self.SYNC_FILE)
+        # Records of the commit in progress, not written yet
+        self.pending = []
+        # Names of the files written since the last checkpoint
+        self.files = set()
+
+    def __del__(self):
+        if getattr(self, "fd", None) is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    @property
+    def size(self):
+        '''
+    	Purpose : Get the size of the log, written by every session
+    	Parameters : None
+    	Returns: The number of bytes in the log file
+        '''
+        return os.fstat(self.fd).st_size
+
+    def begin(self):
+        '''
+    	Purpose : Start a commit. Checkpoints of any session wait until it
+                  ends, so its pages are written before the log is emptied.
+    	Parameters : None
+    	Returns: None
+        '''
+        self.lock(False)
+
+    def end(self):
+        '''
+    	Purpose : End a commit started by begin
+    	Parameters : None
+    	Returns: None
+        '''
+        self.unlock()
+
+    def lock(self, exclusive):
+        '''
+    	Purpose : Lock the log against the other sessions until unlock is
+                  called. Locks nest; the strongest one taken is held.
+    	Parameters :
+    		exclusive: True to keep every other session out, False to only
+                       keep out sessions taking an exclusive lock
+    	Returns: None
+        '''
+        self.fileLock.lock(exclusive)
+
+    def unlock(self):
+        '''
+    	Purpose : Release the last lock taken
+    	Parameters : None
+    	Returns: None
+        '''
+        self.fileLock.unlock()
+
+    def logPages(self, fileName, pages):
+        '''
+    	Purpose : Add changed pages of a table file to the commit in progress
+    	Parameters :
+    		fileName: The name of the table file in the database directory
+            pages: An iterable of (page number, page bytes) tuples
+    	Returns: None
+        '''
+        name = fileName.encode("utf-8")
+        for pageNo, page in pages:
+            # Pages are mostly empty space, so they are stored compressed
+            self.pending.append(self.__record(self.PAGE_RECORD, name, pageNo, zlib.compress(bytes(page))))
+
+    def commit(self, sync=True):
+        '''
+    	Purpose : Append the records of the commit in progress and a commit
+                  record to the log with one write, then wait for an fsync
+                  of the log. Commits written while another session syncs
+                  the log are synced together once it is done.
+    	Parameters :
+    		sync: False to return without waiting for the disk
+    	Returns: True if anything was logged
+        '''
+        if not self.pending:
+            return False
+        self.pending.append(self.__record(self.COMMIT_RECORD, b"", 0, b""))
+        data = b"".join(self.pending)
+        self.pending = []
+        self.lock(False)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.fd, view):]
+            if sync:
+                # Appending leaves the offset at the end of this commit
+                self.__sync(os.lseek(self.fd, 0, os.SEEK_CUR))
+        finally:
+            self.unlock()
+        return True
+
+    def sync(self):
+        '''
+    	Purpose : Wait until every commit written to the log is on disk, e.g.
+                  before pages of commits logged without syncing are written
+                  to the table files
+    	Parameters : None
+    	Returns: None
+        '''
+        self.__sync(self.size)
+
+    def __sync(self, end):
+        '''
+    	Purpose : Wait until the log is synced up to the end of a commit. The
+                  session holding the sync lock syncs every commit written
+                  so far; sessions waiting for the lock meanwhile, in this
+                  process or another, find their commits synced by it.
+    	Parameters :
+    		end: The offset of the end of the commit in the log
+    	Returns: None
+        '''
+        # Without file locks the size is still only recorded once synced,
+        # so a commit never counts as synced before it is
+        self.syncLock.lock(True)
+        try:
+            if self.__synced() < end:
+                size = self.size
+                os.fsync(self.fd)
+                os.pwrite(self.syncLock.fd, self.SYNCED.pack(size), 0)
+        finally:
+            self.syncLock.unlock()
+
+    def __synced(self):
+        '''
+    	Purpose : Read the size of the log known to be synced
+    	Parameters : None
+    	Returns: The number of bytes
+        '''
+        data = os.pread(self.syncLock.fd, self.SYNCED.size, 0)
+        return self.SYNCED.unpack(data)[0] if len(data) == self.SYNCED.size else 0
+
+    def written(self, fileNames):
+        '''
+    	Purpose : Note files of the database written after a commit was
+                  logged, to be synced by the next checkpoint
+    	Parameters :
+    		fileNames: The names of the files in the database directory
+    	Returns: None
+        '''
+        self.files.update(fileNames)
+
+    def checkpoint(self, sync=True):
+        '''
+    	Purpose : Write the last committed version of every page in the log
+                  to its table file, make those files and the ones written
+                  by this session durable, and empty the log. Commits of
+                  other sessions in progress are waited for. The commit in
+                  progress of this session is kept. Records after the last
+                  commit record, or cut short by a crash, are ignored.
+    	Parameters :
+    		sync: False to empty the log without waiting for the disk
+    	Returns: The set of names of the table files whose pages did not
+                 match the log, e.g. because of a crash
+        '''
+        self.lock(True)
+        try:
+            if sync:
+                # The log is on disk before the pages it repairs are written
+                self.sync()
+            changed, files = self.__replay(self.__committed())
+            if sync:
+                for fileName in files | self.files:
+                    if os.path.isfile(self.dbDir + fileName):
+                        DurableFile.syncPath(self.dbDir + fileName)
+                # Files replaced by renames are only durable once the
+                # directory is
+                DurableFile.syncPath(self.dbDir)
+            if self.size > 0:
+                os.ftruncate(self.fd, 0)
+                if sync:
+                    os.fsync(self.fd)
+            # Offsets start over with the empty log. No commit is running.
+            os.pwrite(self.syncLock.fd, self.SYNCED.pack(0), 0)
+            self.files = set()
+        finally:
+            self.unlock()
+        return changed
+
+    def __committed(self):
+        '''
+    	Purpose : Read the pages of the committed transactions in the log
+    	Parameters : None
+    	Returns: A dictionary mapping (file name, page number) to the last
+                 committed version of the page, compressed
+        '''
+        data = os.pread(self.fd, self.size, 0)
+        committed, transaction = {}, []
+        offset = 0
+        while offset + self.RECORD.size <= len(data):
+            kind, nameLength, pageNo, length, checksum = self.RECORD.unpack_from(data, offset)
+            start = offset + self.RECORD.size
+            end = start + nameLength + length
+            if end > len(data) or self.__checksum(data[offset:start], data[start:end]) != checksum:
+                break
+            if kind == self.COMMIT_RECORD:
+                committed.update(transaction)
+                transaction = []
+            else:
+                name = data[start:start + nameLength].decode("utf-8")
+                transaction.append(((name, pageNo), data[start + nameLength:end]))
+            offset = end
+        return committed
+
+    def __replay(self, committed):
+        '''
+    	Purpose : Write committed pages to the table files where they differ
+    	Parameters :
+    		committed: A dictionary mapping (file name, page number) to the
+                       compressed page
+    	Returns: (changed, files): the sets of names of the table files
+                 written and of every table file in the log
+        '''
+        descriptors = {}
+        changed = set()
+        try:
+            for (name, pageNo), data in sorted(committed.items()):
+                if name not in descriptors:
+                    # Dropped tables are not brought back
+                    path = self.dbDir + name
+                    descriptors[name] = os.open(path, os.O_RDWR) if os.path.isfile(path) else None
+                fd = descriptors[name]
+                if fd is None:
+                    continue
+                page = zlib.decompress(data)
+                # Pages already written are left alone, so the file and
+                # the stamps of its indexes and zone map are kept
+                if os.pread(fd, PageFile.PAGE_SIZE, pageNo * PageFile.PAGE_SIZE) != page:
+                    os.pwrite(fd, page, pageNo * PageFile.PAGE_SIZE)
+                    changed.add(name)
+        finally:
+            for fd in descriptors.values():
+                if fd is not None:
+                    os.close(fd)
+        for name in changed:
+            BufferPool.shared().invalidate(self.dbDir + name)
+        return changed, set(name for name, fd in descriptors.items() if fd is not None)
+
+    @classmethod
+    def __record(cls, kind, name, pageNo, data):
+        '''
+    	Purpose : Build a log record
+    	Parameters :
+    		kind: PAGE_RECORD or COMMIT_RECORD
+            name: The encoded file name
+            pageNo: The page number
+            data: The compressed page
+    	Returns: The record bytes
+        '''
+        fields = cls.RECORD.pack(kind, len(name), pageNo, len(data), 0)
+        return cls.RECORD.pack(kind, len(name), pageNo, len(data),
+                               cls.__checksum(fields, name + data)) + name + data
+
+    @classmethod
+    def __checksum(cls, fields, body):
+        '''
+    	Purpose : Compute the checksum of a record
+    	Parameters :
+    		fields: The packed record header
+            body: The file name and data following it
+    	Returns: The CRC-32 of the header fields other than the checksum and
+                 of the body
+        '''
+        return zlib.crc32(body, zlib.crc32(fields[:cls.RECORD.size - 4]))
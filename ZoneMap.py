@@ -0,0 +1,300 @@
+################################################################################
+#	File : ZoneMap.py
+#	Purpose : Per-block min/max statistics used to skip blocks of rows that
+#	          cannot match a condition
+################################################################################
+
+import json
+from bisect import bisect_right
+
+import DurableFile
+
+from Predicate import Conjunction
+
+################################################################################
+#	Class : ZoneMap
+#	Purpose : Keeps the smallest and largest value of every numeric column for
+#	          each block of up to BLOCK_SIZE rows. A block whose range cannot
+#	          hold a value matching a condition is never read. Deleting rows
+#	          shrinks their blocks, so the other blocks keep their zones.
+################################################################################
+class ZoneMap(object):
+    '''Per-block min/max statistics of the numeric columns of a table'''
+    # Largest number of rows in a block
+    BLOCK_SIZE = 1024
+
+    # Column types that get statistics
+    NUMERIC_TYPES = [int, float]
+
+    # Zone of a column holding a value that is not of the column type, so
+    # its values cannot be bounded
+    UNBOUNDED = "UNBOUNDED"
+
+    # Names of the column types in a zone map file
+    TYPE_NAMES = {int: "int", float: "float", str: "str", None: None}
+
+    def __init__(self, castTypes, blockSize=BLOCK_SIZE):
+        '''
+    	Purpose : Make an empty zone map
+    	Parameters :
+    		castTypes: The python type of each column of the table
+            blockSize: The largest number of rows in a block
+    	Returns: None
+        '''
+        self.castTypes = list(castTypes)
+        self.blockSize = blockSize
+        self.positions = [i for i, castType in enumerate(self.castTypes) if castType in self.NUMERIC_TYPES]
+        # One dictionary per block mapping a column position to its
+        # [min, max], None while the block only holds NULLs, or UNBOUNDED
+        self.zones = []
+        # Number of rows in each block, and the position of its first row
+        self.counts = []
+        self.starts = []
+        self.rowCount = 0
+        # Stamp of the table file the zone map file was written for
+        self.stamp = None
+        self.dirty = True
+
+    @classmethod
+    def build(cls, castTypes, batches, blockSize=BLOCK_SIZE):
+        '''
+    	Purpose : Compute the zone map of some rows
+    	Parameters :
+    		castTypes: The python type of each column of the table
+            batches: An iterable of row batches, in table order
+            blockSize: The largest number of rows in a block
+    	Returns: A ZoneMap object
+        '''
+        zoneMap = cls(castTypes, blockSize)
+        for batch in batches:
+            for row in batch:
+                zoneMap.add(row)
+        return zoneMap
+
+    @classmethod
+    def load(cls, path):
+        '''
+    	Purpose : Read a zone map file
+    	Parameters :
+    		path: The path of the zone map file
+    	Returns: The ZoneMap object, or None if the file cannot be read
+        '''
+        types = {name: castType for castType, name in cls.TYPE_NAMES.items()}
+        try:
+            with open(path, "rb") as fid:
+                state = json.loads(fid.read().decode("utf-8"))
+            zoneMap = cls([types[name] for name in state["castTypes"]], state["blockSize"])
+            # JSON object keys are strings, column positions are not
+            zoneMap.zones = [{int(position): zone for position, zone in zones.items()}
+                             for zones in state["zones"]]
+            zoneMap.counts = [int(count) for count in state["counts"]]
+            zoneMap.rowCount = state["rowCount"]
+            zoneMap.__index()
+            zoneMap.stamp = tuple(state["stamp"]) if state["stamp"] is not None else None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        if len(zoneMap.counts) != len(zoneMap.zones) or sum(zoneMap.counts) != zoneMap.rowCount:
+            return None
+        zoneMap.dirty = False
+        return zoneMap
+
+    def save(self, path, stamp, sync=True):
+        '''
+    	Purpose : Write the zone map to a file
+    	Parameters :
+    		path: The path of the zone map file
+            stamp: The stamp of the table file the zone map describes, from
+                   Table.getFileStamp
+            sync: False to leave syncing the file to a later checkpoint
+    	Returns: None
+        '''
+        state = {
+            "castTypes": [self.TYPE_NAMES[castType] for castType in self.castTypes],
+            "blockSize": self.blockSize,
+            "rowCount": self.rowCount,
+            "counts": self.counts,
+            "stamp": stamp,
+            "zones": self.zones
+        }
+        DurableFile.write(path, lambda fid: fid.write(json.dumps(state).encode("utf-8")), sync)
+        self.stamp = tuple(stamp) if stamp is not None else None
+        self.dirty = False
+
+    def add(self, row):
+        '''
+    	Purpose : Account for a row appended to the table
+    	Parameters :
+    		row: The new row tuple
+    	Returns: None
+        '''
+        if not self.counts or self.counts[-1] == self.blockSize:
+            self.zones.append({position: None for position in self.positions})
+            self.counts.append(0)
+            self.starts.append(self.rowCount)
+        self.counts[-1] += 1
+        self.rowCount += 1
+        self.widen(self.rowCount - 1, row)
+
+    def delete(self, rowIds):
+        '''
+    	Purpose : Account for rows deleted from the table. Their blocks lose
+                  a row each and keep their zones, which still hold every
+                  value left. Emptied blocks are dropped and neighbouring
+                  blocks that fit in one are merged.
+    	Parameters :
+    		rowIds: The sorted positions the deleted rows had
+    	Returns: None
+        '''
+        for rowId in rowIds:
+            self.counts[self.__block(rowId)] -= 1
+        zones, counts = [], []
+        for blockZones, count in zip(self.zones, self.counts):
+            if count == 0:
+                continue
+            if counts and counts[-1] + count <= self.blockSize:
+                counts[-1] += count
+                self.__merge(zones[-1], blockZones)
+            else:
+                zones.append(blockZones)
+                counts.append(count)
+        self.zones, self.counts = zones, counts
+        self.rowCount -= len(rowIds)
+        self.__index()
+        self.dirty = True
+
+    def widen(self, rowId, row):
+        '''
+    	Purpose : Widen the zones of a block to hold the values of a row, e.g.
+                  after the row was updated. Zones are never narrowed, so
+                  they stay correct after values leave the block.
+    	Parameters :
+    		rowId: The position of the row
+            row: The row tuple
+    	Returns: None
+        '''
+        zones = self.zones[self.__block(rowId)]
+        for position in self.positions:
+            value = row[position]
+            zone = zones[position]
+            if value is None or zone == self.UNBOUNDED:
+                continue
+            if not isinstance(value, self.castTypes[position]):
+                zones[position] = self.UNBOUNDED
+            elif zone is None:
+                zones[position] = [value, value]
+            elif value < zone[0]:
+                zone[0] = value
+            elif value > zone[1]:
+                zone[1] = value
+        self.dirty = True
+
+    def bounds(self, position):
+        '''
+    	Purpose : Get the smallest and largest value of a column over every
+                  block
+    	Parameters :
+    		position: The position of the column
+    	Returns: [min, max], or None if the column only holds NULLs or
+                 values that cannot be bounded
+        '''
+        zones = [zones[position] for zones in self.zones]
+        if self.UNBOUNDED in zones:
+            return None
+        zones = [zone for zone in zones if zone is not None]
+        if not zones:
+            return None
+        return [min(zone[0] for zone in zones), max(zone[1] for zone in zones)]
+
+    def ranges(self, predicate):
+        '''
+    	Purpose : Find the rows that may match a condition
+    	Parameters :
+    		predicate: A compiled Predicate or Conjunction
+    	Returns: A list of (start, stop) row ranges, covering every block
+                 that may hold a matching row
+        '''
+        predicates = Conjunction.of(predicate)
+        ranges = []
+        for zones, start, count in zip(self.zones, self.starts, self.counts):
+            if not all(self.__mayMatch(zones, p) for p in predicates):
+                continue
+            stop = start + count
+            if ranges and ranges[-1][1] == start:
+                # Read neighbouring blocks in one go
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+    def __block(self, rowId):
+        '''
+    	Purpose : Find the block holding a row
+    	Parameters :
+    		rowId: The position of the row
+    	Returns: The number of the block
+        '''
+        return bisect_right(self.starts, rowId) - 1
+
+    def __index(self):
+        '''
+    	Purpose : Compute the position of the first row of every block from
+                  the row counts of the blocks
+    	Parameters : None
+    	Returns: None
+        '''
+        self.starts = []
+        start = 0
+        for count in self.counts:
+            self.starts.append(start)
+            start += count
+
+    def __merge(self, zones, other):
+        '''
+    	Purpose : Widen the zones of a block to hold the zones of another
+    	Parameters :
+    		zones: The zones of the block to widen
+            other: The zones of the other block
+    	Returns: None
+        '''
+        for position in self.positions:
+            zone, otherZone = zones[position], other[position]
+            if zone == self.UNBOUNDED or otherZone is None:
+                continue
+            if otherZone == self.UNBOUNDED or zone is None:
+                zones[position] = otherZone
+            else:
+                zones[position] = [min(zone[0], otherZone[0]), max(zone[1], otherZone[1])]
+
+    def __mayMatch(self, zones, predicate):
+        '''
+    	Purpose : Check if a block may hold a row matching a condition
+    	Parameters :
+    		zones: The zones of the block
+            predicate: A compiled Predicate
+    	Returns: False if no row of the block can match the condition
+        '''
+        if not predicate.valid:
+            return False
+        if predicate.valuePosition is not None or predicate.position not in zones:
+            return True
+        zone = zones[predicate.position]
+        if zone == self.UNBOUNDED:
+            return True
+        if zone is None:
+            # NULLs never match a comparison
+            return False
+        low, high = zone
+        value = predicate.value
+        if predicate.operator == "=":
+            return low <= value <= high
+        if predicate.operator in ["!=", "<>"]:
+            return not (low == high == value)
+        if predicate.operator == "<":
+            return low < value
+        if predicate.operator == "<=":
+            return low <= value
+        if predicate.operator == ">":
+            return high > value
+        if predicate.operator == ">=":
+            return high >= value
+        return True
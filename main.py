@@ -86,11 +86,17 @@ def ExecuteQueries(queries):
         if query == EXIT_COMMAND:
             return EXIT_COMMAND
         elif query is not None:
-            retVal = query.execute()
+            # USE opens a database, which may write its pages in place
+            if type(query) is not UseStatement:
+                dbContext.beginStatement()
+            try:
+                retVal = query.execute()
+            finally:
+                dbContext.endStatement()
 
             if not dbContext.transactionInProgress:
-                for table in list(dbContext.tables.values()):
-                    table.save()
+                # Only the tables the statement changed are written
+                dbContext.commit()
             
 
             # If the query returned a database object, set the current
@@ -1,35 +1,59 @@
 import unittest 
 
 from test_AlterStatement import TestAlterStatement
+from test_BTree import TestBTree
+from test_Catalog import TestCatalog
+from test_ColumnStore import TestColumnStore
 from test_CreateStatement import TestCreateStatement
 from test_Database import TestDatabase
 from test_DeleteStatement import TestDeleteStatement
+from test_DurableFile import TestDurableFile
 from test_DropStatement import TestDropStatement
+from test_Index import TestIndex
 from test_InsertStatement import TestInsertStatement
+from test_JoinAlgorithms import TestJoinAlgorithms
 from test_main import TestMain
+from test_PageFile import TestPageFile
 from test_Parser import TestParser
+from test_Pipeline import TestPipeline
+from test_Predicate import TestPredicate
 from test_Query import TestQuery
+from test_ResultWriter import TestResultWriter
 from test_SelectStatement import TestSelectStatement
 from test_Table import TestTable
 from test_UpdateStatement import TestUpdateStatement
 from test_UseStatement import TestUseStatement
+from test_WriteAheadLog import TestWriteAheadLog
+from test_ZoneMap import TestZoneMap
 
 class DBTests(unittest.TestSuite):
     def __init__(self):
         tests = [
             TestAlterStatement,
+            TestBTree,
+            TestCatalog,
+            TestColumnStore,
             TestCreateStatement,
             TestDatabase,
             TestDeleteStatement,
+            TestDurableFile,
             TestDropStatement,
+            TestIndex,
             TestInsertStatement,
+            TestJoinAlgorithms,
             TestMain,
+            TestPageFile,
             TestParser,
+            TestPipeline,
+            TestPredicate,
             TestQuery,
+            TestResultWriter,
             TestSelectStatement,
             TestTable,
             TestUpdateStatement,
-            TestUseStatement
+            TestUseStatement,
+            TestWriteAheadLog,
+            TestZoneMap
         ]
         super(DBTests, self).__init__(tests)
 
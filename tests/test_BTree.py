@@ -0,0 +1,86 @@
+import random
+import unittest 
+
+import config 
+
+from BTree import BTree
+
+class TestBTree(unittest.TestCase):
+    def setUp(self):
+        ''' 
+        Purpose : Fill a small-order tree (so it has several levels) and a
+                  dictionary with the same entries
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        rand = random.Random(457)
+        self.tree = BTree(order=4)
+        self.expected = {}
+        for i in range(300):
+            key = rand.randrange(100)
+            self.tree.insert(key, i)
+            self.expected.setdefault(key, []).append(i)
+
+    def test_get(self):
+        ''' 
+        Purpose : Test point lookups
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for key in range(-1, 101):
+            self.assertEqual(self.tree.get(key), self.expected.get(key, []))
+        self.assertEqual(len(self.tree), len(self.expected))
+
+    def test_range(self):
+        ''' 
+        Purpose : Test range walks with each kind of bound
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        keys = sorted(self.expected)
+        self.assertEqual([key for key, values in self.tree.items()], keys)
+        self.assertEqual([key for key, values in self.tree.range(20, 40)],
+                         [key for key in keys if 20 <= key <= 40])
+        self.assertEqual([key for key, values in self.tree.range(20, 40, False, False)],
+                         [key for key in keys if 20 < key < 40])
+        self.assertEqual([key for key, values in self.tree.range(None, 10, True, False)],
+                         [key for key in keys if key < 10])
+        self.assertEqual([key for key, values in self.tree.range(90)],
+                         [key for key in keys if key >= 90])
+
+    def test_remove(self):
+        ''' 
+        Purpose : Test removing values, including every value of a key
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for key, values in list(self.expected.items()):
+            for value in values[::2]:
+                self.assertTrue(self.tree.remove(key, value))
+            del values[::2]
+            if not values:
+                del self.expected[key]
+        self.assertFalse(self.tree.remove(1000, 0))
+        self.assertEqual(dict(self.tree.items()), self.expected)
+
+    def test_fromItems(self):
+        ''' 
+        Purpose : Test that a bulk-loaded tree matches an inserted one
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        tree = BTree.fromItems(list(self.tree.items()), order=4)
+        self.assertEqual(list(tree.items()), list(self.tree.items()))
+        self.assertEqual(list(tree.range(30, 60)), list(self.tree.range(30, 60)))
+        # The bulk-loaded tree still accepts inserts
+        tree.insert(50, -1)
+        self.assertEqual(tree.get(50), self.expected.get(50, []) + [-1])
+        self.assertEqual(list(BTree.fromItems([]).items()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import os, shutil
+import io
+import json, pickle
+from contextlib import redirect_stdout
+
+import config
+
+from Catalog import Catalog
+from Database import Database
+from PageFile import PageFile
+from SelectStatement import SelectStatement
+from Table import Table
+
+class TestCatalog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Purpose : Make a test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Purpose : Remove the test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        '''
+        Purpose : Make a test table and record it in the catalog
+        Parameters :
+            None
+        Returns: None
+        '''
+        config.CreateTable()
+        self.db = Database(config.DB_NAME)
+        # Read the text table so saving turns it into a page file
+        self.db.getTableByName(config.TBL_NAME).getRowCount()
+        self.db.save()
+
+    def tearDown(self):
+        '''
+        Purpose : Remove the database files
+        Parameters :
+            None
+        Returns: None
+        '''
+        for name in os.listdir(config.DB_NAME):
+            os.remove(config.DB_NAME + "/" + name)
+
+    def test_save(self):
+        '''
+        Purpose : Test that the catalog describes every table
+        Parameters :
+            None
+        Returns: None
+        '''
+        catalog = Catalog.load(config.DB_NAME)
+        entry = catalog.entries[config.TBL_NAME]
+        self.assertEqual(entry["schema"], "a1 (int)  | s1 (varchar(20))  | f1 (float)")
+        self.assertEqual(entry["rowCount"], 3)
+        self.assertEqual(entry["layout"], PageFile.VERSION)
+        self.assertEqual(entry["stats"], {"a1": [1, 100], "f1": [3.14, 5.0]})
+        self.assertEqual(entry["stamp"], self.db.getTableByName(config.TBL_NAME).stamp)
+        # The catalog is plain JSON, and a file of another format is ignored
+        with open(catalog.path) as fid:
+            self.assertEqual(json.load(fid)["tables"][config.TBL_NAME]["rowCount"], 3)
+        with open(catalog.path, "wb") as fid:
+            pickle.dump({"version": Catalog.VERSION, "tables": {}}, fid)
+        self.assertIsNone(Catalog.load(config.DB_NAME))
+
+        # Dropped tables leave the catalog
+        self.db.removeTable(config.TBL_NAME)
+        self.db.save()
+        self.assertEqual(Catalog.load(config.DB_NAME).entries, {})
+        self.assertIn(Catalog.FILE_NAME, os.listdir(config.DB_NAME))
+
+    def test_open(self):
+        '''
+        Purpose : Test that a database opens from the catalog without reading
+                  the table files, unless they changed
+        Parameters :
+            None
+        Returns: None
+        '''
+        readHeader = PageFile.readHeader
+        read = []
+        PageFile.readHeader = classmethod(lambda cls, path: read.append(path) or readHeader(path))
+        try:
+            db = Database(config.DB_NAME)
+            table = db.tables[config.TBL_NAME]
+            self.assertEqual(read, [])
+            self.assertEqual(list(table.schema.keys()), ["a1", "s1", "f1"])
+            self.assertEqual(table.getRowCount(), 3)
+            self.assertFalse(table.isLoaded())
+
+            # Another process adds a row without updating the catalog
+            other = Table(config.DB_NAME, config.TBL_NAME)
+            other.insert(["7", "new", "1.5"])
+            other.save()
+            db = Database(config.DB_NAME)
+            self.assertEqual(len(read), 2)
+            self.assertEqual(db.tables[config.TBL_NAME].getRowCount(), 4)
+        finally:
+            PageFile.readHeader = readHeader
+
+    def test_count(self):
+        '''
+        Purpose : Test SELECT COUNT(*) with and without conditions
+        Parameters :
+            None
+        Returns: None
+        '''
+        db = Database(config.DB_NAME)
+        self.assertEqual(self.select(db, "COUNT(*) FROM " + config.TBL_NAME), "COUNT(*) int\n3\n")
+        # Counting every row reads none of them
+        self.assertFalse(db.tables[config.TBL_NAME].isLoaded())
+        self.assertEqual(self.select(db, "count(*) FROM " + config.TBL_NAME + " WHERE f1 = 3.14"),
+                         "COUNT(*) int\n2\n")
+
+    def select(self, db, query):
+        '''
+        Purpose : Run a SELECT statement
+        Parameters :
+            db: The Database to query
+            query: The statement after SELECT
+        Returns: The printed output
+        '''
+        stmt = SelectStatement(query.split())
+        stmt.setDBContext(db)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            stmt.execute()
+        return output.getvalue()
+
+if __name__ == '__main__':
+    unittest.main()
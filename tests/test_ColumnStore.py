@@ -0,0 +1,123 @@
+import unittest 
+
+import config 
+
+from ColumnStore import ColumnStore, NumericColumn, DictionaryColumn, numpy
+from Predicate import Predicate
+from Table import Table
+
+@unittest.skipUnless(ColumnStore.isAvailable(), "NumPy is not installed")
+class TestColumnStore(unittest.TestCase):
+    def setUp(self):
+        ''' 
+        Purpose : Make a column store with an int, a varchar and a float column
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.rows = [
+            (1, 'hello', 3.14),
+            (8, 'this is a string', 5.0),
+            (100, 'hello', None)
+        ]
+        self.store = ColumnStore([int, str, float], self.rows)
+
+    def test_init(self):
+        ''' 
+        Purpose : Test the representation picked for each column
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertIsInstance(self.store.columns[0], NumericColumn)
+        self.assertIsInstance(self.store.columns[1], DictionaryColumn)
+        self.assertIsInstance(self.store.columns[2], NumericColumn)
+
+        # Repeated strings share one dictionary entry
+        self.assertEqual(self.store.columns[1].dictionary, ['hello', 'this is a string'])
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(list(self.store), self.rows)
+
+    def test_append(self):
+        ''' 
+        Purpose : Test adding and overwriting rows
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for i in range(40):
+            self.store.append((i, None, 0.5))
+        self.assertEqual(len(self.store), 43)
+        self.assertEqual(self.store[-1], (39, None, 0.5))
+
+        self.store[0] = (2, 'bye', None)
+        self.assertEqual(self.store[0], (2, 'bye', None))
+
+        # A value that does not fit re-encodes the column
+        self.store[1] = ('abc', 'x', 1.0)
+        self.assertIsInstance(self.store.columns[0], DictionaryColumn)
+        self.assertEqual(self.store[1], ('abc', 'x', 1.0))
+        self.assertEqual(self.store[2], self.rows[2])
+
+    def test_project(self):
+        ''' 
+        Purpose : Test reading some columns of some rows
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(self.store.project([2, 0]), [(3.14, 1), (5.0, 8), (None, 100)])
+        self.assertEqual(self.store.project([1], [2, 0]), [('hello',), ('hello',)])
+        self.assertEqual(self.store.column(2), [3.14, 5.0, None])
+
+    def test_select(self):
+        ''' 
+        Purpose : Test finding the rows that match a predicate
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        table = Table(None, "store", True)
+        table.setSchema({'a1': 'int', 's1': 'varchar(20)', 'f1': 'float'})
+        self.assertEqual(self.store.select(Predicate(table, "a1", ">", "1")).tolist(), [1, 2])
+        self.assertEqual(self.store.select(Predicate(table, "s1", "=", "hello")).tolist(), [0, 2])
+        self.assertEqual(self.store.select(Predicate(table, "s1", ">", "a")).tolist(), [0, 1, 2])
+        self.assertEqual(self.store.select(Predicate(table, "f1", "<", "10")).tolist(), [0, 1])
+        self.assertEqual(self.store.select(Predicate(table, "f1", "!=", "5")).tolist(), [0])
+        self.assertEqual(self.store.select(Predicate(table, "f3", "<", "10")).tolist(), [])
+
+        # Column to column comparisons
+        merged = Table(None, "MERGE", True)
+        merged.setSchema({'t.a1': 'int', 't.s1': 'varchar(20)', 't.f1': 'float'})
+        self.assertEqual(self.store.select(Predicate(merged, "t.a1", "<", "t.f1")).tolist(), [0])
+        self.assertEqual(self.store.select(Predicate(merged, "t.s1", "=", "t.s1")).tolist(), [0, 1, 2])
+
+    def test_assign(self):
+        ''' 
+        Purpose : Test updating the selected rows in bulk
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.store.assign(numpy.array([True, False, True]), {0: 7, 1: None})
+        self.assertEqual(list(self.store), [(7, None, 3.14), (8, 'this is a string', 5.0), (7, None, None)])
+
+        self.store.assign(None, {2: 1.5})
+        self.assertEqual(self.store.column(2), [1.5, 1.5, 1.5])
+
+    def test_compress(self):
+        ''' 
+        Purpose : Test deleting rows in bulk
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.store.compress(numpy.array([False, True, True]))
+        self.assertEqual(list(self.store), self.rows[1:])
+
+        # The store keeps growing after a delete
+        self.store.append((5, 'x', 0.5))
+        self.assertEqual(self.store[2], (5, 'x', 0.5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ import config
 
 from CreateStatement import CreateStatement
 from Database import Database
+from Index import Index
 
 
 class TestCreateStatement(unittest.TestCase):
@@ -83,6 +84,37 @@ class TestCreateStatement(unittest.TestCase):
 
         self.assertEqual(len(db.tables), 1)
 
+    def test_execute_constraints(self):
+        ''' 
+        Purpose : Test creating a table with PRIMARY KEY and UNIQUE columns
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        os.mkdir(config.DB_NAME)
+        db = Database(config.DB_NAME)
+
+        self.stmt.createType = "TABLE"
+        self.stmt.attributes = (config.TBL_NAME + "( a1 int primary key, s1 varchar(20) UNIQUE, f1 float)").split()
+        self.stmt.setDBContext(db)
+        self.stmt.execute()
+
+        db.save()
+        table = db.getTableByName(config.TBL_NAME)
+        constraints = {index.columns[0]: index.constraint for index in table.indexes.values()}
+        self.assertEqual(constraints, {"a1": Index.PRIMARY_KEY, "s1": Index.UNIQUE})
+
+        # Two primary keys are rejected
+        self.stmt.attributes = "other( a1 int primary key, f1 float PRIMARY KEY)".split()
+        self.stmt.execute()
+        self.assertFalse(db.tableInDB("other"))
+
+        # An index is created on an existing table
+        self.stmt.createType = "INDEX"
+        self.stmt.attributes = ["idx_f1", "ON", config.TBL_NAME + "(f1)", "USING", "HASH"]
+        self.stmt.execute()
+        self.assertEqual(db.tables[config.TBL_NAME].indexes["idx_f1"].kind, Index.HASH)
+
 
 if __name__ == '__main__':
     unittest.main()
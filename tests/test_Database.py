@@ -7,6 +7,7 @@ import config
 
 from Database import Database
 from Table import Table 
+from PageFile import PageFile
 
 class TestDatabase(unittest.TestCase):
     @classmethod
@@ -51,12 +52,12 @@ class TestDatabase(unittest.TestCase):
             None
         Returns: None
         ''' 
+        rows = list(self.db.tables[config.TBL_NAME].rows)
         self.db.save()
-        fid = open(f'{config.DB_NAME}/{config.TBL_FILE}')
-        contents = fid.read()
-        fid.close() 
+        self.assertTrue(PageFile.isPageFile(f'{config.DB_NAME}/{config.TBL_FILE}'))
 
-        self.assertEqual(contents, config.TBL_CONTENTS)
+        # The text table file was turned into a page file holding the same rows
+        self.assertEqual(list(Table(config.DB_NAME, config.TBL_NAME).rows), rows)
 
     def test_saveDropTable(self):
         ''' 
@@ -82,6 +83,64 @@ class TestDatabase(unittest.TestCase):
         numTables = len(self.db.tables)
         self.assertEqual(numTables, 1)
 
+    def test_lazyLoad(self):
+        ''' 
+        Purpose : Test that tables are only read when first used
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        table = self.db.getTableByName(config.TBL_NAME)
+        table.createIndex("idx_a1", ["a1"])
+        self.db.save()
+
+        db = Database(config.DB_NAME)
+        table = db.tables[config.TBL_NAME]
+        self.assertFalse(table.isLoaded())
+        self.assertEqual(list(table.schema.keys()), ["a1", "s1", "f1"])
+
+        # Saving keeps the files of tables that were never read
+        db.save()
+        self.assertIn(config.TBL_NAME + ".idx_a1.idx", os.listdir(config.DB_NAME))
+        self.assertFalse(table.isLoaded())
+
+        # The row count comes from the catalog
+        self.assertEqual(db.getTableByName(config.TBL_NAME).getRowCount(), 3)
+        self.assertFalse(table.isLoaded())
+        self.assertIn("idx_a1", table.indexes)
+        self.assertTrue(table.isLoaded())
+
+    def test_saveDirty(self):
+        '''
+        Purpose : Test that only tables changed since their last save are
+                  written
+        Parameters :
+            None
+        Returns: None
+        '''
+        table = self.db.getTableByName(config.TBL_NAME)
+        # Text tables are written again as page files
+        table.getRowCount()
+        self.assertTrue(table.dirty)
+        self.db.save()
+        self.assertFalse(table.dirty)
+        stamp = table.getFileStamp()
+        catalog = os.stat(f'{config.DB_NAME}/db.catalog').st_mtime_ns
+
+        # Reading the table writes nothing
+        table.getDataByAttrName(["a1"], [["a1", ">", "1"]])
+        self.assertFalse(table.dirty)
+        self.db.save()
+        self.assertEqual(table.getFileStamp(), stamp)
+        self.assertEqual(os.stat(f'{config.DB_NAME}/db.catalog').st_mtime_ns, catalog)
+
+        table.insert(["7", "new", "1.5"])
+        self.assertTrue(table.dirty)
+        self.db.save()
+        self.assertFalse(table.dirty)
+        self.assertNotEqual(table.getFileStamp(), stamp)
+        self.assertEqual(Database(config.DB_NAME).tables[config.TBL_NAME].getRowCount(), 4)
+
     def test_addTable(self):
         ''' 
         Purpose : Test adding a table to the database
@@ -147,13 +206,58 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(table.getFriendlyName(), config.TBL_NAME)
         
         rows = [
-            {'a1': '1', 's1': 'hello', 'f1': '3.14'},
-            {'a1': '8', 's1': 'this is a string', 'f1': '5'},
-            {'a1': '100', 's1': 'x', 'f1': '3.14'}
+            {'a1': 1, 's1': 'hello', 'f1': 3.14},
+            {'a1': 8, 's1': 'this is a string', 'f1': 5.0},
+            {'a1': 100, 's1': 'x', 'f1': 3.14}
         ]
 
         for row in rows:
-            self.assertIn(row, table.rows)
+            self.assertIn(row, table.getDataByAttrName(["*"]))
+
+    def test_getTableByNameCache(self):
+        ''' 
+        Purpose : Test that a table is only read again when its file changed
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        table = self.db.getTableByName(config.TBL_NAME)
+        table.insert(["5", "unsaved", "1.5"])
+        self.assertIs(self.db.getTableByName(config.TBL_NAME), table)
+
+        table.save()
+        self.assertIs(self.db.getTableByName(config.TBL_NAME), table)
+
+        # Another process writing the table file makes it stale
+        other = Table(config.DB_NAME, config.TBL_NAME)
+        other.delete()
+        other.save()
+        reloaded = self.db.getTableByName(config.TBL_NAME)
+        self.assertIsNot(reloaded, table)
+        self.assertEqual(reloaded.getRowCount(), 0)
+
+    def test_removeUnusedFiles(self):
+        ''' 
+        Purpose : Test that lock and temporary files of other processes still
+                  running are kept, and those of this process or of
+                  processes gone are removed
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        other, gone = os.getppid(), 99999999
+        kept = [f'{config.TBL_FILE}.{other}.new', f'{config.TBL_NAME}.{other}']
+        removed = [f'{config.TBL_FILE}.{os.getpid()}.new', f'{config.TBL_FILE}.{gone}.new',
+                   f'{config.TBL_NAME}.{gone}', 'dropped.tbl']
+        for name in kept + removed:
+            open(f'{config.DB_NAME}/{name}', 'w').close()
+        self.db.removeUnusedFiles()
+        files = os.listdir(config.DB_NAME)
+        for name in kept:
+            self.assertIn(name, files)
+            os.remove(f'{config.DB_NAME}/{name}')
+        for name in removed:
+            self.assertNotIn(name, files)
 
 
 if __name__ == '__main__':
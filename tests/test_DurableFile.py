@@ -0,0 +1,104 @@
+import unittest
+import os, shutil
+
+import config
+
+import DurableFile
+import Settings
+
+class TestDurableFile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Purpose : Make a test directory
+        Parameters :
+            None
+        Returns: None
+        '''
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Purpose : Remove the test directory
+        Parameters :
+            None
+        Returns: None
+        '''
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        '''
+        Purpose : Write the file to replace
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.path = config.DB_NAME + "/file.bin"
+        with open(self.path, "wb") as fid:
+            fid.write(b"old")
+
+    def write(self, writer):
+        '''
+        Purpose : Replace the test file, counting the fsyncs made
+        Parameters :
+            writer: Function writing the new contents
+        Returns: The paths synced
+        '''
+        syncPath = DurableFile.syncPath
+        synced = []
+        DurableFile.syncPath = lambda path: synced.append(path) or syncPath(path)
+        try:
+            DurableFile.write(self.path, writer)
+        finally:
+            DurableFile.syncPath = syncPath
+        return synced
+
+    def read(self):
+        '''
+        Purpose : Read the test file
+        Parameters :
+            None
+        Returns: The file contents
+        '''
+        with open(self.path, "rb") as fid:
+            return fid.read()
+
+    def test_write(self):
+        '''
+        Purpose : Test that the new contents are synced before they replace
+                  the file, and the directory after
+        Parameters :
+            None
+        Returns: None
+        '''
+        synced = self.write(lambda fid: fid.write(b"new"))
+        self.assertEqual(self.read(), b"new")
+        self.assertEqual(synced, [DurableFile.temporaryPath(self.path), config.DB_NAME])
+        self.assertEqual(os.listdir(config.DB_NAME), ["file.bin"])
+
+        synchronous = Settings.synchronous
+        try:
+            Settings.synchronous = Settings.OFF_SYNC
+            self.assertEqual(self.write(lambda fid: fid.write(b"newer")), [])
+            self.assertEqual(self.read(), b"newer")
+        finally:
+            Settings.synchronous = synchronous
+
+    def test_failedWrite(self):
+        '''
+        Purpose : Test that a write that fails leaves the old file whole
+        Parameters :
+            None
+        Returns: None
+        '''
+        def writer(fid):
+            fid.write(b"partial")
+            raise OSError("disk full")
+        with self.assertRaises(OSError):
+            self.write(writer)
+        self.assertEqual(self.read(), b"old")
+        self.assertEqual(os.listdir(config.DB_NAME), ["file.bin"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,369 @@
+import unittest 
+import os, shutil 
+import json, pickle
+
+import config 
+
+import Joins
+from Index import Index
+from Predicate import Predicate
+from Table import Table
+
+class TestIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        ''' 
+        Purpose : Make a test database
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        ''' 
+        Purpose : Remove the test database
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        ''' 
+        Purpose : Make a test table with an index on a1
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        config.CreateTable()
+        self.tbl = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertTrue(self.tbl.createIndex("idx_a1", ["a1"]))
+        self.index = self.tbl.indexes["idx_a1"]
+
+    def tearDown(self):
+        ''' 
+        Purpose : Remove the index file
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        path = config.DB_NAME + "/" + self.index.getFileName()
+        if os.path.exists(path):
+            os.remove(path)
+
+    def lookup(self, operator, value):
+        ''' 
+        Purpose : Look up a condition on a1 with the index
+        Parameters : 
+            operator: The operator of the condition
+            value: The literal of the condition
+        Returns: The positions of the matching rows
+        ''' 
+        return self.index.lookup(Predicate(self.tbl, "a1", operator, value))
+
+    def test_lookup(self):
+        ''' 
+        Purpose : Test point and range lookups
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(self.lookup("=", "8"), [1])
+        self.assertEqual(self.lookup(">", "1"), [1, 2])
+        self.assertEqual(self.lookup("<=", "8"), [0, 1])
+        self.assertEqual(self.lookup("=", "7"), [])
+        # Conditions the index cannot answer fall back to a scan
+        self.assertIsNone(self.lookup("!=", "8"))
+        self.assertIsNone(self.index.lookup(Predicate(self.tbl, "f1", "=", "5")))
+
+    def test_maintenance(self):
+        ''' 
+        Purpose : Test that insert, update and delete keep the index up to date
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.tbl.insert(["8", "new", "1.5"])
+        self.assertEqual(self.lookup("=", "8"), [1, 3])
+        self.tbl.update({"a1": "50"}, ["s1", "=", "x"])
+        self.assertEqual(self.lookup(">", "10"), [2])
+        self.tbl.delete(["a1", "=", "1"])
+        self.assertEqual(self.lookup("=", "8"), [0, 2])
+        self.assertEqual(self.lookup("=", "50"), [1])
+        self.assertEqual(self.tbl.getDataByAttrName(["s1"], ["a1", ">=", "50"]), [{"s1": "x"}])
+
+    def test_persistence(self):
+        ''' 
+        Purpose : Test that the index is saved next to the table and read back
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.tbl.save()
+        self.assertIn(self.index.getFileName(), os.listdir(config.DB_NAME))
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertIn("idx_a1", loaded.indexes)
+        self.assertIsNone(loaded.indexes["idx_a1"].entries)
+        self.assertEqual(loaded.indexes["idx_a1"].lookup(Predicate(loaded, "a1", "<", "100")), [0, 1])
+
+        # Dropping the index removes its file on the next save
+        self.assertTrue(loaded.dropIndex("IDX_A1"))
+        loaded.save()
+        self.assertNotIn(self.index.getFileName(), os.listdir(config.DB_NAME))
+
+    def test_stale(self):
+        ''' 
+        Purpose : Test that an index file out of date with its table is rebuilt
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.tbl.save()
+        config.CreateTable()
+        with open(config.DB_NAME + "/" + config.TBL_FILE, "a") as fid:
+            fid.write("8 | appended | 1\n")
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(loaded.indexes["idx_a1"].lookup(Predicate(loaded, "a1", "=", "8")), [1, 3])
+
+        # A change keeping the row count is caught by the stamp of the
+        # table file, not the count
+        loaded.save()
+        path = config.DB_NAME + "/" + self.index.getFileName()
+        with open(path, "rb") as fid:
+            old = fid.read()
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        loaded.update({"a1": "9"}, ["a1", "=", "8"])
+        loaded.save()
+        with open(path, "wb") as fid:
+            fid.write(old)
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        index = loaded.indexes["idx_a1"]
+        self.assertIsNotNone(index.entries)
+        self.assertEqual(index.lookup(Predicate(loaded, "a1", "=", "8")), [])
+        self.assertEqual(index.lookup(Predicate(loaded, "a1", "=", "9")), [1, 3])
+
+    def test_format(self):
+        ''' 
+        Purpose : Test that index files hold plain JSON lines and that a file
+                  of another format is not loaded
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertTrue(self.tbl.createIndex("idx_a1_s1", ["a1", "s1"]))
+        self.tbl.save()
+        path = config.DB_NAME + "/" + self.tbl.indexes["idx_a1_s1"].getFileName()
+        with open(path) as fid:
+            lines = [json.loads(line) for line in fid]
+        self.assertEqual(lines[0]["columns"], ["a1", "s1"])
+        self.assertEqual(lines[1][0], [[[1, 1], [1, "hello"]], [0]])
+        self.assertEqual(lines[2]["stamp"], list(self.tbl.getFileStamp()))
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(loaded.getDataByAttrName(["f1"], [["a1", "=", "8"], ["s1", "=", "this is a string"]]),
+                         [{"f1": 5.0}])
+
+        with open(path, "wb") as fid:
+            pickle.dump({"name": "idx_a1_s1"}, fid)
+        self.assertNotIn("idx_a1_s1", Table(config.DB_NAME, config.TBL_NAME).indexes)
+        os.remove(path)
+
+    def test_incremental(self):
+        ''' 
+        Purpose : Test that inserting and deleting a row neither rebuilds the
+                  index nor writes its file again, and that the changes
+                  appended to the file are read back
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for i in range(200):
+            self.tbl.insert([str(i), "row %d" % i], ["a1", "s1"])
+        self.tbl.save()
+        path = config.DB_NAME + "/" + self.index.getFileName()
+        before = os.stat(path)
+
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        index = loaded.indexes["idx_a1"]
+        rebuilt = []
+        index.rebuild = lambda: rebuilt.append(True)
+        loaded.insert(["500", "new", "1"])
+        loaded.delete(["s1", "=", "row 50"])
+        loaded.save()
+        self.assertEqual(rebuilt, [])
+        after = os.stat(path)
+        self.assertEqual(after.st_ino, before.st_ino)
+        self.assertLess(after.st_size - before.st_size, 200)
+
+        # The row after the deleted one moved up, in the file as well
+        expected = [rowId for rowId, row in enumerate(loaded.rows) if row[0] > 50]
+        for tbl in [loaded, Table(config.DB_NAME, config.TBL_NAME)]:
+            self.assertEqual(tbl.indexes["idx_a1"].lookup(Predicate(tbl, "a1", ">", "50")), expected)
+            self.assertEqual(tbl.getDataByAttrName(["s1"], ["a1", "=", "51"]), [{"s1": "row 51"}])
+            self.assertEqual(tbl.getDataByAttrName(["s1"], ["a1", "=", "50"]), [])
+
+        # Once the changes outgrow the entries, the file is written again
+        for i in range(60):
+            loaded.delete(["a1", "=", str(i + 100)])
+            loaded.save()
+        self.assertNotEqual(os.stat(path).st_ino, before.st_ino)
+        self.assertLess(os.path.getsize(path), 2 * before.st_size)
+        reloaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(reloaded.indexes["idx_a1"].lookup(Predicate(reloaded, "a1", ">=", "100")),
+                         loaded.indexes["idx_a1"].lookup(Predicate(loaded, "a1", ">=", "100")))
+
+    def test_deleteGaps(self):
+        ''' 
+        Purpose : Test that a delete leaves the entries as they are until
+                  enough rows are deleted to renumber them
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for i in range(200):
+            self.tbl.insert([str(i + 200), "row %d" % i], ["a1", "s1"])
+        self.tbl.save()
+        before = [(key, list(rowIds)) for key, rowIds in self.index.getEntries().items()]
+        self.tbl.delete(["a1", "=", "8"])
+        self.assertEqual([(key, rowIds) for key, rowIds in self.index.getEntries().items() if key != 8],
+                         [(key, rowIds) for key, rowIds in before if key != 8])
+        self.assertEqual(self.index.gaps, [1])
+        self.assertEqual(self.lookup("=", "100"), [1])
+        self.assertEqual(self.lookup("<=", "201"), [0, 1, 2, 3])
+        self.tbl.insert(["8", "back", "1"])
+        self.assertEqual(self.lookup("=", "8"), [202])
+        self.assertEqual(self.tbl.getDataByAttrName(["s1"], ["a1", "=", "8"]), [{"s1": "back"}])
+
+        # Enough gaps renumber the entries as a rebuild would
+        for i in range(0, 140, 2):
+            self.tbl.delete(["a1", "=", str(i + 200)])
+        self.assertLess(len(self.index.gaps), Index.COMPACT_GAPS)
+        expected = [rowId for rowId, row in enumerate(self.tbl.rows) if row[0] >= 300]
+        self.assertEqual(self.lookup(">=", "300"), expected)
+        self.tbl.save()
+        entries = [(key, sorted(self.index.positions(key))) for key, rowIds in self.index.getEntries().items()]
+        self.index.rebuild()
+        self.assertEqual([item for item in entries if item[1]], list(self.index.getEntries().items()))
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(loaded.indexes["idx_a1"].lookup(Predicate(loaded, "a1", ">=", "300")), expected)
+
+    def test_hash(self):
+        ''' 
+        Purpose : Test that a hash index answers equality only, and survives a
+                  save and reload
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertTrue(self.tbl.createIndex("hash_s1", ["s1"], Index.HASH))
+        index = self.tbl.indexes["hash_s1"]
+        self.tbl.insert(["7", "x", "1"])
+        self.assertEqual(index.lookup(Predicate(self.tbl, "s1", "=", "x")), [2, 3])
+        self.assertIsNone(index.lookup(Predicate(self.tbl, "s1", ">", "x")))
+        self.assertEqual(sorted(index.match("x")), [2, 3])
+
+        self.tbl.save()
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(loaded.indexes["hash_s1"].kind, Index.HASH)
+        self.assertEqual(loaded.getDataByAttrName(["a1"], ["s1", "=", "x"]), [{"a1": 100}, {"a1": 7}])
+        os.remove(config.DB_NAME + "/" + index.getFileName())
+
+    def test_constraints(self):
+        ''' 
+        Purpose : Test that UNIQUE and PRIMARY KEY indexes reject duplicates
+                  and NULL keys
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        # Existing duplicates prevent the constraint
+        self.assertFalse(self.tbl.createIndex("uniq_f1", ["f1"], Index.BTREE, Index.UNIQUE))
+        self.assertTrue(self.tbl.createIndex("pk_a1", ["a1"], Index.HASH, Index.PRIMARY_KEY))
+        self.assertTrue(self.tbl.createIndex("uniq_s1", ["s1"], Index.BTREE, Index.UNIQUE))
+
+        self.assertFalse(self.tbl.insert(["8", "new", "1"]))
+        self.assertFalse(self.tbl.insert(["9", "x", "1"]))
+        self.assertFalse(self.tbl.insert(["new"], ["s1"]))
+        self.assertTrue(self.tbl.insert(["9"], ["a1"]))
+        self.assertEqual(len(self.tbl.rows), 4)
+
+        self.assertFalse(self.tbl.update({"a1": "8"}, ["s1", "=", "x"]))
+        self.assertFalse(self.tbl.update({"s1": "y"}, ["a1", ">", "1"]))
+        self.assertFalse(self.tbl.update({"s1": "y"}))
+        # Giving a row its own value, or a new one, is allowed
+        self.assertTrue(self.tbl.update({"a1": "8"}, ["a1", "=", "8"]))
+        self.assertTrue(self.tbl.update({"a1": "2"}, ["a1", "=", "1"]))
+        self.assertEqual([row[0] for row in self.tbl.rows], [2, 8, 100, 9])
+
+    def test_composite(self):
+        ''' 
+        Purpose : Test that a composite index answers an equality on its
+                  leading column with a range on the next one, and that a
+                  query reading only indexed columns never reads the rows
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for values in [["8", "a", "1"], ["8", "b", "7.5"], ["8", "c"]]:
+            self.tbl.insert(values, ["a1", "s1", "f1"][:len(values)])
+        self.assertTrue(self.tbl.createIndex("idx_a1_f1", ["a1", "f1"]))
+        index = self.tbl.indexes["idx_a1_f1"]
+        self.assertEqual(index.columns, ["a1", "f1"])
+
+        conditions = [["a1", "=", "8"], ["f1", ">=", "5"]]
+        entries, residual = index.search([Predicate(self.tbl, *c) for c in conditions])
+        self.assertEqual(residual, [])
+        self.assertEqual(sorted(rowId for key, rowIds in entries for rowId in rowIds), [1, 4])
+        # NULLs are indexed as a component of a composite key
+        entries, residual = index.search([Predicate(self.tbl, "a1", "=", "8")])
+        self.assertEqual(sorted(rowId for key, rowIds in entries for rowId in rowIds), [1, 3, 4, 5])
+        self.assertIsNone(index.search([Predicate(self.tbl, "f1", "=", "5")]))
+
+        expected = self.tbl.getDataByAttrName(["*"], conditions + [["s1", "!=", "b"]])
+        self.assertEqual([row["a1"] for row in expected], [8])
+
+        # Only a1 and f1 are read, so the index answers alone
+        rows = self.tbl.rows
+        self.tbl.rows = None
+        try:
+            result = self.tbl.getDataByAttrName(["f1"], [["a1", "=", "8"], ["f1", "<", "7.5"]])
+        finally:
+            self.tbl.rows = rows
+        self.assertEqual(result, [{"f1": 5.0}, {"f1": 1.0}])
+
+        # The index follows updates and survives a reload
+        self.assertTrue(self.tbl.update({"f1": "2"}, [["a1", "=", "8"], ["s1", "=", "c"]]))
+        self.tbl.save()
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(loaded.getDataByAttrName(["a1", "f1"], [["a1", "=", "8"], ["f1", "<", "3"]]),
+                         [{"a1": 8, "f1": 1.0}, {"a1": 8, "f1": 2.0}])
+        os.remove(config.DB_NAME + "/" + index.getFileName())
+
+    def test_join(self):
+        ''' 
+        Purpose : Test that an equi-join probing an index matches the join
+                  without one
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        other = Table(None, "other", True)
+        other.setSchema({'a2': 'int', 's2': 'char(5)'})
+        for values in [['8', 'b'], ['1', 'a'], ['8', 'c'], ['7', 'd']]:
+            other.insert(values)
+        condition = ["test_tbl.a1", "=", "other.a2"]
+        self.tbl.dropIndex("idx_a1")
+        expected = sorted(Table.InnerJoin(self.tbl, other, condition).rows)
+        outer = Table.OuterJoin(other, self.tbl, Joins.LEFT_OUTER_JOIN, ["other.a2", "=", "test_tbl.a1"]).rows
+
+        # Probe the index of the right table, then of the left table
+        for rtable in [self.tbl, other]:
+            rtable.createIndex("probe", ["a2" if rtable is other else "a1"], Index.HASH)
+            self.assertEqual(sorted(Table.InnerJoin(self.tbl, other, condition).rows), expected)
+            rtable.dropIndex("probe")
+        self.tbl.createIndex("probe", ["a1"], Index.HASH)
+        self.assertEqual(Table.OuterJoin(other, self.tbl, Joins.LEFT_OUTER_JOIN, ["other.a2", "=", "test_tbl.a1"]).rows, outer)
+
+if __name__ == '__main__':
+    unittest.main()
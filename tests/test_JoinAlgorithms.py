@@ -0,0 +1,110 @@
+import unittest 
+from itertools import product
+
+import config 
+
+import Joins
+import JoinAlgorithms
+
+class TestJoinAlgorithms(unittest.TestCase):
+    def setUp(self):
+        ''' 
+        Purpose : Make two join inputs of (key, item) pairs
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.left = [(5, 'l5'), (1, 'l1'), (3, 'l3'), (3, 'l3b')]
+        self.right = [(3, 'r3'), (4, 'r4'), (1, 'r1'), (3, 'r3b'), (9, 'r9')]
+
+    def nestedLoop(self, operator):
+        ''' 
+        Purpose : Compute the expected join result with an all-pairs loop
+        Parameters : 
+            operator: The operator of the join condition
+        Returns: Sorted list of matching (left item, right item) pairs
+        ''' 
+        compare = {
+            "=": lambda l, r: l == r,
+            "!=": lambda l, r: l != r,
+            "<>": lambda l, r: l != r,
+            "<": lambda l, r: l < r,
+            ">": lambda l, r: l > r,
+            "<=": lambda l, r: l <= r,
+            ">=": lambda l, r: l >= r
+        }[operator]
+        return sorted((l[1], r[1]) for l, r in product(self.left, self.right) if compare(l[0], r[0]))
+
+    def test_join(self):
+        ''' 
+        Purpose : Test that every operator matches the all-pairs result
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for operator in ["="] + JoinAlgorithms.BAND_OPERATORS:
+            result = sorted(JoinAlgorithms.join(self.left, operator, self.right))
+            self.assertEqual(result, self.nestedLoop(operator), msg=operator)
+
+        # Unknown operators never match
+        self.assertEqual(list(JoinAlgorithms.join(self.left, "~=", self.right)), [])
+
+    def test_chooseAlgorithm(self):
+        ''' 
+        Purpose : Test picking a join algorithm from the operator
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(JoinAlgorithms.chooseAlgorithm("=", self.left, self.right), Joins.HASH_JOIN)
+        self.assertEqual(JoinAlgorithms.chooseAlgorithm("=", sorted(self.left), sorted(self.right)), Joins.MERGE_JOIN)
+        self.assertEqual(JoinAlgorithms.chooseAlgorithm("<=", self.left, self.right), Joins.BAND_JOIN)
+        self.assertIs(JoinAlgorithms.chooseAlgorithm("~=", self.left, self.right), None)
+
+    def test_mergeJoin(self):
+        ''' 
+        Purpose : Test merging inputs with runs of equal keys
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        result = sorted(JoinAlgorithms.mergeJoin(self.left, self.right))
+        self.assertEqual(result, self.nestedLoop("="))
+
+    def test_probe(self):
+        ''' 
+        Purpose : Test that probing keeps the left order and unmatched items
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        left = self.left + [(None, 'lnull')]
+        result = list(JoinAlgorithms.probe(left, ">", self.right))
+        self.assertEqual([item for item, matches in result], ['l5', 'l1', 'l3', 'l3b', 'lnull'])
+        self.assertEqual(sorted(result[0][1]), ['r1', 'r3', 'r3b', 'r4'])
+        self.assertEqual(result[1][1], [])
+        self.assertEqual(result[4][1], [])
+
+    def test_mixedTypes(self):
+        ''' 
+        Purpose : Test that keys of types without an order against each other
+                  only match on equality, without raising
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        right = [('3', 'r3'), ('a', 'ra'), ('b', 'rb')]
+        self.assertEqual(JoinAlgorithms.chooseAlgorithm("=", sorted(self.left), right), Joins.HASH_JOIN)
+        self.assertIs(JoinAlgorithms.chooseAlgorithm("<", self.left, right), None)
+        for operator in ["="] + JoinAlgorithms.BAND_OPERATORS:
+            self.assertEqual(list(JoinAlgorithms.join(sorted(self.left), operator, right)), [], msg=operator)
+        result = list(JoinAlgorithms.probe(self.left, "<", right))
+        self.assertEqual([matches for item, matches in result], [[], [], [], []])
+
+        # Ints and floats are ordered against each other
+        floats = [(1.0, 'f1'), (4.5, 'f4')]
+        self.assertEqual(sorted(JoinAlgorithms.join(self.left, ">", floats)),
+                         [('l3', 'f1'), ('l3b', 'f1'), ('l5', 'f1'), ('l5', 'f4')])
+
+if __name__ == '__main__':
+    unittest.main()
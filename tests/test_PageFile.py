@@ -0,0 +1,247 @@
+import unittest
+import os, shutil
+
+import config
+
+from PageFile import PageFile
+from BufferPool import BufferPool
+import Settings
+
+class TestPageFile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Purpose : Make a test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Purpose : Remove the test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        '''
+        Purpose : Write a page file of a few pages
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.path = config.DB_NAME + "/pages.tbl"
+        self.rows = [(i, "row %d" % i, i / 2) for i in range(1000)]
+        self.file = PageFile.create(self.path, "a (int) | b (varchar(20)) | c (float)", self.rows)
+
+    def tearDown(self):
+        '''
+        Purpose : Remove the page file
+        Parameters :
+            None
+        Returns: None
+        '''
+        BufferPool.shared().discard(self.path)
+        os.remove(self.path)
+
+    def reopen(self):
+        '''
+        Purpose : Save the page file and read it again from disk
+        Parameters :
+            None
+        Returns: The new PageFile object
+        '''
+        self.file.sync()
+        BufferPool.shared().discard(self.path)
+        return PageFile(self.path)
+
+    def test_codec(self):
+        '''
+        Purpose : Test that every kind of value reads back as written
+        Parameters :
+            None
+        Returns: None
+        '''
+        row = (None, -5, 2 ** 70, 1.25, "", "héllo | x")
+        self.assertEqual(PageFile.decodeRow(PageFile.encodeRow(row)), row)
+        self.assertTrue(PageFile.fits(row))
+        self.assertFalse(PageFile.fits(("x" * PageFile.PAGE_SIZE,)))
+
+    def test_read(self):
+        '''
+        Purpose : Test reading rows by position, by range and in order
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.assertTrue(PageFile.isPageFile(self.path))
+        loaded = self.reopen()
+        self.assertEqual(loaded.schema, "a (int) | b (varchar(20)) | c (float)")
+        self.assertEqual(len(loaded), 1000)
+        self.assertEqual(loaded[0], self.rows[0])
+        self.assertEqual(loaded[-1], self.rows[-1])
+        self.assertEqual(loaded[450:560], self.rows[450:560])
+        self.assertEqual(list(loaded), self.rows)
+        with self.assertRaises(IndexError):
+            loaded[1000]
+
+    def test_createFails(self):
+        '''
+        Purpose : Test that a page file left unfinished keeps the old file
+        Parameters :
+            None
+        Returns: None
+        '''
+        def rows():
+            yield (1, "new", 0.5)
+            raise ValueError("bad row")
+        with self.assertRaises(ValueError):
+            PageFile.create(self.path, self.file.schema, rows())
+        self.assertEqual(list(self.reopen()), self.rows)
+        self.assertEqual(os.listdir(config.DB_NAME), ["pages.tbl"])
+
+    def test_append(self):
+        '''
+        Purpose : Test that appended rows fill the last page, then new ones
+        Parameters :
+            None
+        Returns: None
+        '''
+        pages = len(self.file.entries)
+        for i in range(1000, 2000):
+            self.file.append((i, "row %d" % i, i / 2))
+            self.rows.append((i, "row %d" % i, i / 2))
+        self.assertGreater(len(self.file.entries), pages)
+        self.assertEqual(list(self.reopen()), self.rows)
+
+    def test_update(self):
+        '''
+        Purpose : Test that rows growing out of their page move to a new page
+                  placed right after it
+        Parameters :
+            None
+        Returns: None
+        '''
+        rowIds = list(range(100, 200))
+        self.file.update(rowIds, lambda row: row[:1] + ("x" * 50,) + row[2:])
+        for rowId in rowIds:
+            self.rows[rowId] = (rowId, "x" * 50, rowId / 2)
+        self.file[5] = (5, None, None)
+        self.rows[5] = (5, None, None)
+        self.assertEqual(self.file[95:205], self.rows[95:205])
+        self.assertEqual(list(self.reopen()), self.rows)
+        with self.assertRaises(ValueError):
+            self.file[0] = ("x" * PageFile.PAGE_SIZE,)
+
+    def test_delete(self):
+        '''
+        Purpose : Test that deleting rows packs the pages and frees the
+                  emptied ones for later rows
+        Parameters :
+            None
+        Returns: None
+        '''
+        pages = len(self.file.entries)
+        rowIds = list(range(300, 1000, 2)) + list(range(301, 700, 2))
+        self.file.delete(sorted(rowIds))
+        self.rows = [row for i, row in enumerate(self.rows) if i not in set(rowIds)]
+        self.assertEqual(list(self.file), self.rows)
+        self.assertLess(len(self.file.entries), pages)
+        free = len(self.file.free)
+        self.assertGreater(free, 0)
+
+        loaded = self.reopen()
+        self.assertEqual(list(loaded), self.rows)
+        self.assertEqual(len(loaded.free), free)
+        pageCount = loaded.pageCount
+        loaded.update(range(len(loaded)), lambda row: row[:1] + ("y" * 30,) + row[2:])
+        # Free pages are used before the file grows
+        self.assertEqual(loaded.pageCount, pageCount)
+
+        # Deleting a row only rewrites its page, the one before it and the
+        # header and directory pages
+        loaded.sync()
+        loaded.delete([len(loaded) // 2])
+        self.assertLessEqual(len(loaded.pool.writers), 4)
+        self.assertEqual(len(self.reopen()), len(self.rows) - 1)
+
+    def test_budget(self):
+        '''
+        Purpose : Test that a pool smaller than the file reads the same rows
+                  and keeps changed pages until they are saved, spilling
+                  those that do not fit
+        Parameters :
+            None
+        Returns: None
+        '''
+        pool = BufferPool.shared()
+        budget = pool.budget
+        try:
+            pool.resize(2 * PageFile.PAGE_SIZE)
+            loaded = self.reopen()
+            self.assertEqual(list(loaded), self.rows)
+            self.assertLessEqual(pool.size, 2 * PageFile.PAGE_SIZE)
+
+            loaded.update(range(0, 1000, 10), lambda row: row[:2] + (None,))
+            for rowId in range(0, 1000, 10):
+                self.rows[rowId] = self.rows[rowId][:2] + (None,)
+            self.assertLessEqual(pool.size, 2 * PageFile.PAGE_SIZE)
+            self.assertGreater(len(pool.spilled), 0)
+            self.assertEqual(list(loaded), self.rows)
+            self.assertEqual(list(PageFile(self.path)), self.rows)
+            changes = list(loaded.changes())
+            self.assertEqual(len(changes), len(pool.writers))
+            self.assertLessEqual(pool.size, 2 * PageFile.PAGE_SIZE)
+
+            # Written pages are evicted like any other
+            loaded.sync()
+            self.assertEqual(pool.spilled, {})
+            self.assertLessEqual(pool.size, 2 * PageFile.PAGE_SIZE)
+            self.file = loaded
+            self.assertEqual(list(self.reopen()), self.rows)
+        finally:
+            pool.resize(budget)
+
+    def test_loadModes(self):
+        '''
+        Purpose : Test that mapped pages are read in place and that the map
+                  follows the file as it grows or is replaced
+        Parameters :
+            None
+        Returns: None
+        '''
+        pool = BufferPool.shared()
+        loadMode = Settings.loadMode
+        try:
+            Settings.loadMode = Settings.MMAP_LOAD
+            loaded = self.reopen()
+            self.assertIsInstance(loaded.readPage(1), memoryview)
+            self.assertEqual(loaded[500], self.rows[500])
+            self.assertFalse(any(key[0] == self.path for key in pool.pages))
+
+            # Pages written after the file was mapped are read as well
+            for i in range(1000, 1500):
+                loaded.append((i, "row %d" % i, None))
+                self.rows.append((i, "row %d" % i, None))
+            loaded.sync()
+            self.assertEqual(list(PageFile(self.path)), self.rows)
+
+            # A file written over keeps the old rows for the old map
+            replaced = PageFile.create(self.path, loaded.schema, self.rows[:10])
+            self.assertEqual(loaded[600], self.rows[600])
+            self.assertEqual(list(replaced), self.rows[:10])
+            self.file = replaced
+
+            Settings.loadMode = Settings.READ_LOAD
+            self.assertEqual(list(self.reopen()), self.rows[:10])
+            self.assertTrue(any(key[0] == self.path for key in pool.pages))
+        finally:
+            Settings.loadMode = loadMode
+
+if __name__ == '__main__':
+    unittest.main()
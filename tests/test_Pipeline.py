@@ -0,0 +1,85 @@
+import unittest 
+
+import config 
+
+from ColumnStore import ColumnStore
+import Pipeline
+import Settings
+from Predicate import Predicate
+from Table import Table
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        ''' 
+        Purpose : Make an in-memory table with a few rows
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.tbl = Table(None, "pipe", True)
+        self.tbl.setSchema({'a': 'int', 's': 'varchar(5)'})
+        for i in range(10):
+            self.tbl.insert([str(i), "s%d" % (i % 3)])
+
+    def test_scan(self):
+        ''' 
+        Purpose : Test that a scan yields every row in batches of the given size
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        batches = list(Pipeline.scan(self.tbl, batchSize=4))
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+        self.assertEqual(list(Pipeline.rows(batches)), list(self.tbl.rows))
+
+    def test_scanFilterProject(self):
+        ''' 
+        Purpose : Test a filtered and projected scan
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        predicate = Predicate(self.tbl, "a", ">=", "7")
+        batches = Pipeline.scan(self.tbl, predicate, [1, 0], batchSize=2)
+        self.assertEqual(list(Pipeline.rows(batches)), [("s1", 7), ("s2", 8), ("s0", 9)])
+
+    @unittest.skipUnless(ColumnStore.isAvailable(), "NumPy is not installed")
+    def test_scanColumnStore(self):
+        ''' 
+        Purpose : Test that a column-stored table scans like a row-stored one
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        predicate = Predicate(self.tbl, "s", "=", "s1")
+        expected = list(Pipeline.rows(Pipeline.scan(self.tbl, predicate, [0], 2)))
+        self.tbl.setStorage(Settings.COLUMN_STORAGE)
+        batches = list(Pipeline.scan(self.tbl, predicate, [0], 2))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual(list(Pipeline.rows(batches)), expected)
+
+    def test_crossJoin(self):
+        ''' 
+        Purpose : Test that a cross join pairs every left row with every right row
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        batches = list(Pipeline.crossJoin(Pipeline.scan(self.tbl), self.tbl, batchSize=7))
+        self.assertTrue(all(len(batch) <= 7 for batch in batches))
+        result = list(Pipeline.rows(batches))
+        self.assertEqual(len(result), 100)
+        self.assertEqual(result[11], self.tbl.rows[1] + self.tbl.rows[1])
+
+    def test_batched(self):
+        ''' 
+        Purpose : Test grouping single rows into batches
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(list(Pipeline.batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(Pipeline.batched([], 2)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest 
+import os, shutil 
+
+import config 
+
+from Predicate import Predicate
+from Table import Table
+
+class TestPredicate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        ''' 
+        Purpose : Make a test database
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        ''' 
+        Purpose : Remove the test database
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        ''' 
+        Purpose : Make a test table
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        config.CreateTable()
+        self.tbl = Table(config.DB_NAME, config.TBL_NAME)
+
+    def test_init(self):
+        ''' 
+        Purpose : Test compiling a condition against a table
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        predicate = Predicate(self.tbl, " 'a1' ", " <= ", " '8' ")
+        self.assertTrue(predicate.valid)
+        self.assertEqual(predicate.column, "a1")
+        self.assertEqual(predicate.position, 0)
+        self.assertIs(predicate.castType, int)
+        self.assertEqual(predicate.value, 8)
+
+        # Unknown columns, unknown operators and bad literals never match 
+        for condition in [("f3", "=", "1"), ("a1", "~=", "1"), ("a1", "=", "x")]:
+            predicate = Predicate(self.tbl, *condition)
+            self.assertFalse(predicate.valid)
+            self.assertEqual([row for row in self.tbl.rows if predicate(row)], [])
+
+    def test_call(self):
+        ''' 
+        Purpose : Test checking rows against a compiled condition
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        predicate = Predicate(self.tbl, "f1", ">=", "3.14")
+        matches = [row[1] for row in self.tbl.rows if predicate(row)]
+        self.assertEqual(matches, ["hello", "this is a string", "x"])
+
+        predicate = Predicate(self.tbl, "a1", "<>", "8")
+        matches = [row[1] for row in self.tbl.rows if predicate(row)]
+        self.assertEqual(matches, ["hello", "x"])
+
+    def test_splitCondition(self):
+        ''' 
+        Purpose : Test splitting condition text
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(Predicate.splitCondition("a1 <= 3"), ["a1", "<=", "3"])
+        self.assertEqual(Predicate.splitCondition("a1>=3"), ["a1", ">=", "3"])
+        self.assertEqual(Predicate.splitCondition("s1 <> 'a=b'"), ["s1", "<>", "'a=b'"])
+        self.assertEqual(Predicate.splitCondition(""), [])
+
+    def test_splitConditions(self):
+        ''' 
+        Purpose : Test splitting a WHERE clause on AND and compiling it
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(Predicate.splitConditions("a1 > 1 AND f1 = 3.14"), [["a1", ">", "1"], ["f1", "=", "3.14"]])
+        self.assertEqual(Predicate.splitConditions("s1 = 'this and that'"), [["s1", "=", "'this and that'"]])
+        self.assertEqual(Predicate.splitConditions(""), [])
+
+        predicate = Predicate.compile(self.tbl, [["a1", ">", "1"], ["f1", "=", "3.14"]])
+        self.assertEqual([row[0] for row in self.tbl.rows if predicate(row)], [100])
+        self.assertIsInstance(Predicate.compile(self.tbl, ["a1", ">", "1"]), Predicate)
+        self.assertIsNone(Predicate.compile(self.tbl, []))
+
+if __name__ == '__main__':
+    unittest.main()
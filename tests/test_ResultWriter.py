@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import unittest 
+from unittest.mock import patch
+
+import config 
+
+import Settings
+from ResultWriter import ResultWriter
+from Table import Table
+
+class TestResultWriter(unittest.TestCase):
+    def setUp(self):
+        ''' 
+        Purpose : Make a table to format values with
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.tbl = Table(None, "out", True)
+        self.attrList = ["out.id", "out.name", "out.price"]
+        self.types = ["int", "varchar(10)", "float"]
+        self.rows = [(1, "Joe", 2.5), (2, "a,b", None)]
+
+    def write(self, outputFormat, rows):
+        ''' 
+        Purpose : Write a result to a captured stdout
+        Parameters : 
+            outputFormat: The format to write in
+            rows: The rows to write
+        Returns: The text written
+        ''' 
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            with ResultWriter(self.tbl.formatValue, outputFormat) as writer:
+                writer.writeHeader(self.attrList, self.types)
+                writer.writeRows(rows)
+            return stdout.getvalue()
+
+    def test_pipe(self):
+        ''' 
+        Purpose : Test the pipe-delimited format
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        expected = "id int|name varchar(10)|price float\n1|Joe|2.5\n2|a,b|NULL\n"
+        self.assertEqual(self.write(Settings.PIPE_FORMAT, self.rows), expected)
+        # An empty result keeps its trailing blank line 
+        expected = "id int|name varchar(10)|price float\n\n"
+        self.assertEqual(self.write(Settings.PIPE_FORMAT, []), expected)
+
+    def test_csv(self):
+        ''' 
+        Purpose : Test the CSV format
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        expected = 'id,name,price\n1,Joe,2.5\n2,"a,b",\n'
+        self.assertEqual(self.write(Settings.CSV_FORMAT, self.rows), expected)
+
+    def test_json(self):
+        ''' 
+        Purpose : Test the JSON Lines format
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        lines = self.write(Settings.JSON_FORMAT, self.rows).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {"id": 1, "name": "Joe", "price": 2.5},
+            {"id": 2, "name": "a,b", "price": None}
+        ])
+
+    def test_file(self):
+        ''' 
+        Purpose : Test that results are appended to an output file
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        path = "result_writer_test.txt"
+        try:
+            for i in range(2):
+                with ResultWriter(self.tbl.formatValue, Settings.PIPE_FORMAT, path) as writer:
+                    writer.writeRows(self.rows[i:i + 1])
+            with open(path) as fid:
+                self.assertEqual(fid.read(), "1|Joe|2.5\n2|a,b|NULL\n")
+        finally:
+            os.remove(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,129 @@
-
 import unittest 
+import os, shutil
+import io, contextlib
 
 import config 
 
+from Database import Database
+from Parser import Parser
 from SelectStatement import SelectStatement
+import JoinAlgorithms
 
 class TestSelectStatement(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        pass 
+        ''' 
+        Purpose : Create a test database
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        os.mkdir(config.DB_NAME)
 
     @classmethod
     def tearDownClass(cls):
-        pass 
+        ''' 
+        Purpose : Remove the test database
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        shutil.rmtree(config.DB_NAME)
 
     def setUp(self):
-        pass 
+        ''' 
+        Purpose : Create an employee table and a sales table to join
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        with open(config.DB_NAME + "/employee.tbl", "w") as fid:
+            fid.write("id (int) | name (varchar(10))\n1 | Joe\n2 | Ann\n")
+        with open(config.DB_NAME + "/sales.tbl", "w") as fid:
+            fid.write("employeeID (int) | productID (int)\n1 | 344\n1 | 355\n")
+        self.db = Database(config.DB_NAME)
 
     def tearDown(self):
-        pass 
+        ''' 
+        Purpose : Remove the table files
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for name in os.listdir(config.DB_NAME):
+            os.remove(config.DB_NAME + "/" + name)
 
+    def select(self, query):
+        ''' 
+        Purpose : Run a SELECT statement against the test database
+        Parameters : 
+            query: The SQL text of the statement
+        Returns: The text the statement printed
+        ''' 
+        statement = Parser().parse(query).get()
+        self.assertIsInstance(statement, SelectStatement)
+        statement.setDBContext(self.db)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            statement.execute()
+        return output.getvalue()
 
     def test_execute(self):
-        pass
+        ''' 
+        Purpose : Test that joins print the matching rows
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        output = self.select("SELECT * FROM Employee E, Sales S WHERE E.id = S.employeeID;")
+        self.assertEqual(output.splitlines()[1:], ["1|Joe|1|344", "1|Joe|1|355"])
+
+    def test_tableConditions(self):
+        ''' 
+        Purpose : Test that conditions on one table filter its rows before
+                  the join, and conditions on both tables after it
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        inputs = []
+        join = JoinAlgorithms.join
+        JoinAlgorithms.join = lambda left, operator, right: inputs.append((len(left), len(right))) or join(left, operator, right)
+        try:
+            output = self.select("SELECT * FROM Employee E, Sales S WHERE E.id <= S.employeeID AND S.productID > 350 AND E.id = 1;")
+        finally:
+            JoinAlgorithms.join = join
+        self.assertEqual(inputs, [(1, 1)])
+        self.assertEqual(output.splitlines()[1:], ["1|Joe|1|355"])
+
+        output = self.select("SELECT * FROM Employee E, Sales S WHERE S.productID = 344 AND E.id != S.productID;")
+        self.assertEqual(output.splitlines()[1:], ["1|Joe|1|344", "2|Ann|1|344"])
+
+    def test_outerJoin(self):
+        ''' 
+        Purpose : Test that rows an outer join does not match are printed
+                  with NULL for the other table
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        output = self.select("SELECT * FROM Employee E LEFT OUTER JOIN Sales S ON E.id = S.employeeID;")
+        self.assertEqual(output.splitlines()[1:], ["1|Joe|1|344", "1|Joe|1|355", "2|Ann|NULL|NULL"])
+
+    def test_missingJoinColumn(self):
+        ''' 
+        Purpose : Test that joining on a column a table does not have fails
+                  with a message for inner and outer joins
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        for query in ["SELECT * FROM Employee E, Sales S WHERE E.bogus = S.employeeID;",
+                      "SELECT * FROM Employee E INNER JOIN Sales S ON E.id = S.bogus;",
+                      "SELECT * FROM Employee E LEFT OUTER JOIN Sales S ON E.bogus = S.employeeID;"]:
+            output = self.select(query)
+            self.assertTrue(output.startswith("!Failed to query table"), msg=query)
+            self.assertIn("bogus", output)
 
 
 if __name__ == '__main__':
@@ -5,6 +5,10 @@ import os, shutil
 import config 
 
 from Table import Table
+from ColumnStore import ColumnStore
+from PageFile import PageFile
+import Joins
+import Settings
 
 class TestTable(unittest.TestCase):
     @classmethod
@@ -54,12 +58,42 @@ class TestTable(unittest.TestCase):
             None
         Returns: None
         ''' 
-        # Save the default table and check the files contents
+        # Save the default table and check it reads back the same
+        rows = list(self.tbl.rows)
         self.tbl.save()
-        
-        fid = open(f'{config.DB_NAME}/{config.TBL_FILE}')
-        contents = fid.read()
-        self.assertEqual(contents, config.TBL_CONTENTS)
+        self.assertTrue(PageFile.isPageFile(f'{config.DB_NAME}/{config.TBL_FILE}'))
+
+        loaded = Table(config.DB_NAME, config.TBL_NAME)
+        self.assertEqual(loaded.schema, self.tbl.schema)
+        self.assertEqual(list(loaded.rows), rows)
+
+    def test_saveChanges(self):
+        '''
+        Purpose : Test that saving a column-stored table applies its changes
+                  to the table file instead of writing it again
+        Parameters :
+            None
+        Returns: None
+        '''
+        if not ColumnStore.isAvailable():
+            self.skipTest("NumPy is not installed")
+        # Reading the text table makes saving turn it into a page file
+        self.tbl.getRowCount()
+        self.tbl.save()
+        table = Table(config.DB_NAME, config.TBL_NAME)
+        table.setStorage(Settings.COLUMN_STORAGE)
+        self.assertTrue(table.insert(['2', 'new', '1.5']))
+        self.assertTrue(table.update({'s1': 'upd'}, ['a1', '=', '2']))
+        self.assertTrue(table.delete(['f1', '=', '3.14']))
+
+        create = PageFile.create
+        PageFile.create = None
+        try:
+            table.save()
+        finally:
+            PageFile.create = create
+        self.assertEqual(list(Table(config.DB_NAME, config.TBL_NAME).rows),
+                         [(8, 'this is a string', 5.0), (2, 'upd', 1.5)])
 
     def test_addColumn(self):
         ''' 
@@ -77,8 +111,8 @@ class TestTable(unittest.TestCase):
         
         self.assertEqual(schema["s2"], "char(10)")
 
-        for row in self.tbl.rows:
-            self.assertEqual(row["s2"], "NULL")
+        for row in self.tbl.getDataByAttrName(["*"]):
+            self.assertIs(row["s2"], None)
 
     def test_dropColumn(self):
         ''' 
@@ -96,9 +130,10 @@ class TestTable(unittest.TestCase):
             self.tbl.schema["a1"]
         
         # Ensure the error is raised for all rows 
-        for row in self.tbl.rows:
+        for row in self.tbl.getDataByAttrName(["*"]):
             with self.assertRaises(KeyError):
                 row["a1"]
+            self.assertEqual(len(row), 2)
 
     def test_modifyColumn(self):
         ''' 
@@ -112,6 +147,7 @@ class TestTable(unittest.TestCase):
 
         # Modify an existing column with data that is correctly castable 
         self.assertTrue(self.tbl.modifyColumn("a1", "varchar(20)"))
+        self.assertEqual([row[0] for row in self.tbl.rows], ["1", "8", "100"])
 
         # Modify an existing column with data that cannot be casted to the type
         self.assertFalse(self.tbl.modifyColumn("f1", "int"))
@@ -126,6 +162,7 @@ class TestTable(unittest.TestCase):
         newSchema = {'a4': 'int', 'f3': 'float'}
         self.tbl.setSchema(newSchema)
         self.assertEqual(self.tbl.schema, newSchema)
+        self.assertEqual(self.tbl.attrIndex, {'a4': 0, 'f3': 1})
 
     def test_getSchemaString(self):
         ''' 
@@ -150,7 +187,7 @@ class TestTable(unittest.TestCase):
         # delete a single row 
         self.assertTrue(self.tbl.delete(["s1", "=", "hello"]))
         for row in self.tbl.rows:
-            self.assertFalse("hello" in row.values())
+            self.assertFalse("hello" in row)
 
         # Delete all rows 
         self.assertTrue(self.tbl.delete())
@@ -187,7 +224,7 @@ class TestTable(unittest.TestCase):
 
         tRow = None
         for row in self.tbl.rows:
-            if row['a1'] == '1':
+            if row[self.tbl.attrIndex['a1']] == 1:
                 tRow = row 
                 break 
         
@@ -211,6 +248,33 @@ class TestTable(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.tbl.castColumn("1.3", int)
 
+    def test_parseValue(self):
+        ''' 
+        Purpose : Test casting stored text to typed values
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(self.tbl.parseValue("12", int), 12)
+        self.assertEqual(self.tbl.parseValue("1.5", float), 1.5)
+        self.assertIs(self.tbl.parseValue("NULL", int), None)
+
+        # Text that does not match the column type is kept as is
+        self.assertEqual(self.tbl.parseValue("abc", int), "abc")
+
+    def test_formatValue(self):
+        ''' 
+        Purpose : Test converting typed values back to stored text
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        self.assertEqual(self.tbl.formatValue(12), "12")
+        self.assertEqual(self.tbl.formatValue(3.14), "3.14")
+        self.assertEqual(self.tbl.formatValue(5.0), "5")
+        self.assertEqual(self.tbl.formatValue("hi"), "hi")
+        self.assertEqual(self.tbl.formatValue(None), "NULL")
+
     def test_getType(self):
         ''' 
         Purpose : Test getting a type from a string
@@ -241,20 +305,20 @@ class TestTable(unittest.TestCase):
 
         # Get index of update for next test 
         index = 0 
-        for row in self.tbl.rows:
+        for row in self.tbl.getDataByAttrName(["*"]):
             if int(row['a1']) == 1:
                 break
             index += 1
 
         # Should update the table correctly
         self.assertTrue(self.tbl.update(updates, ['a1', '=', '1']))
-        row = self.tbl.rows[index]
+        row = self.tbl.getDataByAttrName(["*"])[index]
         for k, v in list(updates.items()):
             self.assertEqual(row[k], v)
 
         # Set all f1 values to 0.1
         self.assertTrue(self.tbl.update({'f1': 0.1}))
-        for row in self.tbl.rows:
+        for row in self.tbl.getDataByAttrName(["*"]):
             self.assertEqual(row['f1'], 0.1)
 
     def test_insert(self):
@@ -283,13 +347,13 @@ class TestTable(unittest.TestCase):
         row = {'a1': 2, 's1': 'str', 'f1': 4.0} 
         self.assertTrue(self.tbl.insert(list(row.values())))
 
-        self.assertIn(row, self.tbl.rows) 
+        self.assertIn(row, self.tbl.getDataByAttrName(["*"])) 
 
         # Test when columns are specified and row is inserted 
         self.assertTrue(self.tbl.insert(['hello', 2.19], ['s1', 'f1']))
 
-        row = {'a1': 'NULL', 's1': 'hello', 'f1': 2.19}
-        self.assertIn(row, self.tbl.rows)
+        row = {'a1': None, 's1': 'hello', 'f1': 2.19}
+        self.assertIn(row, self.tbl.getDataByAttrName(["*"]))
 
     def test_getDataByAttrName(self):
         ''' 
@@ -301,9 +365,9 @@ class TestTable(unittest.TestCase):
         # Get everything from the table 
         dataset = self.tbl.getDataByAttrName(["*"])
         expected = [
-            {'a1': "1", 's1': 'hello', 'f1': "3.14"},
-            {'a1': "8", 's1': 'this is a string', 'f1': "5"},
-            {'a1': "100", 's1': 'x', 'f1': "3.14"}
+            {'a1': 1, 's1': 'hello', 'f1': 3.14},
+            {'a1': 8, 's1': 'this is a string', 'f1': 5.0},
+            {'a1': 100, 's1': 'x', 'f1': 3.14}
         ]
 
         self.assertEqual(dataset, expected)
@@ -311,9 +375,9 @@ class TestTable(unittest.TestCase):
         # Get just a few columns
         dataset = self.tbl.getDataByAttrName(["a1", "s1"])
         expected = [
-            {'a1': "1", 's1': 'hello'},
-            {'a1': "8", 's1': 'this is a string'},
-            {'a1': "100", 's1': 'x'}
+            {'a1': 1, 's1': 'hello'},
+            {'a1': 8, 's1': 'this is a string'},
+            {'a1': 100, 's1': 'x'}
         ]
 
         self.assertEqual(dataset, expected)
@@ -321,7 +385,7 @@ class TestTable(unittest.TestCase):
         # get everything with a condition
         dataset = self.tbl.getDataByAttrName("*", ["s1", "=", "hello"])
         expected = [
-            {'a1': "1", 's1': 'hello', 'f1': "3.14"}
+            {'a1': 1, 's1': 'hello', 'f1': 3.14}
         ]
 
         self.assertEqual(dataset, expected)
@@ -335,5 +399,95 @@ class TestTable(unittest.TestCase):
 
         self.assertEqual(dataset, expected)
 
+    def test_setStorage(self):
+        ''' 
+        Purpose : Test that a column-stored table behaves like a row-stored one
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        if not ColumnStore.isAvailable():
+            self.skipTest("NumPy is not installed")
+        expected = self.tbl.getDataByAttrName(["s1"], ["a1", ">", "1"])
+        self.tbl.setStorage(Settings.COLUMN_STORAGE)
+        self.assertIsInstance(self.tbl.rows, ColumnStore)
+        self.assertEqual(self.tbl.getDataByAttrName(["s1"], ["a1", ">", "1"]), expected)
+
+        self.assertTrue(self.tbl.insert(['2', 'new', '1.5']))
+        self.assertTrue(self.tbl.update({'s1': 'upd'}, ['a1', '=', '2']))
+        self.assertTrue(self.tbl.delete(['f1', '=', '3.14']))
+        self.assertEqual(self.tbl.getDataByAttrName(["*"]), [
+            {'a1': 8, 's1': 'this is a string', 'f1': 5.0},
+            {'a1': 2, 's1': 'upd', 'f1': 1.5}
+        ])
+
+        self.tbl.setStorage(Settings.ROW_STORAGE)
+        self.assertEqual(self.tbl.rows, [(8, 'this is a string', 5.0), (2, 'upd', 1.5)])
+
+    def newJoinTable(self):
+        ''' 
+        Purpose : Make an in-memory table to join against the test table
+        Parameters : 
+            None
+        Returns: Table object named "other"
+        ''' 
+        other = Table(None, "other", True)
+        other.setSchema({'a2': 'int', 's2': 'char(5)'})
+        other.insert(['8', 'b'])
+        other.insert(['1', 'a'])
+        other.insert(['8', 'c'])
+        other.insert(['7', 'd'])
+        return other
+
+    def test_InnerJoin(self):
+        ''' 
+        Purpose : Test joining two tables on an equality
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        other = self.newJoinTable()
+        condition = ["test_tbl.a1", "=", "other.a2"]
+        expected = [
+            (1, "a"),
+            (8, "b"),
+            (8, "c")
+        ]
+
+        # Build on either side and with the condition written either way
+        for ltable, rtable in [(self.tbl, other), (other, self.tbl)]:
+            for cond in [condition, condition[::-1]]:
+                joined = Table.InnerJoin(ltable, rtable, cond)
+                result = sorted((row["test_tbl.a1"], row["other.s2"]) 
+                                for row in joined.getDataByAttrName(["*"]))
+                self.assertEqual(result, expected)
+
+        # Left table columns always come first
+        joined = Table.InnerJoin(self.tbl, other, condition)
+        self.assertEqual(list(joined.schema.keys()), 
+            ["test_tbl.a1", "test_tbl.s1", "test_tbl.f1", "other.a2", "other.s2"])
+        self.assertEqual(len(joined.rows[0]), 5)
+
+    def test_OuterJoin(self):
+        ''' 
+        Purpose : Test left and right outer joins on an equality
+        Parameters : 
+            None
+        Returns: None
+        ''' 
+        other = self.newJoinTable()
+        condition = ["test_tbl.a1", "=", "other.a2"]
+
+        # Every row of the test table appears, unmatched rows padded
+        joined = Table.OuterJoin(self.tbl, other, Joins.LEFT_OUTER_JOIN, condition)
+        result = [(row["test_tbl.a1"], row["other.s2"]) for row in joined.getDataByAttrName(["*"])]
+        self.assertEqual(result, [(1, "a"), (8, "b"), (8, "c"), (100, None)])
+
+        # Every row of the other table appears, left columns still first
+        joined = Table.OuterJoin(self.tbl, other, Joins.RIGHT_OUTER_JOIN, condition)
+        result = [(row["test_tbl.a1"], row["other.s2"]) for row in joined.getDataByAttrName(["*"])]
+        self.assertEqual(result, [(8, "b"), (1, "a"), (8, "c"), (None, "d")])
+        self.assertEqual(list(joined.schema.keys())[0], "test_tbl.a1")
+
 if __name__ == '__main__':
     unittest.main()
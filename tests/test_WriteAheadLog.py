@@ -0,0 +1,332 @@
+import unittest
+import os, shutil
+import threading, time
+import zlib
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import config
+
+from BufferPool import BufferPool
+from Database import Database
+from PageFile import PageFile
+from Predicate import Predicate
+from WriteAheadLog import WriteAheadLog
+import DurableFile
+import FileLock
+import Settings
+
+class TestWriteAheadLog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Purpose : Make a test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Purpose : Remove the test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        '''
+        Purpose : Make a test table stored in a page file, with an index
+        Parameters :
+            None
+        Returns: None
+        '''
+        config.CreateTable()
+        self.db = Database(config.DB_NAME)
+        self.table = self.db.getTableByName(config.TBL_NAME)
+        self.table.createIndex("idx_a1", ["a1"])
+        self.db.save()
+        self.logPath = f'{config.DB_NAME}/{WriteAheadLog.FILE_NAME}'
+
+    def tearDown(self):
+        '''
+        Purpose : Remove the database files
+        Parameters :
+            None
+        Returns: None
+        '''
+        for name in os.listdir(config.DB_NAME):
+            BufferPool.shared().discard(f'./{config.DB_NAME}/{name}')
+            os.remove(config.DB_NAME + "/" + name)
+
+    def crash(self):
+        '''
+        Purpose : Log the changes of the test table as committed, then lose
+                  them before they reach the table file
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.table.logChanges(self.db.log)
+        self.db.log.commit()
+        BufferPool.shared().discard(f'./{config.DB_NAME}/{config.TBL_FILE}')
+
+    def countSyncs(self, function, delay=0):
+        '''
+        Purpose : Run a function, counting the fsyncs it makes
+        Parameters :
+            function: The function to run
+            delay: Seconds each fsync takes at least
+        Returns: The number of fsyncs
+        '''
+        fsync = os.fsync
+        calls = []
+        os.fsync = lambda fd: calls.append(fd) or time.sleep(delay) or fsync(fd)
+        try:
+            function()
+        finally:
+            os.fsync = fsync
+        return len(calls)
+
+    def test_commit(self):
+        '''
+        Purpose : Test that a commit appends the changed pages to the log
+                  with one fsync, and that saving the database empties it
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.assertTrue(self.table.insert(["7", "new", "1.5"]))
+        self.assertEqual(self.countSyncs(self.db.commit), 1)
+        self.assertGreater(os.path.getsize(self.logPath), 0)
+        self.assertEqual(Database(config.DB_NAME).getTableByName(config.TBL_NAME).getRowCount(), 4)
+
+        self.db.save()
+        self.assertEqual(os.path.getsize(self.logPath), 0)
+
+    def test_recover(self):
+        '''
+        Purpose : Test that committed changes missing from a table file are
+                  written to it when the database is opened, and that its
+                  indexes are rebuilt
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.assertTrue(self.table.insert(["7", "new", "1.5"]))
+        self.assertTrue(self.table.update({"s1": "changed"}, ["a1", "=", "8"]))
+        self.crash()
+
+        db = Database(config.DB_NAME)
+        table = db.getTableByName(config.TBL_NAME)
+        self.assertEqual(table.getDataByAttrName(["s1"], ["a1", ">", "5"]),
+                         [{"s1": "changed"}, {"s1": "x"}, {"s1": "new"}])
+        self.assertEqual(table.indexes["idx_a1"].lookup(Predicate(table, "a1", "=", "7")), [3])
+        self.assertEqual(os.path.getsize(self.logPath), 0)
+
+    def test_uncommitted(self):
+        '''
+        Purpose : Test that records after the last commit record, or cut
+                  short, are not replayed
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.assertTrue(self.table.insert(["7", "new", "1.5"]))
+        self.crash()
+        self.assertTrue(self.table.insert(["9", "lost", "2.5"]))
+        self.crash()
+        with open(self.logPath, "r+b") as fid:
+            fid.truncate(os.path.getsize(self.logPath) - 1)
+
+        db = Database(config.DB_NAME)
+        self.assertEqual(db.getTableByName(config.TBL_NAME).getRowCount(), 4)
+
+    def test_sessions(self):
+        '''
+        Purpose : Test that a checkpoint or an open of the database by
+                  another session waits for a commit in progress, then
+                  keeps its pages and syncs them before emptying the log
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.assertTrue(self.table.insert(["7", "new", "1.5"]))
+        self.db.log.begin()
+        self.table.logChanges(self.db.log)
+        self.db.log.commit()
+
+        # Another session opens the database while the pages are logged
+        # but not written yet
+        opened = []
+        thread = threading.Thread(target=lambda: opened.append(Database(config.DB_NAME)))
+        thread.start()
+        time.sleep(0.1)
+        if fcntl is not None:
+            self.assertEqual(opened, [])
+        self.table.save(False)
+        self.db.log.end()
+        thread.join()
+        other = opened[0]
+        self.assertEqual(os.path.getsize(self.logPath), 0)
+        self.assertEqual(other.getTableByName(config.TBL_NAME).getRowCount(), 4)
+
+        # Pages committed by this session are synced by the checkpoint of
+        # the other one
+        self.assertTrue(self.table.insert(["9", "more", "2.5"]))
+        self.db.commit()
+        syncPath = DurableFile.syncPath
+        synced = []
+        DurableFile.syncPath = lambda path: synced.append(path) or syncPath(path)
+        try:
+            self.assertEqual(other.log.checkpoint(), set())
+        finally:
+            DurableFile.syncPath = syncPath
+        self.assertIn(f'./{config.DB_NAME}/{config.TBL_FILE}', synced)
+        self.assertEqual(os.path.getsize(self.logPath), 0)
+        BufferPool.shared().discard(f'./{config.DB_NAME}/{config.TBL_FILE}')
+        table = Database(config.DB_NAME).getTableByName(config.TBL_NAME)
+        self.assertEqual(table.getRowCount(), 5)
+        self.assertEqual(table.indexes["idx_a1"].lookup(Predicate(table, "a1", "=", "9")), [4])
+
+    @unittest.skipIf(fcntl is None, "file locks are not available")
+    def test_statements(self):
+        '''
+        Purpose : Test that pages are not written in place while a statement
+                  of another session runs, and that a session committing
+                  from a statement does not wait for itself
+        Parameters :
+            None
+        Returns: None
+        '''
+        tblPath = f'{config.DB_NAME}/{config.TBL_FILE}'
+        with open(tblPath, "rb") as fid:
+            saved = fid.read()
+        other = Database(config.DB_NAME)
+        other.beginStatement()
+        self.assertTrue(self.table.insert(["7", "new", "1.5"]))
+        thread = threading.Thread(target=self.db.commit)
+        thread.start()
+        time.sleep(0.1)
+        self.assertTrue(thread.is_alive())
+        with open(tblPath, "rb") as fid:
+            self.assertEqual(fid.read(), saved)
+        other.endStatement()
+        thread.join()
+        with open(tblPath, "rb") as fid:
+            self.assertNotEqual(fid.read(), saved)
+
+        # COMMIT runs as a statement of its own session
+        self.db.beginStatement()
+        self.assertTrue(self.table.insert(["9", "more", "2.5"]))
+        self.db.commit()
+        self.db.endStatement()
+        self.assertFalse(self.db.inStatement)
+        self.assertEqual(Database(config.DB_NAME).getTableByName(config.TBL_NAME).getRowCount(), 5)
+
+    def test_groupCommit(self):
+        '''
+        Purpose : Test that sessions committing while an fsync is in progress
+                  share the next one. Each session has its own lock on the
+                  sync file, as a session in another process would.
+        Parameters :
+            None
+        Returns: None
+        '''
+        logs = [WriteAheadLog(config.DB_NAME) for i in range(8)]
+        for log in logs:
+            log.logPages(config.TBL_FILE, [(1, bytes(16))])
+        threads = [threading.Thread(target=log.commit) for log in logs]
+
+        def commitAll():
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLess(self.countSyncs(commitAll, 0.05), len(logs))
+        # A page record and a commit record per session
+        record = 2 * WriteAheadLog.RECORD.size + len(config.TBL_FILE) + len(zlib.compress(bytes(16)))
+        self.assertEqual(logs[0].size, len(logs) * record)
+        syncPath = config.DB_NAME + "/" + WriteAheadLog.SYNC_FILE
+        with open(syncPath, "rb") as fid:
+            self.assertEqual(WriteAheadLog.SYNCED.unpack(fid.read())[0], logs[0].size)
+
+        # One fsync covers the commits other sessions wrote before it
+        for log in logs[:3]:
+            log.logPages(config.TBL_FILE, [(1, bytes(16))])
+        logs[0].commit(False)
+        logs[1].commit(False)
+        self.assertEqual(self.countSyncs(logs[2].commit), 1)
+        with open(syncPath, "rb") as fid:
+            self.assertEqual(WriteAheadLog.SYNCED.unpack(fid.read())[0], logs[0].size)
+
+        # Offsets start over once the log is emptied
+        logs[0].checkpoint()
+        with open(syncPath, "rb") as fid:
+            self.assertEqual(WriteAheadLog.SYNCED.unpack(fid.read())[0], 0)
+
+        # Without file locks every commit not synced yet is still synced
+        locks = FileLock.fcntl
+        FileLock.fcntl = None
+        try:
+            for log in logs[:2]:
+                log.logPages(config.TBL_FILE, [(1, bytes(16))])
+                self.assertEqual(self.countSyncs(log.commit), 1)
+        finally:
+            FileLock.fcntl = locks
+
+    def test_synchronous(self):
+        '''
+        Purpose : Test that NORMAL commits write the log without syncing it
+                  and leave the table files to the checkpoint, which syncs
+                  the log first, and that OFF commits write the table files
+                  without the log
+        Parameters :
+            None
+        Returns: None
+        '''
+        synchronous = Settings.synchronous
+        tblPath = f'{config.DB_NAME}/{config.TBL_FILE}'
+        with open(tblPath, "rb") as fid:
+            saved = fid.read()
+        try:
+            Settings.synchronous = Settings.NORMAL_SYNC
+            self.assertTrue(self.table.insert(["7", "new", "1.5"]))
+            self.assertEqual(self.countSyncs(self.db.commit), 0)
+            size = os.path.getsize(self.logPath)
+            self.assertGreater(size, 0)
+            with open(tblPath, "rb") as fid:
+                self.assertEqual(fid.read(), saved)
+            # Pages already logged are not logged again
+            self.db.commit()
+            self.assertEqual(os.path.getsize(self.logPath), size)
+            self.assertEqual(self.db.getTableByName(config.TBL_NAME).getRowCount(), 4)
+
+            events = []
+            fsync, writePage = os.fsync, PageFile.writePage
+            os.fsync = lambda fd: events.append("log" if fd == self.db.log.fd else "file") or fsync(fd)
+            PageFile.writePage = lambda pageFile, pageNo, page: events.append("page") or writePage(pageFile, pageNo, page)
+            try:
+                self.db.save()
+            finally:
+                os.fsync, PageFile.writePage = fsync, writePage
+            self.assertEqual(events[0], "log")
+            self.assertIn("page", events)
+            self.assertEqual(os.path.getsize(self.logPath), 0)
+            self.assertEqual(Database(config.DB_NAME).getTableByName(config.TBL_NAME).getRowCount(), 4)
+
+            Settings.synchronous = Settings.OFF_SYNC
+            self.assertTrue(self.table.insert(["9", "more", "2.5"]))
+            self.assertEqual(self.countSyncs(self.db.commit), 0)
+            self.assertEqual(os.path.getsize(self.logPath), 0)
+            self.assertEqual(Database(config.DB_NAME).getTableByName(config.TBL_NAME).getRowCount(), 5)
+        finally:
+            Settings.synchronous = synchronous
+
+if __name__ == '__main__':
+    unittest.main()
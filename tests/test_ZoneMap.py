@@ -0,0 +1,208 @@
+import unittest
+import os, shutil
+import json, pickle
+
+import config
+
+from Predicate import Predicate
+from Table import Table
+from ZoneMap import ZoneMap
+
+class TestZoneMap(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Purpose : Make a test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        os.mkdir(config.DB_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Purpose : Remove the test database
+        Parameters :
+            None
+        Returns: None
+        '''
+        shutil.rmtree(config.DB_NAME)
+
+    def setUp(self):
+        '''
+        Purpose : Make a table of three blocks with increasing timestamps
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.count = 3 * ZoneMap.BLOCK_SIZE
+        with open(config.DB_NAME + "/ts.tbl", "w") as fid:
+            fid.write("ts (int) | v (float) | s (varchar(5))\n")
+            for i in range(self.count):
+                fid.write("%d | %s | x\n" % (i, "NULL" if i < ZoneMap.BLOCK_SIZE else "1.5"))
+        self.tbl = Table(config.DB_NAME, "ts")
+
+    def tearDown(self):
+        '''
+        Purpose : Remove the table files
+        Parameters :
+            None
+        Returns: None
+        '''
+        for name in os.listdir(config.DB_NAME):
+            os.remove(config.DB_NAME + "/" + name)
+
+    def test_ranges(self):
+        '''
+        Purpose : Test that blocks that cannot match a condition are left out
+        Parameters :
+            None
+        Returns: None
+        '''
+        size = ZoneMap.BLOCK_SIZE
+        ranges = lambda *condition: self.tbl.blockRanges(Predicate(self.tbl, *condition))
+        self.assertEqual(ranges("ts", ">", str(2 * size)), [(2 * size, self.count)])
+        self.assertEqual(ranges("ts", "<", str(size + 1)), [(0, 2 * size)])
+        self.assertEqual(ranges("ts", "=", "-1"), [])
+        # A block holding only NULLs never matches, text is never bounded
+        self.assertEqual(ranges("v", "=", "1.5"), [(size, self.count)])
+        self.assertEqual(ranges("s", "=", "y"), [(0, self.count)])
+        self.assertEqual(ranges("ts", "=", "abc"), [])
+        self.assertEqual(self.tbl.blockRanges(), [(0, self.count)])
+
+    def test_maintenance(self):
+        '''
+        Purpose : Test that inserts, updates and deletes keep the zones correct
+        Parameters :
+            None
+        Returns: None
+        '''
+        self.tbl.insert(["-5", "2", "y"])
+        self.assertEqual(self.tbl.getDataByAttrName(["s"], ["ts", "<", "0"]), [{"s": "y"}])
+        self.assertTrue(self.tbl.update({"ts": "-7"}, ["ts", "=", "5"]))
+        self.assertEqual(self.tbl.getDataByAttrName(["ts"], ["ts", "<", "-6"]), [{"ts": -7}])
+        self.assertTrue(self.tbl.delete(["ts", "<", "0"]))
+        self.assertEqual(self.tbl.getRowCount(), self.count - 1)
+        self.assertEqual(self.tbl.getDataByAttrName(["ts"], ["ts", "<", "2"]), [{"ts": 0}, {"ts": 1}])
+
+    def test_delete(self):
+        '''
+        Purpose : Test that deleting rows shrinks their blocks instead of
+                  rebuilding the zone map
+        Parameters :
+            None
+        Returns: None
+        '''
+        size = ZoneMap.BLOCK_SIZE
+        ranges = lambda *condition: self.tbl.blockRanges(Predicate(self.tbl, *condition))
+        self.assertEqual(ranges("ts", "<", "0"), [])
+        zoneMap = self.tbl.zoneMap
+        self.assertTrue(self.tbl.delete(["ts", "=", "3"]))
+        self.assertIs(self.tbl.zoneMap, zoneMap)
+        self.assertEqual(zoneMap.counts, [size - 1, size, size])
+        self.assertEqual(ranges("ts", ">=", str(2 * size)), [(2 * size - 1, self.count - 1)])
+
+        # Emptied blocks are dropped and small neighbours merged
+        self.assertTrue(self.tbl.delete(["ts", ">", "10"]))
+        self.assertIs(self.tbl.zoneMap, zoneMap)
+        self.assertEqual(zoneMap.counts, [10])
+        self.assertEqual(ranges("ts", "=", "10"), [(0, 10)])
+        self.assertEqual(ranges("ts", "<", "0"), [])
+        self.tbl.insert(["20", "1", "y"])
+        self.assertEqual(ranges("ts", "=", "20"), [(0, 11)])
+        self.assertEqual(self.tbl.getDataByAttrName(["ts"], ["ts", ">", "9"]), [{"ts": 10}, {"ts": 20}])
+
+    def test_load(self):
+        '''
+        Purpose : Test that the zone map is stored with the table and that the
+                  blocks it skips are never read, from a text table file or
+                  from a page file
+        Parameters :
+            None
+        Returns: None
+        '''
+        threshold = self.count - 3
+        expected = [{"ts": i} for i in range(threshold + 1, self.count)]
+
+        # A text table file only has the rows of the last block parsed,
+        # three values per row
+        self.tbl.blockRanges(Predicate(self.tbl, "ts", "=", "0"))
+        self.tbl.zoneMap.save(config.DB_NAME + "/ts.zmap", self.tbl.getFileStamp())
+        text = Table(config.DB_NAME, "ts")
+        parsed = []
+        parseValue = text.parseValue
+        text.parseValue = lambda value, castType: parsed.append(value) or parseValue(value, castType)
+        self.assertEqual(text.getDataByAttrName(["ts"], ["ts", ">", str(threshold)]), expected)
+        self.assertEqual(len(parsed), 3 * ZoneMap.BLOCK_SIZE)
+
+        self.tbl.save()
+        self.assertIn("ts.zmap", os.listdir(config.DB_NAME))
+        loaded = Table(config.DB_NAME, "ts")
+        self.assertIsNotNone(loaded.zoneMap)
+
+        # A page file only has the rows of the last block decoded
+        decoded = []
+        pageFile = loaded.rows
+        decodeRow = pageFile.decodeRow
+        pageFile.decodeRow = lambda raw: decoded.append(raw) or decodeRow(raw)
+        self.assertEqual(loaded.getDataByAttrName(["ts"], ["ts", ">", str(threshold)]), expected)
+        self.assertEqual(len(decoded), ZoneMap.BLOCK_SIZE)
+        self.assertEqual(loaded.delete(["ts", "=", "-1"]), True)
+        self.assertEqual(len(decoded), ZoneMap.BLOCK_SIZE)
+
+        # Saving an insert writes the last row page, the header page and the
+        # directory page
+        written = []
+        writePage = pageFile.writePage
+        pageFile.writePage = lambda pageNo, page: written.append(pageNo) or writePage(pageNo, page)
+        loaded.insert(["9999", "2", "z"])
+        loaded.save()
+        self.assertEqual(len(decoded), ZoneMap.BLOCK_SIZE)
+        self.assertEqual(len(written), 3)
+        self.assertEqual(list(Table(config.DB_NAME, "ts").rows), list(self.tbl.rows) + [(9999, 2.0, "z")])
+
+        # Rows found through an index are read before they are updated
+        self.tbl.createIndex("ts_idx", ["ts"])
+        self.tbl.save()
+        loaded = Table(config.DB_NAME, "ts")
+        self.assertTrue(loaded.update({"s": "q"}, ["ts", "=", "1"]))
+        self.assertEqual(loaded.rows[1], (1, None, "q"))
+
+    def test_stale(self):
+        '''
+        Purpose : Test that a zone map file is plain JSON and is only trusted
+                  for the state of the table file it was written for
+        Parameters :
+            None
+        Returns: None
+        '''
+        # Read the text table so saving turns it into a page file
+        self.tbl.getRowCount()
+        self.tbl.save()
+        path = config.DB_NAME + "/ts.zmap"
+        with open(path) as fid:
+            state = json.load(fid)
+        self.assertEqual(state["castTypes"], ["int", "float", "str"])
+        self.assertEqual(state["stamp"], list(self.tbl.getFileStamp()))
+        self.assertEqual(state["zones"][1]["0"], [ZoneMap.BLOCK_SIZE, 2 * ZoneMap.BLOCK_SIZE - 1])
+        self.assertEqual(Table(config.DB_NAME, "ts").zoneMap.zones, self.tbl.zoneMap.zones)
+
+        # Another writer moves a value out of its block without the zone
+        # map, keeping the row count
+        with open(path, "rb") as fid:
+            old = fid.read()
+        other = Table(config.DB_NAME, "ts")
+        other.update({"ts": "-1"}, ["ts", "=", str(self.count - 1)])
+        other.save()
+        with open(path, "wb") as fid:
+            fid.write(old)
+        loaded = Table(config.DB_NAME, "ts")
+        self.assertEqual(loaded.getDataByAttrName(["s"], ["ts", "<", "0"]), [{"s": "x"}])
+
+        with open(path, "wb") as fid:
+            pickle.dump(state, fid)
+        self.assertIsNone(ZoneMap.load(path))
+
+if __name__ == '__main__':
+    unittest.main()